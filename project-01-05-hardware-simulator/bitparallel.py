@@ -0,0 +1,301 @@
+"""Evaluate combinational chips for many input vectors at once with NumPy.
+
+Every net is a bit-plane: an array of 64-bit words holding its value for
+64 vectors each. A NAND gate is one bitwise operation on whole planes, and
+all gates of a level are evaluated together by indexing the planes, so
+the work per level is independent of the number of vectors in Python.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+import numpy as np
+from netlist import FALSE, TRUE, Netlist, levelize, prune
+
+# vectors evaluated together, bounding the memory of the planes
+CHUNK = 1 << 16
+
+Vectors = dict[str, np.ndarray]
+# vectorized model of a chip: values of the input pins -> of the output pins
+Reference = Callable[[Vectors], Vectors]
+
+
+@dataclass
+class Mismatch:
+    """Input vector for which a chip differs from its reference model."""
+    index: int
+    inputs: dict[str, int]
+    expected: dict[str, int]
+    actual: dict[str, int]
+
+
+def pack(values: np.ndarray, width: int, words: int) -> np.ndarray:
+    """Transpose the values of a pin to one bit-plane per bit."""
+    if width == 1:
+        bits = (values & np.uint64(1)).astype(np.uint8)[np.newaxis]
+    else:
+        data = values.astype("<u8").view(np.uint8).reshape(-1, 8)[:, :(width + 7) // 8]
+        bits = np.unpackbits(data, axis=1, count=width, bitorder="little").T
+    padded = np.zeros((width, 64 * words), dtype=np.uint8)
+    padded[:, :len(values)] = bits
+    return np.packbits(padded, axis=1, bitorder="little").view(np.uint64)
+
+
+def unpack(planes: np.ndarray, count: int) -> np.ndarray:
+    """Transpose the bit-planes of a pin back to its values."""
+    bits = np.unpackbits(planes.view(np.uint8), axis=1, count=count, bitorder="little")
+    if len(planes) == 1:
+        return bits[0].astype(np.uint64)
+    data = np.zeros((count, 8), dtype=np.uint8)
+    data[:, :(len(planes) + 7) // 8] = np.packbits(bits.T, axis=1, bitorder="little")
+    return data.view("<u8").ravel().astype(np.uint64)
+
+
+class BitParallelSimulator:
+    """Evaluate a combinational netlist over arrays of input values."""
+
+    def __init__(self, netlist: Netlist):
+        self.netlist = prune(netlist)
+        if self.netlist.dffs:
+            raise ValueError(f"{netlist.name} is sequential")
+        if self.netlist.lookups:
+            raise ValueError(f"{netlist.name} has lookups of truth tables")
+        levels = levelize(self.netlist)
+
+        # dense rows of the planes, the constants first
+        self._rows = {FALSE: 0, TRUE: 1}
+        for nets in self.netlist.inputs.values():
+            for net in nets:
+                self._rows.setdefault(net, len(self._rows))
+        for _, _, out in self.netlist.nands:
+            self._rows.setdefault(out, len(self._rows))
+
+        rows = self._rows
+        by_level: dict[int, list[tuple[int, int, int]]] = {}
+        for (a, b, out), level in zip(self.netlist.nands, levels, strict=True):
+            by_level.setdefault(level, []).append((rows[a], rows[b], rows[out]))
+        # rows of the inputs a, b and the output of the gates of every level
+        self._levels = [
+            tuple(np.array(pins, dtype=np.intp) for pins in zip(*gates, strict=True))
+            for _, gates in sorted(by_level.items())
+        ]
+
+    @property
+    def gates(self) -> int:
+        return len(self.netlist.nands)
+
+    def _pin_rows(self, nets: list[int]) -> np.ndarray:
+        return np.array([self._rows[net] for net in nets], dtype=np.intp)
+
+    def evaluate(self, inputs: Vectors) -> Vectors:
+        """Compute the output pins for arrays of values of the input pins.
+
+        All arrays have the same length, missing pins are 0. The values of
+        the outputs are unsigned.
+        """
+        for pin in inputs:
+            if pin not in self.netlist.inputs:
+                raise ValueError(f"Unknown input pin {pin} of {self.netlist.name}")
+        count = len(next(iter(inputs.values()))) if inputs else 0
+        values = {
+            pin: np.asarray(inputs.get(pin, np.zeros(count)), dtype=np.uint64)
+            for pin in self.netlist.inputs
+        }
+        outputs = {
+            pin: np.empty(count, dtype=np.uint64) for pin in self.netlist.outputs
+        }
+        for start in range(0, count, CHUNK):
+            chunk = {pin: array[start:start + CHUNK] for pin, array in values.items()}
+            for pin, array in self._evaluate_chunk(chunk).items():
+                outputs[pin][start:start + CHUNK] = array
+        return outputs
+
+    def _evaluate_chunk(self, values: Vectors) -> Vectors:
+        count = len(next(iter(values.values()))) if values else 0
+        words = (count + 63) // 64
+        planes = np.empty((len(self._rows), words), dtype=np.uint64)
+        planes[FALSE] = 0
+        planes[TRUE] = ~np.uint64(0)
+        for pin, nets in self.netlist.inputs.items():
+            if len(values[pin]) != count:
+                raise ValueError(f"Expected {count} values of {pin}")
+            planes[self._pin_rows(nets)] = pack(values[pin], len(nets), words)
+
+        for a, b, out in self._levels:
+            planes[out] = ~(planes[a] & planes[b])
+
+        return {
+            pin: unpack(planes[self._pin_rows(nets)], count)
+            for pin, nets in self.netlist.outputs.items()
+        }
+
+
+def random_inputs(netlist: Netlist, count: int, seed: int = 0) -> Vectors:
+    """Draw random values of all input pins."""
+    rng = np.random.default_rng(seed)
+    return {
+        pin: rng.integers(0, 1 << len(nets), count, dtype=np.uint64)
+        for pin, nets in netlist.inputs.items()
+    }
+
+
+def exhaustive_inputs(
+    netlist: Netlist,
+    pins: Iterable[str] | None = None,
+    fixed: dict[str, int] | None = None,
+) -> Vectors:
+    """Enumerate all values of some input pins, by default of all.
+
+    The other pins are 0 unless `fixed` gives their value.
+    """
+    names = list(netlist.inputs if pins is None else pins)
+    widths = [len(netlist.inputs[pin]) for pin in names]
+    if sum(widths) > 32:
+        raise ValueError(f"Too many combinations: 2^{sum(widths)}")
+    combinations = np.arange(1 << sum(widths), dtype=np.uint64)
+    fixed = fixed or {}
+    vectors = {
+        pin: np.full(len(combinations), fixed.get(pin, 0), dtype=np.uint64)
+        for pin in netlist.inputs
+    }
+    shift = 0
+    for pin, width in zip(names, widths, strict=True):
+        vectors[pin] = (combinations >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        shift += width
+    return vectors
+
+
+def verify(
+    simulator: BitParallelSimulator,
+    reference: Reference,
+    inputs: Vectors,
+    limit: int = 10,
+) -> tuple[int, list[Mismatch]]:
+    """Compare a chip with its reference model for arrays of input values.
+
+    Return the number of mismatching vectors and up to `limit` of them.
+    """
+    actual = simulator.evaluate(inputs)
+    outputs = reference(inputs)
+    expected = {
+        pin: np.asarray(outputs[pin], dtype=np.uint64) & np.uint64((1 << len(nets)) - 1)
+        for pin, nets in simulator.netlist.outputs.items()
+    }
+    wrong = np.zeros(len(next(iter(inputs.values()), [])), dtype=bool)
+    for pin in actual:
+        wrong |= actual[pin] != expected[pin]
+
+    mismatches = []
+    for index in np.flatnonzero(wrong)[:limit]:
+        mismatches.append(
+            Mismatch(
+                int(index),
+                {pin: int(array[index]) for pin, array in inputs.items()},
+                {pin: int(array[index]) for pin, array in expected.items()},
+                {pin: int(array[index]) for pin, array in actual.items()},
+            )
+        )
+    return int(wrong.sum()), mismatches
+
+
+MASK = np.uint64(0xFFFF)
+
+
+def alu(inputs: Vectors) -> Vectors:
+    """Reference model of the ALU of project 2."""
+    x = np.where(inputs["zx"], 0, inputs["x"]).astype(np.uint64)
+    x = np.where(inputs["nx"], ~x & MASK, x)
+    y = np.where(inputs["zy"], 0, inputs["y"]).astype(np.uint64)
+    y = np.where(inputs["ny"], ~y & MASK, y)
+    out = np.where(inputs["f"], (x + y) & MASK, x & y)
+    out = np.where(inputs["no"], ~out & MASK, out)
+    return {"out": out, "zr": out == 0, "ng": out >> np.uint64(15)}
+
+
+def _mux_way(inputs: Vectors, pins: str) -> Vectors:
+    """Reference model of the multiplexors selecting one of many buses."""
+    return {"out": np.choose(inputs["sel"].astype(np.intp), [inputs[p] for p in pins])}
+
+
+def _dmux_way(inputs: Vectors, pins: str) -> Vectors:
+    """Reference model of the demultiplexors routing a bit to one of many pins."""
+    return {
+        pin: np.where(inputs["sel"] == index, inputs["in"], 0)
+        for index, pin in enumerate(pins)
+    }
+
+
+REFERENCES: dict[str, Reference] = {
+    "ALU": alu,
+    "Add16": lambda i: {"out": (i["a"] + i["b"]) & MASK},
+    "Inc16": lambda i: {"out": (i["in"] + np.uint64(1)) & MASK},
+    "And16": lambda i: {"out": i["a"] & i["b"]},
+    "Or16": lambda i: {"out": i["a"] | i["b"]},
+    "Not16": lambda i: {"out": ~i["in"] & MASK},
+    "Mux16": lambda i: _mux_way(i, "ab"),
+    "Mux4Way16": lambda i: _mux_way(i, "abcd"),
+    "Mux8Way16": lambda i: _mux_way(i, "abcdefgh"),
+    "DMux4Way": lambda i: _dmux_way(i, "abcd"),
+    "DMux8Way": lambda i: _dmux_way(i, "abcdefgh"),
+    "Or8Way": lambda i: {"out": i["in"] != 0},
+}
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+
+    from hdl import load_chips
+    from netlist import flatten
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "chip", choices=sorted(REFERENCES), help="name of the chip to verify"
+    )
+    arg_parser.add_argument(
+        "-d",
+        "--directory",
+        type=pathlib.Path,
+        action="append",
+        default=[],
+        help="directory of hdl-files, by default those of projects 1 to 5",
+    )
+    arg_parser.add_argument(
+        "-n",
+        "--vectors",
+        type=int,
+        default=1_000_000,
+        help="number of random input vectors",
+    )
+    arg_parser.add_argument(
+        "--exhaustive",
+        nargs="*",
+        metavar="PIN",
+        help="enumerate all values of the pins instead, by default of all pins",
+    )
+    args = arg_parser.parse_args()
+
+    simulator = BitParallelSimulator(flatten(args.chip, load_chips(*args.directory)))
+    if args.exhaustive is None:
+        inputs = random_inputs(simulator.netlist, args.vectors)
+    else:
+        inputs = exhaustive_inputs(simulator.netlist, args.exhaustive or None)
+    count = len(next(iter(inputs.values())))
+
+    start = time.perf_counter()
+    wrong, mismatches = verify(simulator, REFERENCES[args.chip], inputs)
+    elapsed = time.perf_counter() - start
+
+    for mismatch in mismatches:
+        print(
+            f"vector {mismatch.index}: {mismatch.inputs} "
+            f"expected {mismatch.expected}, got {mismatch.actual}"
+        )
+    print(f"{count} vectors, {wrong} mismatching, in {elapsed:.3f}s")
+    print(
+        f"{count / elapsed:,.0f} vectors/s, "
+        f"{simulator.gates * count / elapsed:,.0f} gates/s"
+    )
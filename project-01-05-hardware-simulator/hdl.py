@@ -0,0 +1,162 @@
+"""Parse chips written in the hardware description language (HDL)."""
+
+from __future__ import annotations
+
+import pathlib
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+HDL_DIRECTORIES = [
+    ROOT / "project-01-boolean-logic",
+    ROOT / "project-02-boolean-arithmetic",
+    ROOT / "project-03-memory",
+    ROOT / "project-05-computer-architecture",
+]
+
+COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", flags=re.DOTALL)
+TOKEN = re.compile(r"\.\.|\w+|[{}();,=\[\]:]|\S")
+
+# bit range of a sub bus, both ends included
+Bits = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Connection:
+    """Connection of a pin of a part to a signal of the chip, e.g. `a[0..7]=x`."""
+    pin: str
+    pin_bits: Bits | None
+    signal: str
+    signal_bits: Bits | None = None
+
+
+@dataclass
+class Part:
+    """Chip used as part of another chip."""
+    chip: str
+    connections: list[Connection] = field(default_factory=list)
+
+
+@dataclass
+class Chip:
+    """Definition of a chip: its pins with their widths and its parts."""
+    name: str
+    inputs: dict[str, int] = field(default_factory=dict)
+    outputs: dict[str, int] = field(default_factory=dict)
+    parts: list[Part] = field(default_factory=list)
+
+
+def width(bits: Bits | None, full: int) -> int:
+    """Number of bits of a sub bus, or of the full bus."""
+    return full if bits is None else bits[1] - bits[0] + 1
+
+
+class _Parser:
+    """Recursive descent parser of a single chip."""
+
+    def __init__(self, text: str):
+        self._tokens: Iterator[str] = iter(TOKEN.findall(COMMENT.sub(" ", text)))
+        self._token: str | None = next(self._tokens, None)
+
+    def _peek(self) -> str | None:
+        return self._token
+
+    def _next(self) -> str:
+        token = self._token
+        if token is None:
+            raise ValueError("Unexpected end of HDL")
+        self._token = next(self._tokens, None)
+        return token
+
+    def _expect(self, expected: str) -> None:
+        token = self._next()
+        if token != expected:
+            raise ValueError(f"Expected {expected!r}, got {token!r}")
+
+    def _identifier(self) -> str:
+        token = self._next()
+        if not re.fullmatch(r"[A-Za-z_]\w*", token):
+            raise ValueError(f"Expected an identifier, got {token!r}")
+        return token
+
+    def _number(self) -> int:
+        token = self._next()
+        if not token.isdecimal():
+            raise ValueError(f"Expected a number, got {token!r}")
+        return int(token)
+
+    def _bits(self) -> Bits | None:
+        """Parse an optional `[i]` or `[i..j]`."""
+        if self._peek() != "[":
+            return None
+        self._next()
+        start = end = self._number()
+        if self._peek() == "..":
+            self._next()
+            end = self._number()
+        self._expect("]")
+        if end < start:
+            raise ValueError(f"Invalid bit range: {start}..{end}")
+        return start, end
+
+    def _pins(self) -> dict[str, int]:
+        """Parse the declaration of pins after IN or OUT up to `;`."""
+        self._next()
+        pins = {}
+        while True:
+            name = self._identifier()
+            pins[name] = 1
+            if self._peek() == "[":
+                self._next()
+                pins[name] = self._number()
+                self._expect("]")
+            if self._next() == ";":
+                return pins
+
+    def _part(self) -> Part:
+        """Parse a part like `Not(in=a, out=b);`."""
+        part = Part(self._identifier())
+        self._expect("(")
+        while True:
+            pin = self._identifier()
+            pin_bits = self._bits()
+            self._expect("=")
+            signal = self._identifier()
+            part.connections.append(Connection(pin, pin_bits, signal, self._bits()))
+            if self._next() == ")":
+                break
+        self._expect(";")
+        return part
+
+    def chip(self) -> Chip:
+        self._expect("CHIP")
+        chip = Chip(self._identifier())
+        self._expect("{")
+        if self._peek() == "IN":
+            chip.inputs = self._pins()
+        if self._peek() == "OUT":
+            chip.outputs = self._pins()
+        if self._peek() == "BUILTIN":
+            raise ValueError(f"Built-in chip {chip.name} has no parts")
+        self._expect("PARTS")
+        self._expect(":")
+        while self._peek() != "}":
+            chip.parts.append(self._part())
+        self._expect("}")
+        return chip
+
+
+def parse(text: str) -> Chip:
+    """Parse the HDL of a chip."""
+    return _Parser(text).chip()
+
+
+def load_chips(*directories: pathlib.Path) -> dict[str, Chip]:
+    """Parse all hdl-files of the directories, by default of projects 1 to 5."""
+    chips = {}
+    for directory in directories or HDL_DIRECTORIES:
+        for hdl_file in sorted(directory.glob("*.hdl")):
+            chip = parse(hdl_file.read_text())
+            chips[chip.name] = chip
+    return chips
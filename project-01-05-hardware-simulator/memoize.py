@@ -0,0 +1,77 @@
+"""Replace small combinational parts of a chip by lookups of truth tables.
+
+Flattening a chip like the CPU to NAND gates multiplies tiny chips like
+Mux, Xor or FullAdder, which make up most of its gates. A part with few
+input bits is evaluated by looking up the values of its outputs in a
+table instead, computed once from the NAND gates of its own HDL.
+"""
+
+from __future__ import annotations
+
+from hdl import Chip
+from netlist import ALIASES, FALSE, PRIMITIVES, TRUE, Netlist, flatten, levelize, prune
+
+# largest number of input bits of a memoized part, at most 256 table entries
+DEFAULT_WIDTH = 8
+
+
+def truth_table(netlist: Netlist) -> list[int]:
+    """Evaluate a combinational netlist for all values of its inputs.
+
+    Entry `i` holds the values of the output pins packed like the values
+    of the input pins in `i`: the bits of the first pin are the least
+    significant ones.
+    """
+    netlist = prune(netlist)
+    if netlist.dffs:
+        raise ValueError(f"{netlist.name} is sequential")
+    inputs = [net for nets in netlist.inputs.values() for net in nets]
+    size = 1 << len(inputs)
+
+    # every net is an int holding its value for every input value, one bit each
+    values = {FALSE: 0, TRUE: (1 << size) - 1}
+    for bit, net in enumerate(inputs):
+        values[net] = sum(1 << index for index in range(size) if index >> bit & 1)
+    levels = levelize(netlist)
+    for index in sorted(range(len(netlist.nands)), key=levels.__getitem__):
+        a, b, out = netlist.nands[index]
+        values[out] = values[TRUE] ^ (values[a] & values[b])
+
+    outputs = [values[net] for nets in netlist.outputs.values() for net in nets]
+    return [
+        sum((value >> index & 1) << bit for bit, value in enumerate(outputs))
+        for index in range(size)
+    ]
+
+
+def small_chips(name: str, chips: dict[str, Chip], width: int) -> list[str]:
+    """Find the outermost combinational parts of a chip with few input bits.
+
+    Parts of these parts are not searched, as they are never flattened.
+    """
+    found = []
+    seen = set()
+    pending = [name]
+    while pending:
+        for part in chips[pending.pop()].parts:
+            chip = ALIASES.get(part.chip, part.chip)
+            if chip in PRIMITIVES or chip in seen:
+                continue
+            seen.add(chip)
+            if chip not in chips:
+                raise ValueError(f"No HDL for chip {chip}")
+            if sum(chips[chip].inputs.values()) <= width:
+                if not prune(flatten(chip, chips)).dffs:
+                    found.append(chip)
+                    continue
+            pending.append(chip)
+    return found
+
+
+def memoize(name: str, chips: dict[str, Chip], width: int = DEFAULT_WIDTH) -> Netlist:
+    """Flatten a chip, replacing parts with at most `width` input bits by lookups."""
+    tables = {
+        chip: truth_table(flatten(chip, chips))
+        for chip in small_chips(name, chips, width)
+    }
+    return flatten(name, chips, tables)
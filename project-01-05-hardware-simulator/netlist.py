@@ -0,0 +1,301 @@
+"""Flatten chips to a netlist of NAND gates and DFFs.
+
+Every bit of every bus is a net, identified by a number. Net 0 is `false`
+and net 1 is `true`. Connecting an output pin of a part to several signals
+merges their nets, so every net has a single driver: a chip input, a
+constant, a NAND gate, a DFF or the lookup of a truth table.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from hdl import Bits, Chip, Part, width
+
+FALSE, TRUE = 0, 1
+
+# pins of the primitive chips
+PRIMITIVES: dict[str, tuple[dict[str, int], dict[str, int]]] = {
+    "Nand": ({"a": 1, "b": 1}, {"out": 1}),
+    "DFF": ({"in": 1}, {"out": 1}),
+}
+# built-in chips of the tools with the interface and behavior of a chip in HDL
+ALIASES = {"ARegister": "Register", "DRegister": "Register"}
+
+
+@dataclass
+class Lookup:
+    """Combinational part evaluated by looking up its truth table."""
+    chip: str
+    # nets of the bits of all input and of all output pins, in pin order
+    inputs: list[int]
+    outputs: list[int]
+
+
+@dataclass
+class Netlist:
+    """Primitives of a flattened chip and the nets of its pins."""
+    name: str
+    # nets of every pin, least significant bit first
+    inputs: dict[str, list[int]] = field(default_factory=dict)
+    outputs: dict[str, list[int]] = field(default_factory=dict)
+    # (a, b, out) of every NAND gate
+    nands: list[tuple[int, int, int]] = field(default_factory=list)
+    # (in, out) of every DFF
+    dffs: list[tuple[int, int]] = field(default_factory=list)
+    lookups: list[Lookup] = field(default_factory=list)
+    # packed values of the outputs of a chip for every packed value of its inputs
+    tables: dict[str, list[int]] = field(default_factory=dict)
+
+
+class _Flattener:
+    """Instantiate the parts of chips recursively, merging connected nets."""
+
+    def __init__(self, chips: dict[str, Chip], tables: dict[str, list[int]]):
+        self.chips = chips
+        self.tables = tables
+        # union-find forest of the nets, the constants are their own roots
+        self.parent = [FALSE, TRUE]
+        self.nands: list[tuple[int, int, int]] = []
+        self.dffs: list[tuple[int, int]] = []
+        self.lookups: list[Lookup] = []
+
+    def nets(self, count: int) -> list[int]:
+        """Create new nets."""
+        start = len(self.parent)
+        self.parent.extend(range(start, start + count))
+        return list(range(start, start + count))
+
+    def find(self, net: int) -> int:
+        """Find the net a net was merged into."""
+        parent = self.parent
+        while parent[net] != net:
+            parent[net] = parent[parent[net]]
+            net = parent[net]
+        return net
+
+    def union(self, a: int, b: int) -> None:
+        """Merge two nets, keeping constants as the merged net."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if b in (FALSE, TRUE):
+            a, b = b, a
+        if b in (FALSE, TRUE):
+            raise ValueError("Signal connected to both true and false")
+        self.parent[b] = a
+
+    def pins(self, name: str) -> tuple[dict[str, int], dict[str, int]]:
+        """Look up the input and output pins of a chip."""
+        name = ALIASES.get(name, name)
+        if name in PRIMITIVES:
+            return PRIMITIVES[name]
+        if name not in self.chips:
+            raise ValueError(f"No HDL for chip {name}")
+        chip = self.chips[name]
+        return chip.inputs, chip.outputs
+
+    def _signal_nets(
+        self,
+        chip: Chip,
+        signals: dict[str, list[int]],
+        name: str,
+        bits: Bits | None,
+        count: int,
+    ) -> list[int]:
+        """Get the nets of a signal, or of a constant of `count` bits."""
+        if name == "true":
+            return [TRUE] * count
+        if name == "false":
+            return [FALSE] * count
+        if name not in signals:
+            raise ValueError(f"Unknown signal {name} in {chip.name}")
+        nets = signals[name]
+        if bits is not None:
+            if bits[1] >= len(nets):
+                raise ValueError(f"Bits {bits} out of range of {name} in {chip.name}")
+            nets = nets[bits[0]:bits[1] + 1]
+        if len(nets) != count:
+            raise ValueError(f"Width mismatch of {name} in {chip.name}")
+        return nets
+
+    def instantiate(self, name: str, bindings: dict[str, list[int]]) -> None:
+        """Add the primitives of a chip with its pins bound to nets."""
+        name = ALIASES.get(name, name)
+        if name == "Nand":
+            self.nands.append((bindings["a"][0], bindings["b"][0], bindings["out"][0]))
+            return
+        if name == "DFF":
+            self.dffs.append((bindings["in"][0], bindings["out"][0]))
+            return
+
+        chip = self.chips[name]
+        if name in self.tables:
+            self.lookups.append(Lookup(
+                name,
+                [net for pin in chip.inputs for net in bindings[pin]],
+                [net for pin in chip.outputs for net in bindings[pin]],
+            ))
+            return
+
+        signals = dict(bindings)
+        # internal signals get the width of the part pins driving them
+        for part in chip.parts:
+            _, outputs = self.pins(part.chip)
+            for connection in part.connections:
+                if connection.pin in outputs and connection.signal not in signals:
+                    count = width(connection.pin_bits, outputs[connection.pin])
+                    signals[connection.signal] = self.nets(count)
+
+        for part in chip.parts:
+            self.instantiate(part.chip, self._bind(chip, signals, part))
+
+    def _bind(
+        self, chip: Chip, signals: dict[str, list[int]], part: Part
+    ) -> dict[str, list[int]]:
+        """Bind the pins of a part of a chip to the nets of its signals."""
+        inputs, outputs = self.pins(part.chip)
+        # unconnected inputs are false
+        bindings = {pin: [FALSE] * count for pin, count in inputs.items()}
+        bindings.update((pin, self.nets(count)) for pin, count in outputs.items())
+        for connection in part.connections:
+            pin = connection.pin
+            if pin not in bindings:
+                raise ValueError(f"Unknown pin {pin} of {part.chip} in {chip.name}")
+            pin_count = (inputs | outputs)[pin]
+            start, end = connection.pin_bits or (0, pin_count - 1)
+            if end >= pin_count:
+                raise ValueError(f"Bits of {pin} out of range in {chip.name}")
+            nets = self._signal_nets(
+                chip, signals, connection.signal, connection.signal_bits,
+                end - start + 1,
+            )
+            if pin in inputs:
+                bindings[pin][start:end + 1] = nets
+            else:
+                for pin_net, net in zip(bindings[pin][start:end + 1], nets):
+                    self.union(pin_net, net)
+        return bindings
+
+
+def flatten(
+    name: str, chips: dict[str, Chip], tables: dict[str, list[int]] | None = None
+) -> Netlist:
+    """Flatten a chip to NAND gates and DFFs.
+
+    Parts which are chips with a truth table in `tables` become lookups
+    instead of being flattened.
+    """
+    # the chip itself is always flattened
+    tables = {chip: table for chip, table in (tables or {}).items() if chip != name}
+    flattener = _Flattener(chips, tables)
+    inputs, outputs = flattener.pins(name)
+    netlist = Netlist(
+        name,
+        {pin: flattener.nets(count) for pin, count in inputs.items()},
+        {pin: flattener.nets(count) for pin, count in outputs.items()},
+    )
+    flattener.instantiate(name, netlist.inputs | netlist.outputs)
+
+    # nets without a driver, e.g. of unconnected output pins, are false
+    sources = [net for nets in netlist.inputs.values() for net in nets]
+    sources += [out for _, _, out in flattener.nands]
+    sources += [out for _, out in flattener.dffs]
+    sources += [out for lookup in flattener.lookups for out in lookup.outputs]
+    driven = {FALSE, TRUE, *map(flattener.find, sources)}
+
+    def find(net: int) -> int:
+        net = flattener.find(net)
+        return net if net in driven else FALSE
+
+    for pins in (netlist.inputs, netlist.outputs):
+        for pin, nets in pins.items():
+            pins[pin] = [find(net) for net in nets]
+    netlist.nands = [(find(a), find(b), find(out)) for a, b, out in flattener.nands]
+    netlist.dffs = [(find(in_), find(out)) for in_, out in flattener.dffs]
+    netlist.lookups = [
+        Lookup(
+            lookup.chip,
+            [find(net) for net in lookup.inputs],
+            [find(net) for net in lookup.outputs],
+        )
+        for lookup in flattener.lookups
+    ]
+    netlist.tables = {
+        lookup.chip: tables[lookup.chip] for lookup in netlist.lookups
+    }
+    return netlist
+
+
+def prune(netlist: Netlist) -> Netlist:
+    """Remove the primitives which don't affect any output."""
+    drivers: dict[int, tuple[int, ...]] = {}
+    for a, b, out in netlist.nands:
+        drivers[out] = (a, b)
+    for in_, out in netlist.dffs:
+        drivers[out] = (in_,)
+    for lookup in netlist.lookups:
+        for out in lookup.outputs:
+            drivers[out] = tuple(lookup.inputs)
+
+    used = {net for nets in netlist.outputs.values() for net in nets}
+    pending = list(used)
+    while pending:
+        for net in drivers.get(pending.pop(), ()):
+            if net not in used:
+                used.add(net)
+                pending.append(net)
+
+    return Netlist(
+        netlist.name,
+        netlist.inputs,
+        netlist.outputs,
+        [nand for nand in netlist.nands if nand[2] in used],
+        [dff for dff in netlist.dffs if dff[1] in used],
+        [lookup for lookup in netlist.lookups if used.intersection(lookup.outputs)],
+        netlist.tables,
+    )
+
+
+def levelize(netlist: Netlist) -> list[int]:
+    """Assign every NAND gate and lookup the length of the longest path to it.
+
+    Return the levels of the NAND gates followed by those of the lookups.
+    Inputs, constants and DFF outputs are at level 0. Evaluating the gates
+    and lookups in the order of their levels always finds their inputs
+    computed.
+    """
+    # input and output nets of every node
+    nodes = [([a, b], [out]) for a, b, out in netlist.nands]
+    nodes += [(lookup.inputs, lookup.outputs) for lookup in netlist.lookups]
+    driver = {}
+    for index, (_, outputs) in enumerate(nodes):
+        for out in outputs:
+            if out in driver or out in (FALSE, TRUE):
+                raise ValueError(f"Net {out} has several drivers")
+            driver[out] = index
+
+    users: dict[int, list[int]] = {}
+    waiting = []
+    for index, (inputs, _) in enumerate(nodes):
+        sources = {driver[net] for net in inputs if net in driver}
+        waiting.append(len(sources))
+        for source in sources:
+            users.setdefault(source, []).append(index)
+
+    levels = [0] * len(nodes)
+    ready = [index for index, count in enumerate(waiting) if count == 0]
+    for index in ready:
+        levels[index] = 1
+    done = 0
+    while ready:
+        index = ready.pop()
+        done += 1
+        for user in users.get(index, ()):
+            levels[user] = max(levels[user], levels[index] + 1)
+            waiting[user] -= 1
+            if waiting[user] == 0:
+                ready.append(user)
+    if done < len(nodes):
+        raise ValueError(f"Combinational loop in {netlist.name}")
+    return levels
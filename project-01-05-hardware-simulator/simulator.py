@@ -0,0 +1,217 @@
+"""Simulate chips by compiling their netlist to straight-line Python code.
+
+The NAND gates of a flattened chip are sorted by level and become one
+assignment each in a generated function, which takes the value of every
+input pin as an int and returns the values of the output pins as ints.
+Lookups of truth tables index nested tuples with their input bits.
+A sequential chip keeps the outputs of its DFFs in a state list, which a
+clock cycle replaces by their inputs.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Callable, Sequence
+
+from netlist import FALSE, TRUE, Lookup, Netlist, levelize, prune
+
+# state, values of the input pins -> values of the output pins, next state
+Evaluate = Callable[..., tuple[tuple[int, ...], list[int]]]
+
+
+def _ref(net: int) -> str:
+    """Name the variable of a net, constants are literals."""
+    if net == FALSE:
+        return "0"
+    if net == TRUE:
+        return "1"
+    return f"n{net}"
+
+
+def _pack(nets: list[int]) -> str:
+    """Combine the bits of a bus into an int."""
+    return " | ".join(
+        f"{_ref(net)} << {bit}" if bit else _ref(net) for bit, net in enumerate(nets)
+    )
+
+
+def nest(table: list[int], inputs: int, outputs: int) -> object:
+    """Turn a truth table into tuples indexed by one input bit each.
+
+    The first index is the least significant bit of the input value. The
+    values are the output bits, or a tuple of them for several outputs.
+    """
+    if inputs == 0:
+        (value,) = table
+        if outputs == 1:
+            return value
+        return tuple(value >> bit & 1 for bit in range(outputs))
+    return (
+        nest(table[0::2], inputs - 1, outputs),
+        nest(table[1::2], inputs - 1, outputs),
+    )
+
+
+def generate(netlist: Netlist, levels: list[int]) -> str:
+    """Generate the source code of the function evaluating a netlist.
+
+    The truth table of a chip is looked up in the global `t_<chip>`.
+    """
+    parameters = ["state"] + [f"i{index}" for index in range(len(netlist.inputs))]
+    lines = [f"def evaluate({', '.join(parameters)}):"]
+    for index, nets in enumerate(netlist.inputs.values()):
+        for bit, net in enumerate(nets):
+            lines.append(f"    n{net} = i{index} >> {bit} & 1")
+    for index, (_, out) in enumerate(netlist.dffs):
+        lines.append(f"    n{out} = state[{index}]")
+
+    nodes: list[tuple[int, int, int] | Lookup] = [*netlist.nands, *netlist.lookups]
+    order = sorted(range(len(nodes)), key=levels.__getitem__)
+    for index in order:
+        node = nodes[index]
+        if isinstance(node, Lookup):
+            outputs = ", ".join(f"n{net}" for net in node.outputs)
+            bits = "".join(f"[{_ref(net)}]" for net in node.inputs)
+            lines.append(f"    {outputs} = t_{node.chip}{bits}")
+            continue
+        a, b, out = node
+        if a == b:
+            lines.append(f"    n{out} = 1 ^ {_ref(a)}")
+        else:
+            lines.append(f"    n{out} = 1 ^ ({_ref(a)} & {_ref(b)})")
+
+    outputs = "".join(f"{_pack(nets)}, " for nets in netlist.outputs.values())
+    state = ", ".join(_ref(in_) for in_, _ in netlist.dffs)
+    lines.append(f"    return ({outputs}), [{state}]")
+    return "\n".join(lines)
+
+
+class Simulator:
+    """Evaluate a chip, keeping the state of its DFFs between clock cycles.
+
+    Unconnected inputs are 0 and values wider than a pin are truncated.
+    """
+
+    def __init__(self, netlist: Netlist):
+        self.netlist = prune(netlist)
+        levels = levelize(self.netlist)
+        self.levels = max(levels, default=0)
+        self.source = generate(self.netlist, levels)
+        namespace: dict = {}
+        for lookup in self.netlist.lookups:
+            namespace[f"t_{lookup.chip}"] = nest(
+                self.netlist.tables[lookup.chip],
+                len(lookup.inputs),
+                len(lookup.outputs),
+            )
+        exec(compile(self.source, f"<chip {netlist.name}>", "exec"), namespace)
+        self.function: Evaluate = namespace["evaluate"]
+        self.state = [0] * len(self.netlist.dffs)
+        self._masks = {
+            pin: (1 << len(nets)) - 1 for pin, nets in self.netlist.inputs.items()
+        }
+
+    @property
+    def gates(self) -> int:
+        return len(self.netlist.nands)
+
+    @property
+    def nodes(self) -> int:
+        """Number of NAND gates and lookups evaluated."""
+        return len(self.netlist.nands) + len(self.netlist.lookups)
+
+    def _values(self, inputs: dict[str, int]) -> list[int]:
+        """Order and truncate the values of the input pins."""
+        for pin in inputs:
+            if pin not in self._masks:
+                raise ValueError(f"Unknown input pin {pin} of {self.netlist.name}")
+        return [inputs.get(pin, 0) & mask for pin, mask in self._masks.items()]
+
+    def evaluate(self, **inputs: int) -> dict[str, int]:
+        """Compute the outputs for inputs without clocking the DFFs."""
+        outputs, _ = self.function(self.state, *self._values(inputs))
+        return dict(zip(self.netlist.outputs, outputs, strict=True))
+
+    def clock(self, **inputs: int) -> None:
+        """Load the DFFs with the values of their inputs."""
+        _, self.state = self.function(self.state, *self._values(inputs))
+
+    def tick(self, **inputs: int) -> dict[str, int]:
+        """Clock the DFFs and compute the new outputs for the same inputs."""
+        self.clock(**inputs)
+        return self.evaluate(**inputs)
+
+
+def random_vectors(netlist: Netlist, count: int, seed: int = 0) -> list[list[int]]:
+    """Create random values of all input pins."""
+    rng = random.Random(seed)
+    widths = [len(nets) for nets in netlist.inputs.values()]
+    return [[rng.getrandbits(width) for width in widths] for _ in range(count)]
+
+
+def benchmark(simulator: Simulator, vectors: Sequence[Sequence[int]]) -> float:
+    """Measure the number of input vectors evaluated per second."""
+    function = simulator.function
+    state = simulator.state
+    start = time.perf_counter()
+    for values in vectors:
+        function(state, *values)
+    elapsed = time.perf_counter() - start
+    return len(vectors) / elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+
+    from hdl import load_chips
+    from memoize import memoize
+    from netlist import flatten
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("chip", help="name of the chip to simulate")
+    arg_parser.add_argument(
+        "-d",
+        "--directory",
+        type=pathlib.Path,
+        action="append",
+        default=[],
+        help="directory of hdl-files, by default those of projects 1 to 5",
+    )
+    arg_parser.add_argument(
+        "-n",
+        "--vectors",
+        type=int,
+        default=10_000,
+        help="number of random input vectors to evaluate",
+    )
+    arg_parser.add_argument(
+        "-m",
+        "--memoize",
+        type=int,
+        metavar="WIDTH",
+        help="look up parts with at most WIDTH input bits in truth tables",
+    )
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    chips = load_chips(*args.directory)
+    if args.memoize is None:
+        netlist = flatten(args.chip, chips)
+    else:
+        netlist = memoize(args.chip, chips, args.memoize)
+    simulator = Simulator(netlist)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{args.chip}: {len(netlist.nands)} NAND gates, {len(netlist.lookups)} "
+        f"lookups, {len(netlist.dffs)} DFFs, {simulator.gates} gates, "
+        f"{len(simulator.netlist.lookups)} lookups and "
+        f"{len(simulator.netlist.dffs)} DFFs in {simulator.levels} levels "
+        "after pruning"
+    )
+    print(f"compiled in {elapsed:.3f}s")
+    vectors = random_vectors(simulator.netlist, args.vectors)
+    rate = benchmark(simulator, vectors)
+    print(f"{rate:,.0f} vectors/s, {simulator.nodes * rate:,.0f} nodes/s")
@@ -0,0 +1,79 @@
+import pytest
+from hdl import load_chips, parse
+from netlist import flatten
+
+np = pytest.importorskip("numpy")
+
+from bitparallel import (  # noqa: E402
+    CHUNK,
+    REFERENCES,
+    BitParallelSimulator,
+    exhaustive_inputs,
+    pack,
+    random_inputs,
+    unpack,
+    verify,
+)
+
+
+@pytest.fixture(scope="module")
+def chips():
+    return load_chips()
+
+
+@pytest.mark.parametrize("width, count", [(1, 1), (1, 130), (6, 64), (16, 1000)])
+def test_should_pack_and_unpack_bit_planes(width, count):
+    values = np.random.default_rng(0).integers(0, 1 << width, count, dtype=np.uint64)
+    words = (count + 63) // 64
+    planes = pack(values, width, words)
+    assert planes.shape == (width, words)
+    # vector 0 is the least significant bit of the first word
+    assert planes[0][0] & 1 == values[0] & 1
+    assert (unpack(planes, count) == values).all()
+
+
+@pytest.mark.parametrize("name", sorted(REFERENCES))
+def test_should_match_reference_models(chips, name):
+    simulator = BitParallelSimulator(flatten(name, chips))
+    inputs = random_inputs(simulator.netlist, 2000, seed=2)
+    assert verify(simulator, REFERENCES[name], inputs) == (0, [])
+
+
+def test_should_verify_alu_exhaustively_per_control_bits(chips):
+    simulator = BitParallelSimulator(flatten("ALU", chips))
+    inputs = exhaustive_inputs(
+        simulator.netlist, ["zx", "nx", "zy", "ny", "f", "no", "y"], {"x": 0x1234}
+    )
+    assert len(inputs["x"]) == 1 << 22 > CHUNK
+    assert verify(simulator, REFERENCES["ALU"], inputs) == (0, [])
+
+
+def test_should_report_mismatching_vectors(chips):
+    simulator = BitParallelSimulator(flatten("Add16", chips))
+    inputs = exhaustive_inputs(simulator.netlist, ["a"], {"b": 1})
+    wrong, mismatches = verify(
+        simulator, lambda i: {"out": i["a"] + (i["a"] == 7)}, inputs, limit=3
+    )
+    assert wrong == (1 << 16) - 1
+    assert [mismatch.index for mismatch in mismatches] == [0, 1, 2]
+    assert mismatches[1].inputs == {"a": 1, "b": 1}
+    assert (mismatches[1].expected, mismatches[1].actual) == ({"out": 1}, {"out": 2})
+
+
+def test_should_default_missing_inputs_to_zero(chips):
+    simulator = BitParallelSimulator(flatten("Mux16", chips))
+    outputs = simulator.evaluate({"a": np.arange(5), "sel": np.zeros(5)})
+    assert outputs["out"].tolist() == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        simulator.evaluate({"c": np.arange(5)})
+
+
+def test_should_reject_sequential_chips(chips):
+    with pytest.raises(ValueError):
+        BitParallelSimulator(flatten("Bit", chips))
+
+
+def test_should_evaluate_constant_outputs(chips):
+    chips = chips | {"One": parse("CHIP One { IN a; OUT o[2]; PARTS: Or(a=a, b=true, out=o[1]); }")}
+    simulator = BitParallelSimulator(flatten("One", chips))
+    assert simulator.evaluate({"a": np.array([0, 1])})["o"].tolist() == [2, 2]
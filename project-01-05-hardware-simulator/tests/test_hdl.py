@@ -0,0 +1,67 @@
+import pytest
+from hdl import Chip, Connection, Part, load_chips, parse
+
+HDL = """
+// File name: projects/1/Example.hdl
+/**
+ * Example with buses
+ */
+CHIP Example {
+    IN a[16], b,  // inputs
+       sel;
+    OUT out[16], low[8];
+
+    PARTS:
+    Mux16(a=a, b=false, sel=sel, out=out, out[0..7]=low);
+    Not(in=b, out=x);
+    Inc16(in[0]=x, in[15]=true, out=y);
+}
+"""
+
+
+def test_should_parse_chip():
+    assert parse(HDL) == Chip(
+        "Example",
+        {"a": 16, "b": 1, "sel": 1},
+        {"out": 16, "low": 8},
+        [
+            Part("Mux16", [
+                Connection("a", None, "a"),
+                Connection("b", None, "false"),
+                Connection("sel", None, "sel"),
+                Connection("out", None, "out"),
+                Connection("out", (0, 7), "low"),
+            ]),
+            Part("Not", [Connection("in", None, "b"), Connection("out", None, "x")]),
+            Part("Inc16", [
+                Connection("in", (0, 0), "x"),
+                Connection("in", (15, 15), "true"),
+                Connection("out", None, "y"),
+            ]),
+        ],
+    )
+
+
+def test_should_parse_sub_bus_of_signal():
+    chip = parse("CHIP C { IN i[16]; OUT o[15]; PARTS: Not16(in=i, out[0..14]=o); }")
+    assert chip.parts[0].connections[1] == Connection("out", (0, 14), "o")
+    chip = parse("CHIP C { IN i[16]; OUT o; PARTS: Not(in=i[3], out=o); }")
+    assert chip.parts[0].connections[0] == Connection("in", None, "i", (3, 3))
+
+
+@pytest.mark.parametrize("text", [
+    "CHIP C { IN a; OUT b; PARTS: Not(in=a, out=b) }",
+    "CHIP C { IN a; OUT b; PARTS: Not(in=a[2..1], out=b); }",
+    "CHIP C { IN a; OUT b; PARTS: Not(in=a out=b); }",
+    "CHIP C { IN a; OUT b; BUILTIN Not; }",
+    "CHIP C { IN a; OUT b; PARTS: Not(in=a, out=b);",
+])
+def test_should_reject_invalid_hdl(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_should_load_chips_of_projects():
+    chips = load_chips()
+    assert {"Not", "ALU", "Bit", "PC", "CPU", "Computer"} <= chips.keys()
+    assert chips["CPU"].outputs == {"outM": 16, "writeM": 1, "addressM": 15, "pc": 15}
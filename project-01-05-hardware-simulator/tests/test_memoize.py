@@ -0,0 +1,52 @@
+import pytest
+from hdl import load_chips
+from memoize import memoize, small_chips, truth_table
+from netlist import flatten
+from simulator import Simulator, nest, random_vectors
+
+
+@pytest.fixture(scope="module")
+def chips():
+    return load_chips()
+
+
+def test_should_compute_truth_tables(chips):
+    assert truth_table(flatten("Xor", chips)) == [0, 1, 1, 0]
+    # sum + carry << 1 of a + b + c
+    assert truth_table(flatten("FullAdder", chips)) == [0, 1, 1, 2, 1, 2, 2, 3]
+    assert truth_table(flatten("DMux", chips)) == [0, 1, 0, 2]
+
+
+def test_should_reject_sequential_chips(chips):
+    with pytest.raises(ValueError, match="sequential"):
+        truth_table(flatten("Bit", chips))
+
+
+def test_should_nest_truth_tables():
+    assert nest([0, 1, 1, 0], 2, 1) == ((0, 1), (1, 0))
+    assert nest([0, 1, 0, 2], 2, 2) == (((0, 0), (0, 0)), ((1, 0), (0, 1)))
+
+
+def test_should_find_outermost_small_chips(chips):
+    found = small_chips("CPU", chips, 8)
+    assert {"Mux", "FullAdder", "Or8Way"} <= set(found)
+    # parts of memoized chips and sequential chips aren't memoized
+    assert "Nand" not in found
+    assert small_chips("Or8Way", chips, 2) == ["Or"]
+    assert "Bit" not in small_chips("Register", chips, 8)
+
+
+def test_should_reduce_nodes_of_cpu(chips):
+    gates = Simulator(flatten("CPU", chips))
+    lookups = Simulator(memoize("CPU", chips))
+    assert lookups.nodes * 5 < gates.nodes
+
+
+@pytest.mark.parametrize("name, width", [("ALU", 8), ("ALU", 2), ("PC", 8), ("CPU", 8)])
+def test_should_match_gate_level_simulation(chips, name, width):
+    gates = Simulator(flatten(name, chips))
+    lookups = Simulator(memoize(name, chips, width))
+    pins = gates.netlist.inputs
+    for values in random_vectors(gates.netlist, 300, seed=2):
+        inputs = dict(zip(pins, values))
+        assert lookups.tick(**inputs) == gates.tick(**inputs), inputs
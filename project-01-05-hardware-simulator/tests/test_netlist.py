@@ -0,0 +1,90 @@
+import pytest
+from hdl import load_chips, parse
+from netlist import FALSE, TRUE, flatten, levelize, prune
+
+
+@pytest.fixture(scope="module")
+def chips():
+    return load_chips()
+
+
+def with_chips(chips, *texts):
+    return chips | {chip.name: chip for chip in map(parse, texts)}
+
+
+def test_should_flatten_to_nand_gates(chips):
+    netlist = flatten("And", chips)
+    (a,), (b,), (out,) = netlist.inputs["a"], netlist.inputs["b"], netlist.outputs["out"]
+    nand, not_ = netlist.nands
+    assert nand[:2] == (a, b)
+    assert not_ == (nand[2], nand[2], out)
+
+
+def test_should_merge_nets_of_connected_outputs(chips):
+    netlist = flatten("Bit", chips)
+    (dff_in, dff_out), = netlist.dffs
+    assert netlist.outputs["out"] == [dff_out]
+    # the DFF output is fed back into the Mux
+    assert any(dff_out in nand[:2] for nand in netlist.nands)
+
+
+def test_should_bind_constants_and_sub_buses(chips):
+    netlist = flatten("Inc16", chips)
+    nets = {net for nand in netlist.nands for net in nand[:2]}
+    assert TRUE in nets
+    assert FALSE in nets
+    chips = with_chips(chips, "CHIP Low { IN a[16]; OUT o[4]; PARTS: Not16(in=a, out[2..5]=o); }")
+    netlist = flatten("Low", chips)
+    outputs = {out: a for a, _, out in netlist.nands}
+    assert [outputs[net] for net in netlist.outputs["o"]] == netlist.inputs["a"][2:6]
+
+
+def test_should_prune_unused_gates(chips):
+    netlist = flatten("CPU", chips)
+    pruned = prune(netlist)
+    assert len(pruned.nands) < len(netlist.nands)
+    # bit 15 of the program counter isn't an output
+    assert len(pruned.dffs) == len(netlist.dffs) - 1
+
+
+def test_should_levelize_gates(chips):
+    netlist = flatten("Xor", chips)
+    levels = levelize(netlist)
+    level_of = {out: level for (_, _, out), level in zip(netlist.nands, levels)}
+    for (a, b, _), level in zip(netlist.nands, levels):
+        assert all(level_of.get(net, 0) < level for net in (a, b))
+
+
+@pytest.mark.parametrize("text, message", [
+    ("CHIP C { IN a; OUT o; PARTS: Foo(in=a, out=o); }", "No HDL"),
+    ("CHIP C { IN a; OUT o; PARTS: Not(in=b, out=o); }", "Unknown signal"),
+    ("CHIP C { IN a; OUT o; PARTS: Not(x=a, out=o); }", "Unknown pin"),
+    ("CHIP C { IN a[2]; OUT o; PARTS: Not(in=a, out=o); }", "Width mismatch"),
+    ("CHIP C { IN a; OUT o; PARTS: Not(in=a[1], out=o); }", "out of range"),
+])
+def test_should_reject_invalid_connections(chips, text, message):
+    with pytest.raises(ValueError, match=message):
+        flatten("C", with_chips(chips, text))
+
+
+def test_should_reject_combinational_loop(chips):
+    chips = with_chips(chips, "CHIP C { IN a; OUT o; PARTS: And(a=a, b=x, out=x, out=o); }")
+    with pytest.raises(ValueError, match="loop"):
+        levelize(flatten("C", chips))
+
+
+def test_should_tie_undriven_nets_to_false(chips):
+    chips = with_chips(chips, "CHIP C { IN a; OUT o[2]; PARTS: Not(in=a, out=o[1]); }")
+    netlist = flatten("C", chips)
+    assert netlist.outputs["o"][0] == FALSE
+
+
+def test_should_keep_parts_with_truth_tables(chips):
+    netlist = flatten("Mux16", chips, {"Mux": [0] * 8, "Mux16": [0]})
+    assert not netlist.nands
+    assert [lookup.chip for lookup in netlist.lookups] == ["Mux"] * 16
+    first = netlist.lookups[0]
+    a, b, sel = netlist.inputs["a"][0], netlist.inputs["b"][0], netlist.inputs["sel"][0]
+    assert (first.inputs, first.outputs) == ([a, b, sel], [netlist.outputs["out"][0]])
+    assert set(netlist.tables) == {"Mux"}
+    assert levelize(netlist) == [1] * 16
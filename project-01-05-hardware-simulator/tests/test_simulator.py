@@ -0,0 +1,138 @@
+import itertools
+import random
+
+import pytest
+from hdl import load_chips
+from netlist import flatten
+from simulator import Simulator, benchmark, random_vectors
+
+MASK = 0xFFFF
+
+
+@pytest.fixture(scope="module")
+def chips():
+    return load_chips()
+
+
+@pytest.fixture(scope="module")
+def simulators(chips):
+    cache = {}
+
+    def simulator(name):
+        if name not in cache:
+            cache[name] = Simulator(flatten(name, chips))
+        cache[name].state = [0] * len(cache[name].state)
+        return cache[name]
+
+    return simulator
+
+
+def alu(x, y, zx, nx, zy, ny, f, no):
+    """Compute the ALU outputs like the specification of project 2."""
+    if zx:
+        x = 0
+    if nx:
+        x = ~x & MASK
+    if zy:
+        y = 0
+    if ny:
+        y = ~y & MASK
+    out = (x + y if f else x & y) & MASK
+    if no:
+        out = ~out & MASK
+    return {"out": out, "zr": int(out == 0), "ng": out >> 15}
+
+
+@pytest.mark.parametrize("name, reference", [
+    ("Not", lambda i: {"out": 1 - i["in"]}),
+    ("And", lambda i: {"out": i["a"] & i["b"]}),
+    ("Or", lambda i: {"out": i["a"] | i["b"]}),
+    ("Xor", lambda i: {"out": i["a"] ^ i["b"]}),
+    ("Mux", lambda i: {"out": i["b"] if i["sel"] else i["a"]}),
+    ("DMux", lambda i: {"a": i["in"] & (1 - i["sel"]), "b": i["in"] & i["sel"]}),
+    ("HalfAdder", lambda i: {"sum": i["a"] ^ i["b"], "carry": i["a"] & i["b"]}),
+    ("FullAdder", lambda i: {
+        "sum": (i["a"] + i["b"] + i["c"]) & 1, "carry": (i["a"] + i["b"] + i["c"]) >> 1
+    }),
+    ("DMux8Way", lambda i: {
+        pin: i["in"] * (i["sel"] == index) for index, pin in enumerate("abcdefgh")
+    }),
+    ("Or8Way", lambda i: {"out": int(i["in"] != 0)}),
+])
+def test_should_match_truth_tables(simulators, name, reference):
+    simulator = simulators(name)
+    pins = simulator.netlist.inputs
+    for values in itertools.product(*(range(1 << len(nets)) for nets in pins.values())):
+        inputs = dict(zip(pins, values))
+        assert simulator.evaluate(**inputs) == reference(inputs), inputs
+
+
+@pytest.mark.parametrize("name, reference", [
+    ("Add16", lambda i: {"out": (i["a"] + i["b"]) & MASK}),
+    ("Inc16", lambda i: {"out": (i["in"] + 1) & MASK}),
+    ("And16", lambda i: {"out": i["a"] & i["b"]}),
+    ("Mux8Way16", lambda i: {"out": i["abcdefgh"[i["sel"]]]}),
+    ("ALU", lambda i: alu(**i)),
+])
+def test_should_match_random_vectors(simulators, name, reference):
+    simulator = simulators(name)
+    pins = simulator.netlist.inputs
+    for values in random_vectors(simulator.netlist, 300, seed=1):
+        inputs = dict(zip(pins, values))
+        assert simulator.evaluate(**inputs) == reference(inputs), inputs
+
+
+def test_should_clock_registers(simulators):
+    register = simulators("Register")
+    assert register.tick(**{"in": 1234, "load": 1}) == {"out": 1234}
+    assert register.evaluate(**{"in": 99, "load": 1}) == {"out": 1234}
+    assert register.tick(**{"in": 99, "load": 0}) == {"out": 1234}
+    assert register.tick(**{"in": -1, "load": 1}) == {"out": MASK}
+
+
+def test_should_count_with_program_counter(simulators):
+    pc = simulators("PC")
+    outputs = [pc.tick(inc=1)["out"] for _ in range(3)]
+    outputs.append(pc.tick(**{"in": 100, "load": 1, "inc": 1})["out"])
+    outputs.append(pc.tick(inc=1, reset=1)["out"])
+    assert outputs == [1, 2, 3, 100, 0]
+
+
+def test_should_execute_program_on_cpu(simulators):
+    # RAM[0] = 2 + 3, RAM[1] = RAM[0] - 1, then jump back to the start if RAM[1] > 0
+    rom = [
+        0b0000000000000010,  # @2
+        0b1110110000010000,  # D=A
+        0b0000000000000011,  # @3
+        0b1110000010010000,  # D=D+A
+        0b0000000000000000,  # @0
+        0b1110001100001000,  # M=D
+        0b1111110010010000,  # D=M-1
+        0b0000000000000001,  # @1
+        0b1110001100001000,  # M=D
+        0b0000000000001001,  # @9
+        0b1110101010000111,  # 0;JMP
+    ]
+    cpu = simulators("CPU")
+    ram = [0] * 16
+    pc = 0
+    for _ in range(30):
+        instruction = rom[pc]
+        address = cpu.evaluate(instruction=instruction)["addressM"]
+        inputs = {"instruction": instruction, "inM": ram[address % 16]}
+        outputs = cpu.evaluate(**inputs)
+        if outputs["writeM"]:
+            ram[address % 16] = outputs["outM"]
+        pc = cpu.tick(**inputs)["pc"]
+    assert ram[:2] == [5, 4]
+    assert pc in (9, 10)
+
+
+def test_should_reject_unknown_pin(simulators):
+    with pytest.raises(ValueError):
+        simulators("Not").evaluate(a=1)
+
+
+def test_should_measure_vectors_per_second(simulators):
+    simulator = simulators("ALU")
+    assert benchmark(simulator, random_vectors(simulator.netlist, 10)) > 0
@@ -2,11 +2,23 @@
 
 from __future__ import annotations
 
+import mmap
+import pathlib
 import re
+import sys
+import time
 from abc import ABC
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from itertools import permutations, product
+from typing import TextIO
 
 import lookup
+import optimizer
+import regions
+import rom
 
 
 class Instruction(ABC):
@@ -28,6 +40,10 @@ class AInstruction(Instruction):
           """Return the binary representation of the A-instruction."""
           return f"{self.opcode}{self.address:015b}"
 
+    def __int__(self):
+        """Return the 16-bit machine code of the A-instruction."""
+        return self.opcode << 15 | self.address
+
 
 @dataclass
 class CInstruction(Instruction):
@@ -67,14 +83,61 @@ class CInstruction(Instruction):
         j = self.jump
         return f"{o}{s:b}{a}{c:06b}{d:03b}{j:03b}"
 
+    def __int__(self):
+        """Return the 16-bit machine code of the C-instruction."""
+        return (
+            self.opcode << 15
+            | self.stuffing << 13
+            | self.a << 12
+            | self.comp << 6
+            | self.dest << 3
+            | self.jump
+        )
+
+
+def _enumerate_c_instructions() -> dict[str, int]:
+    """Map every canonical spelling of a C-instruction to its machine code."""
+    dests = ["", *("".join(p) for n in (1, 2, 3) for p in permutations("ADM", n))]
+    jumps = ["", *lookup.jump]
+    table: dict[str, int] = {}
+    for comp, dest, jmp in product(lookup.mnemonic, dests, jumps):
+        symbol = f"{dest}={comp}" if dest else comp
+        if jmp:
+            symbol += f";{jmp}"
+        table[symbol] = int(CInstruction.from_symbol(symbol))
+    return table
+
+
+# built once, so the regular expression is only needed for unusual spellings
+C_INSTRUCTIONS = _enumerate_c_instructions()
+
+PSEUDO_CODE = re.compile(r"^\s*([^\s/]+).*?$", flags=re.MULTILINE)
+
 
 def extract_pseudo_code(program: str) -> list[str]:
     """Remove whitespace and comments from the program."""
-    return re.findall(r"^\s*([^\s/]+).*?$", program, flags=re.MULTILINE)
+    return PSEUDO_CODE.findall(program)
+
+
+PSEUDO_CODE_BYTES = re.compile(rb"^\s*([^\s/]+).*?$", flags=re.MULTILINE)
+
+
+def read_pseudo_code(path: str | pathlib.Path) -> Iterator[str]:
+    """Remove whitespace and comments from an asm-file.
+
+    The file is memory-mapped and lexed as bytes, so only the symbols are
+    decoded and the text never has to be held in memory as a whole.
+    """
+    with open(path, mode="rb") as f:
+        if not f.seek(0, 2):
+            return  # empty files can't be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for m in PSEUDO_CODE_BYTES.finditer(buffer):
+                yield m.group(1).decode()
 
 
 def resolve_labels(
-    pseudo_code: list[str],
+    pseudo_code: Iterable[str],
     symbol_table: dict[str, int],
 ) -> list[str]:
     """Remove labels from the program and update the symbol table."""
@@ -106,49 +169,296 @@ def resolve_variables(
         address_offset += 1
 
 
-def preprocess(program: str, symbol_table: dict[str, int]) -> list[str]:
+def preprocess(
+    program: str,
+    symbol_table: dict[str, int],
+    optimize: bool = False,
+) -> list[str]:
     """Prepare the program for assembly."""
     pseudo_code = extract_pseudo_code(program)
-    pure_code = resolve_labels(pseudo_code, symbol_table)
+    return preprocess_pseudo_code(pseudo_code, symbol_table, optimize)
+
+
+def preprocess_pseudo_code(
+    pseudo_code: Iterable[str],
+    symbol_table: dict[str, int],
+    optimize: bool = False,
+) -> list[str]:
+    """Prepare a program without whitespace and comments for assembly."""
+    if optimize:
+        pseudo_code = optimizer.optimize(list(pseudo_code))
+    labels: dict[str, int] = {}
+    pure_code = resolve_labels(pseudo_code, labels)
+    regions.check_budget(labels, len(pure_code))
+    symbol_table.update(labels)
     resolve_variables(pure_code, symbol_table)
     return pure_code
 
 
-def assemble(program: str) -> str:
+def assemble(program: str, optimize: bool = False) -> str:
     """Convert Hack assembly code to machine code."""
-    assembled: list[str] = []
+    words = assemble_words(program, optimize)
+    return "\n".join(f"{word:016b}" for word in words)
+
+
+def encode(symbol: str, symbol_table: dict[str, int]) -> int:
+    """Convert a single instruction to its 16-bit machine code."""
+    if (word := C_INSTRUCTIONS.get(symbol)) is not None:
+        return word
+    if not symbol.startswith("@"):
+        # fall back to parsing for error reporting and unusual spellings
+        return int(CInstruction.from_symbol(symbol))
+    if symbol[1:].isnumeric():
+        return int(symbol[1:])
+    return symbol_table[symbol[1:]]
+
+
+def encode_words(
+    pure_code: list[str],
+    symbol_table: dict[str, int],
+) -> array[int]:
+    """Encode a sequence of instructions without labels."""
+    return array("H", [encode(symbol, symbol_table) for symbol in pure_code])
+
+
+def assemble_words(
+    program: str,
+    optimize: bool = False,
+) -> array[int]:
+    """Convert Hack assembly code to a buffer of unsigned 16-bit words."""
     symbol_table = lookup.predefined.copy()
-    pure_code = preprocess(program, symbol_table)
-    token: Instruction
+    pure_code = preprocess(program, symbol_table, optimize)
+    return encode_words(pure_code, symbol_table)
 
-    for symbol in pure_code:
-        if symbol.startswith("@") and symbol[1:].isnumeric():
-            token = AInstruction.from_symbol(symbol)
-        elif symbol.startswith("@"):
-            token = AInstruction(symbol_table[symbol[1:]])
+
+def assemble_with_labels(
+    program: str,
+    optimize: bool = False,
+) -> tuple[array[int], dict[str, int]]:
+    """Convert Hack assembly code to words and keep the addresses of labels."""
+    pseudo_code = extract_pseudo_code(program)
+    if optimize:
+        pseudo_code = optimizer.optimize(pseudo_code)
+    symbol_table = lookup.predefined.copy()
+    pure_code = preprocess_pseudo_code(pseudo_code, symbol_table)
+    labels = {
+        symbol[1:-1]: symbol_table[symbol[1:-1]]
+        for symbol in pseudo_code
+        if symbol.startswith("(")
+    }
+    return encode_words(pure_code, symbol_table), labels
+
+
+def assemble_path(
+    path: str | pathlib.Path,
+    optimize: bool = False,
+) -> array[int]:
+    """Convert an asm-file to a buffer of unsigned 16-bit words."""
+    symbol_table = lookup.predefined.copy()
+    pseudo_code = read_pseudo_code(path)
+    pure_code = preprocess_pseudo_code(pseudo_code, symbol_table, optimize)
+    return encode_words(pure_code, symbol_table)
+
+
+def assemble_stream(lines: Iterable[str], f_out: TextIO) -> int:
+    """Convert Hack assembly code to machine code in a single pass.
+
+    Lines are read one at a time and every instruction is written as soon as
+    it is encoded. A-instructions referring to symbols not yet known are
+    written as placeholders and recorded in a fixup table, which is patched
+    once the whole program has been read. Memory is thus bounded by the number
+    of symbols and references to them rather than by the program length.
+
+    The output file must be seekable. Returns the number of instructions.
+    """
+    symbol_table = lookup.predefined.copy()
+    fixups: dict[str, list[int]] = {}
+    line_number = 0
+
+    for line in lines:
+        if not (m := PSEUDO_CODE.match(line)):
+            continue
+        symbol = m.group(1)
+
+        if symbol.startswith("("):
+            symbol_table[symbol[1:-1]] = line_number
+            continue
+
+        if line_number:
+            f_out.write("\n")
+
+        name = symbol[1:]
+        if symbol.startswith("@") and not name.isnumeric() and (
+            name not in symbol_table
+        ):
+            # forward reference: either a label defined later or a variable
+            fixups.setdefault(name, []).append(f_out.tell())
+            word = 0
         else:
-            token = CInstruction.from_symbol(symbol)
-        assembled.append(str(token))
-    return "\n".join(assembled)
+            word = encode(symbol, symbol_table)
+        f_out.write(f"{word:016b}")
+        line_number += 1
+
+    if line_number > lookup.ROM_SIZE:
+        labels = {
+            name: address
+            for name, address in symbol_table.items()
+            if name not in lookup.predefined
+        }
+        regions.check_budget(labels, line_number)
+
+    # symbols never defined as labels are variables, allocated in order of
+    # their first appearance just like `resolve_variables` does
+    end = f_out.tell()
+    address_offset = 16
+    for name, positions in fixups.items():
+        if name in symbol_table:
+            address = symbol_table[name]
+        else:
+            address = address_offset
+            address_offset += 1
+        patch = f"{address:016b}"
+        for position in positions:
+            f_out.seek(position)
+            f_out.write(patch)
+    f_out.seek(end)
 
+    return line_number
 
-if __name__ == "__main__":
-    import pathlib
-    import sys
 
-    # first user provided argument is either a file or a directory of asm-files
-    user_input = pathlib.Path(sys.argv[1])
+def assemble_file(
+    asm_file: pathlib.Path,
+    binary: bool = False,
+    optimize: bool = False,
+) -> int:
+    """Assemble a single file next to its source.
 
-    if not user_input.exists():
-        raise FileNotFoundError(f"{user_input} not found")
+    Return the number of instructions written.
+    """
+    hack_file = asm_file.with_suffix(rom.SUFFIX if binary else ".hack")
 
-    if user_input.is_dir():
-        asm_files = list(user_input.glob("*.asm"))
+    if not (binary or optimize):
+        with asm_file.open() as f_in, hack_file.open(mode="w") as f_out:
+            return assemble_stream(f_in, f_out)
+
+    words = assemble_path(asm_file, optimize=optimize)
+    if binary:
+        with hack_file.open(mode="wb") as f_out:
+            rom.write(words, f_out)
+    else:
+        with hack_file.open(mode="w") as f_out:
+            f_out.write("\n".join(f"{word:016b}" for word in words))
+    return len(words)
+
+
+def _timed_assemble_file(
+    asm_file: pathlib.Path,
+    binary: bool,
+    optimize: bool,
+) -> tuple[int, int, float]:
+    """Assemble a single file and measure the elapsed time.
+
+    Return the number of instructions before and after optimization as well.
+    """
+    start = time.perf_counter()
+    count = assemble_file(asm_file, binary, optimize)
+    elapsed = time.perf_counter() - start
+    if optimize:
+        before = optimizer.count_instructions(read_pseudo_code(asm_file))
+        return before, count, elapsed
+    return count, count, elapsed
+
+
+def main(
+    user_input: str,
+    binary: bool = False,
+    jobs: int = 1,
+    optimize: bool = False,
+) -> int:
+    """Main entry point. Assemble a file or a directory of asm-files.
+
+    Files are assembled concurrently if more than one job is requested. A
+    failing file doesn't stop the others; it is reported in the summary and
+    causes a nonzero return value.
+    """
+    path = pathlib.Path(user_input)
+
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found")
+
+    if path.is_dir():
+        asm_files = sorted(path.glob("*.asm"))
+    else:
+        asm_files = [path]
+
+    results: dict[pathlib.Path, tuple[int, int, float] | Exception] = {}
+    if jobs > 1 and len(asm_files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                asm_file: executor.submit(
+                    _timed_assemble_file, asm_file, binary, optimize
+                )
+                for asm_file in asm_files
+            }
+            for asm_file, future in futures.items():
+                try:
+                    results[asm_file] = future.result()
+                except Exception as e:
+                    results[asm_file] = e
     else:
-        asm_files = [user_input]
+        for asm_file in asm_files:
+            try:
+                results[asm_file] = _timed_assemble_file(
+                    asm_file, binary, optimize
+                )
+            except Exception as e:
+                results[asm_file] = e
+
+    # summary in input order, independent of completion order
+    width = max((len(asm_file.name) for asm_file in asm_files), default=0)
+    total = failed = 0
+    for asm_file, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            error = f"{type(result).__name__}: {result}"
+            print(f"{asm_file.name:<{width}}  FAILED  {error}")
+            continue
+        before, count, elapsed = result
+        total += count
+        line = f"{asm_file.name:<{width}}  {count:>8} instructions  {elapsed:.3f}s"
+        if optimize:
+            line += f"  ({before} before optimization)"
+        print(line)
+    print(
+        f"{len(asm_files)} files, {len(asm_files) - failed} assembled, "
+        f"{failed} failed, {total} instructions"
+    )
+    return 1 if failed else 0
 
-    for asm_file in asm_files:
-        hack_file = asm_file.with_suffix(".hack")
 
-        with asm_file.open() as f_in, hack_file.open(mode="w") as f_out:
-            f_out.write(assemble(f_in.read()))
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help="asm-file or directory of asm-files")
+    arg_parser.add_argument(
+        "--binary",
+        action="store_true",
+        help=f"write a packed binary ROM image ({rom.SUFFIX}) instead of text",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of files to assemble concurrently",
+    )
+    arg_parser.add_argument(
+        "-O",
+        "--optimize",
+        action="store_true",
+        help="apply peephole optimizations and remove unreachable code",
+    )
+    args = arg_parser.parse_args()
+
+    sys.exit(main(args.path, args.binary, args.jobs, args.optimize))
@@ -0,0 +1,200 @@
+"""Benchmark the snake game running on the compiled OS with scripted input.
+
+The Jack classes are compiled by the compiler of projects 10 and 11 and
+translated by the VM translator of projects 7 and 8, then assembled and run
+headless for a number of frames. Every frame is a call of `Game.draw`, which
+draws pixel by pixel through the OS and takes hundreds of millions of cycles.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pathlib
+import sys
+import tempfile
+import time
+from array import array
+
+import lookup
+from assembler import assemble_with_labels
+from emulator import Emulator
+from replay import Event, Replay
+from telemetry import HEAP, HEAP_SIZE, Telemetry
+from toolchain import OS, ROOT, vm_translator
+
+SNAKE = ROOT / "project-09-high-level-language" / "snake"
+
+SCREEN = lookup.predefined["SCREEN"]
+KBD = lookup.predefined["KBD"]
+FRAME_FUNCTION = "Game.draw"
+
+# hold the key to start playing until the first frame, then steer the snake
+SNAKE_EVENTS = [
+    Event(0, ord("p")),
+    Event(1, 0, in_frames=True),
+    Event(2, 131, in_frames=True),  # up
+    Event(3, 130, in_frames=True),  # left
+    Event(4, 133, in_frames=True),  # down
+    Event(5, 132, in_frames=True),  # right
+]
+
+
+def compile_jack(*directories: pathlib.Path) -> str:
+    """Compile the Jack classes of all directories to one Hack assembly program."""
+    from analyzer import analyze  # type: ignore[import-not-found]
+
+    Parser, CodeWriter = vm_translator()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vm_directory = pathlib.Path(tmp)
+        for directory in directories:
+            for jack_file in sorted(directory.glob("*.jack")):
+                _, _, vm_code = analyze(jack_file.read_text())
+                vm_file = vm_directory / jack_file.with_suffix(".vm").name
+                vm_file.write_text("\n".join(vm_code))
+
+        # calls and returns inlined everywhere would exceed the ROM
+        code_writer = CodeWriter(shared_calls=True)
+        asm_code = code_writer.bootstrap()
+        for vm_file in sorted(vm_directory.glob("*.vm")):
+            for command in Parser(str(vm_file)).commands:
+                asm_code.extend(code_writer.write(command))
+    return "\n".join(asm_code)
+
+
+def heap_high_water(emulator: Emulator) -> int:
+    """Count the words carved from the initial heap segment.
+
+    `Memory.alloc` carves every block from the tail of the first free segment
+    large enough, which may also be a freed block further down the list.
+    `Memory.deAlloc` appends blocks to the list without merging them, so the
+    initial segment never grows back and the words carved from it bound
+    everything ever allocated at once, headers included.
+    """
+    return HEAP_SIZE - emulator.ram[HEAP + 1]
+
+
+def screen_checksum(emulator: Emulator) -> str:
+    """Hash the screen memory map in little-endian byte order."""
+    screen_map = memoryview(emulator.ram)[SCREEN:KBD]
+    screen = array("h", bytes(screen_map))
+    if sys.byteorder == "big":
+        screen.byteswap()
+    return hashlib.sha256(screen.tobytes()).hexdigest()[:16]
+
+
+def load_snake(events: list[Event] | None = None) -> tuple[Replay, dict[str, int]]:
+    """Compile the snake game and prepare replaying key events into it."""
+    # the unoptimized OS and game exceed the ROM
+    words, labels = assemble_with_labels(compile_jack(OS, SNAKE), optimize=True)
+    replay = Replay(
+        Emulator(words),
+        SNAKE_EVENTS if events is None else events,
+        labels[FRAME_FUNCTION],
+    )
+    return replay, labels
+
+
+def measure(
+    replay: Replay,
+    frames: int,
+    cycles: int | None = None,
+    telemetry: Telemetry | None = None,
+) -> dict[str, int | float | str]:
+    """Run and measure a replay for a number of frames.
+
+    `cycles` additionally limits the run, e.g. for a quick check. With
+    `telemetry`, the run pauses for a sample at every interval.
+    """
+    emulator = replay.emulator
+    start = time.perf_counter()
+    if telemetry is None:
+        replay.run(cycles, frames)
+    else:
+        end_frame = replay.frames + frames
+        end = None if cycles is None else emulator.cycles + cycles
+        while not emulator.halted and replay.frames < end_frame:
+            budget = telemetry.interval
+            if end is not None:
+                budget = min(budget, end - emulator.cycles)
+            if budget <= 0:
+                break
+            replay.run(budget, end_frame - replay.frames)
+            telemetry.sample()
+    elapsed = time.perf_counter() - start
+
+    results: dict[str, int | float | str] = {
+        "frames": replay.frames,
+        "cycles": emulator.cycles,
+        "seconds": elapsed,
+        "cycles/s": emulator.cycles / elapsed,
+        "heap high-water": heap_high_water(emulator),
+        "screen": screen_checksum(emulator),
+    }
+    if telemetry is not None:
+        results["SP high-water"] = telemetry.sp_high_water
+    return results
+
+
+def run_snake(
+    frames: int,
+    events: list[Event] | None = None,
+    cycles: int | None = None,
+) -> dict[str, int | float | str]:
+    """Compile, run and measure the snake game for a number of frames."""
+    replay, _ = load_snake(events)
+    return measure(replay, frames, cycles)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from replay import load_events
+    from telemetry import format_depths, write_csv
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "-f", "--frames", type=int, default=2, help="number of frames to run"
+    )
+    arg_parser.add_argument(
+        "-n", "--cycles", type=int, help="maximum number of instructions to execute"
+    )
+    arg_parser.add_argument(
+        "--events", type=pathlib.Path, help="script of key events to replay"
+    )
+    arg_parser.add_argument(
+        "--telemetry",
+        type=pathlib.Path,
+        help="record a time series of the stack and heap (.csv)",
+    )
+    arg_parser.add_argument(
+        "-i",
+        "--interval",
+        type=int,
+        default=1_000_000,
+        help="number of instructions between telemetry samples",
+    )
+    arg_parser.add_argument(
+        "--paint",
+        action="store_true",
+        help="fill the unused stack for an exact SP high-water mark",
+    )
+    args = arg_parser.parse_args()
+
+    events = load_events(args.events) if args.events else None
+    replay, labels = load_snake(events)
+    telemetry = None
+    if args.telemetry:
+        telemetry = Telemetry(
+            replay.emulator, labels, args.interval, args.paint
+        )
+    for name, value in measure(replay, args.frames, args.cycles, telemetry).items():
+        if isinstance(value, float):
+            print(f"{name:>16}  {value:,.3f}")
+        else:
+            print(f"{name:>16}  {value}")
+
+    if telemetry is not None:
+        with args.telemetry.open(mode="w", newline="") as f_out:
+            write_csv(telemetry.samples, f_out)
+        print(format_depths(telemetry.max_depth, 10))
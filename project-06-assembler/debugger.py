@@ -0,0 +1,212 @@
+"""Stop Hack programs at breakpoints and watched RAM writes."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import lookup
+from emulator import Emulator
+
+BREAKPOINT = "breakpoint"
+WATCHPOINT = "watchpoint"
+
+
+@dataclass(frozen=True)
+class Stop:
+    """Why execution stopped.
+
+    At a breakpoint, `pc` is the instruction about to be executed. At a
+    watchpoint, the store at `pc` has been executed and changed `address`
+    from `old` to `new`.
+    """
+    reason: str
+    pc: int
+    address: int | None = None
+    old: int | None = None
+    new: int | None = None
+
+
+def is_jump(word: int) -> bool:
+    """Check whether an instruction may continue anywhere but at the next one."""
+    return bool(word & 0x8000 and word & 0b111)
+
+
+class Debugger(Emulator):
+    """Execute Hack machine code with breakpoints and watchpoints.
+
+    Checking every instruction for breakpoints makes the interpreter several
+    times slower, so execution alternates between two loops. The fast loop
+    is the interpreter of `run`, which only looks up the PC in a bitmap of
+    the basic blocks containing a breakpoint, from the last jump in front of
+    the breakpoint up to it. Stores look up their address in a bitmap of the
+    watched RAM, but only while anything is watched. Entering a marked block
+    or storing to a watched word switches to the instrumented loop, which
+    checks every instruction until execution leaves the marked blocks again.
+    """
+
+    def __init__(self, words: Sequence[int], labels: dict[str, int] | None = None):
+        super().__init__(words)
+        self.labels = labels or {}
+        self.breakpoints: set[int] = set()
+        # why the last run stopped early, None for halting or the cycle limit
+        self.stop: Stop | None = None
+        self._entries = bytearray(lookup.ROM_SIZE)
+        self._watched = bytearray(lookup.RAM_SIZE)
+        self._watching = False
+        # breakpoint execution continues from
+        self._resume: int | None = None
+
+    def _resolve(self, location: int | str, symbols: dict[str, int]) -> int:
+        """Look up the address of a symbol."""
+        if isinstance(location, int):
+            return location
+        if location not in symbols:
+            raise ValueError(f"Unknown symbol: {location!r}")
+        return symbols[location]
+
+    def _mark_entries(self) -> None:
+        """Mark the instructions from which each breakpoint is reached directly."""
+        self._entries[:] = bytes(lookup.ROM_SIZE)
+        for breakpoint in self.breakpoints:
+            address = breakpoint
+            self._entries[address] = 1
+            while address > 0 and not is_jump(self.rom[address - 1]):
+                address -= 1
+                self._entries[address] = 1
+
+    def add_breakpoint(self, location: int | str) -> int:
+        """Stop before executing the instruction at an address or label."""
+        address = self._resolve(location, self.labels)
+        if not 0 <= address < lookup.ROM_SIZE:
+            raise ValueError(f"Breakpoint outside of the ROM: {address}")
+        self.breakpoints.add(address)
+        self._mark_entries()
+        return address
+
+    def remove_breakpoint(self, location: int | str) -> None:
+        """Remove the breakpoint at an address or label."""
+        self.breakpoints.discard(self._resolve(location, self.labels))
+        self._mark_entries()
+
+    def watch(self, location: int | str, length: int = 1) -> None:
+        """Stop after a store to `length` words from an address or symbol."""
+        start = self._resolve(location, lookup.predefined)
+        if not 0 <= start < start + length <= lookup.RAM_SIZE:
+            raise ValueError(f"Watched range outside of the RAM: {start}+{length}")
+        self._watched[start:start + length] = b"\x01" * length
+        self._watching = True
+
+    def unwatch(self, location: int | str, length: int = 1) -> None:
+        """Stop watching `length` words from an address or symbol."""
+        start = self._resolve(location, lookup.predefined)
+        self._watched[start:start + length] = bytes(length)
+        self._watching = any(self._watched)
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run.
+
+        Execution stops early at breakpoints and watchpoints, telling why in
+        `stop`. Running again continues behind it.
+        """
+        self.stop = None
+        remaining = cycles
+        instrument = bool(self._entries[self.pc])
+        while remaining > 0 and not self.halted and self.stop is None:
+            if instrument:
+                remaining -= self._run_instrumented(remaining)
+            else:
+                remaining -= self._run_fast(remaining)
+            instrument = not instrument
+        return cycles - remaining
+
+    def _run_instrumented(self, cycles: int) -> int:
+        """Check every instruction until leaving the marked blocks."""
+        program = self._program
+        ram = self.ram
+        executed = 0
+        while executed < cycles and not self.halted:
+            pc = self.pc
+            if pc in self.breakpoints and pc != self._resume:
+                self.stop = Stop(BREAKPOINT, pc)
+                self._resume = pc
+                break
+            self._resume = None
+
+            fn, _, dest, _ = program[pc]
+            address = self.a
+            watched = fn is not None and dest & 0b001 and self._watched[address]
+            old = ram[address]
+            executed += Emulator.run(self, 1)
+            if watched:
+                self.stop = Stop(WATCHPOINT, pc, address, old, ram[address])
+                break
+            if not self._entries[self.pc]:
+                break
+        return executed
+
+    def _run_fast(self, cycles: int) -> int:
+        """Execute without checks until entering a marked block or watched store."""
+        watched = self._watched if self._watching else None
+        return self.run_until_marked(cycles, self._entries, watched)
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+
+    from assembler import assemble_with_labels
+
+    def watch_range(text: str) -> tuple[int | str, int]:
+        """Parse `ADDRESS` or `ADDRESS:LENGTH`, the address may be a symbol."""
+        location, _, length = text.partition(":")
+        start = int(location) if location.isnumeric() else location
+        return start, int(length or 1)
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", type=pathlib.Path, help="asm-file")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    arg_parser.add_argument(
+        "-b",
+        "--breakpoint",
+        action="append",
+        default=[],
+        help="label or ROM address to stop at",
+    )
+    arg_parser.add_argument(
+        "-w",
+        "--watch",
+        type=watch_range,
+        action="append",
+        default=[],
+        help="RAM address or symbol, optionally followed by :LENGTH",
+    )
+    arg_parser.add_argument(
+        "--stops", type=int, default=10, help="maximum number of stops to show"
+    )
+    args = arg_parser.parse_args()
+
+    words, labels = assemble_with_labels(args.path.read_text())
+    debugger = Debugger(words, labels)
+    for location in args.breakpoint:
+        debugger.add_breakpoint(int(location) if location.isnumeric() else location)
+    for start, length in args.watch:
+        debugger.watch(start, length)
+
+    remaining = args.cycles
+    for _ in range(args.stops):
+        remaining -= debugger.run(remaining)
+        if debugger.stop is None:
+            break
+        print(
+            f"{debugger.cycles:>12}  {debugger.stop}  "
+            f"A={debugger.a} D={debugger.d}"
+        )
+    state = "halted" if debugger.halted else f"PC={debugger.pc}"
+    print(f"{debugger.cycles:>12}  {state}")
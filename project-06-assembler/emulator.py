@@ -0,0 +1,335 @@
+"""Emulate the Hack computer executing machine code."""
+
+from __future__ import annotations
+
+import pathlib
+import time
+from array import array
+from collections.abc import Callable, Sequence
+
+import lookup
+import rom
+
+ALUFunction = Callable[[int, int], int]
+# predecoded instruction: (ALU function, y is M, dest mask, jump conditions);
+# A-instructions have no ALU function and carry their value instead
+Operation = tuple[ALUFunction | None, int, int, tuple[bool, bool, bool] | None]
+# called for every jump taken with (PC, target, cycles including the jump)
+JumpHook = Callable[[int, int, int], bool]
+# called after every instruction with (PC, A, D, address written or -1, value)
+StepHook = Callable[[tuple[int, int, int, int, int]], object]
+# bitmap of ROM addresses marking none of them
+NOWHERE = bytes(lookup.ROM_SIZE)
+
+
+def wrap(value: int) -> int:
+    """Wrap an integer to a signed 16-bit word."""
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+def alu(comp: int) -> ALUFunction:
+    """Build a function computing x (= D) and y (= A or M) like the ALU.
+
+    The control bits of the comp-field are zx, nx, zy, ny, f, no.
+    """
+    zx, nx, zy, ny, f, no = (bool(comp & (1 << bit)) for bit in range(5, -1, -1))
+
+    def compute(x: int, y: int) -> int:
+        if zx:
+            x = 0
+        if nx:
+            x = ~x
+        if zy:
+            y = 0
+        if ny:
+            y = ~y
+        out = x + y if f else x & y
+        if no:
+            out = ~out
+        return wrap(out)
+
+    return compute
+
+
+# specialized versions of the documented computations
+ALU_FUNCTIONS: dict[int, ALUFunction] = {
+    0b101010: lambda x, y: 0,
+    0b111111: lambda x, y: 1,
+    0b111010: lambda x, y: -1,
+    0b001100: lambda x, y: x,
+    0b110000: lambda x, y: y,
+    0b001101: lambda x, y: ~x,
+    0b110001: lambda x, y: ~y,
+    0b001111: lambda x, y: wrap(-x),
+    0b110011: lambda x, y: wrap(-y),
+    0b011111: lambda x, y: wrap(x + 1),
+    0b110111: lambda x, y: wrap(y + 1),
+    0b001110: lambda x, y: wrap(x - 1),
+    0b110010: lambda x, y: wrap(y - 1),
+    0b000010: lambda x, y: wrap(x + y),
+    0b010011: lambda x, y: wrap(x - y),
+    0b000111: lambda x, y: wrap(y - x),
+    0b000000: lambda x, y: x & y,
+    0b010101: lambda x, y: x | y,
+}
+ALU = [ALU_FUNCTIONS.get(comp) or alu(comp) for comp in range(64)]
+
+# jump conditions for a negative, zero and positive result
+JUMPS = [
+    None if jump == 0 else (bool(jump & 0b100), bool(jump & 0b010), bool(jump & 0b001))
+    for jump in range(8)
+]
+
+
+def decode(word: int) -> Operation:
+    """Split a machine word into the parts needed to execute it."""
+    if not word & 0x8000:
+        return (None, word, 0, None)
+    return (
+        ALU[(word >> 6) & 0b111111],
+        (word >> 12) & 1,
+        (word >> 3) & 0b111,
+        JUMPS[word & 0b111],
+    )
+
+
+def find_halts(words: Sequence[int]) -> set[int]:
+    """Find the jumps of the `(END) @END 0;JMP` idiom ending a program."""
+    return {
+        pc
+        for pc in range(1, len(words))
+        if words[pc - 1] == pc - 1
+        and words[pc] & 0xE03F == 0xE007  # no dest, unconditional jump
+    }
+
+
+class Emulator:
+    """Execute Hack machine code on a 32K word RAM."""
+
+    a: int
+    d: int
+    pc: int
+    cycles: int
+    halted: bool
+
+    def __init__(self, words: Sequence[int]):
+        if len(words) > lookup.ROM_SIZE:
+            raise ValueError(f"Program of {len(words)} words exceeds the ROM")
+        self.rom = array("H", words)
+        # any buffer of signed words, e.g. shared with another process
+        self.ram: array[int] | memoryview = array("h", bytes(2 * lookup.RAM_SIZE))
+        self.a = 0
+        self.d = 0
+        self.pc = 0
+        self.cycles = 0
+        self.halted = False
+        # the empty part of the ROM contains zeros, i.e. `@0`
+        self._program = [decode(word) for word in self.rom]
+        self._program += [decode(0)] * (lookup.ROM_SIZE - len(self.rom))
+        self._halts = find_halts(self.rom)
+
+    @classmethod
+    def from_file(cls, path: str | pathlib.Path) -> Emulator:
+        """Load a program from a `.hack` file or a binary ROM image."""
+        return cls(rom.load(path))
+
+    def reset(self) -> None:
+        """Restart the program without clearing the RAM."""
+        self.pc = 0
+        self.halted = False
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run.
+
+        Execution stops early once the program reaches its final infinite
+        loop, which sets `halted`.
+        """
+        return self.run_until_marked(cycles, NOWHERE)
+
+    def run_until(self, cycles: int, stop: int) -> int:
+        """Execute up to `cycles` instructions, stopping when PC is `stop`.
+
+        At least one instruction is executed, so calling it again continues
+        to the next time `stop` is reached. Return how many were run.
+        """
+        stops = bytearray(lookup.ROM_SIZE)
+        stops[stop] = 1
+        return self.run_until_marked(cycles, stops)
+
+    def run_until_marked(  # noqa: PLR0912
+        self,
+        cycles: int,
+        stops: Sequence[int],
+        watched: Sequence[int] | None = None,
+    ) -> int:
+        """Execute up to `cycles` instructions, stopping at marked addresses.
+
+        Execution stops once the PC reaches an address marked in the bitmap
+        `stops` and in front of a store to a RAM word marked in `watched`,
+        which is left unexecuted. This is the interpreter without any hook,
+        which `run` and `run_until` use as well. Return how many were run.
+        """
+        if self.halted:
+            return 0
+
+        program = self._program
+        halts = self._halts
+        ram = self.ram
+        a, d, pc = self.a, self.d, self.pc
+        remaining = cycles
+
+        while remaining > 0:
+            remaining -= 1
+            fn, y, dest, jump = program[pc]
+            if fn is None:
+                a = y
+                pc = (pc + 1) & 0x7FFF
+            else:
+                address = a
+                out = fn(d, ram[address] if y else address)
+                if dest:
+                    if dest & 0b001:
+                        if watched is not None and watched[address]:
+                            remaining += 1
+                            break
+                        ram[address] = out
+                    if dest & 0b010:
+                        d = out
+                    if dest & 0b100:
+                        a = out
+
+                if jump is not None and jump[0 if out < 0 else 1 if out == 0 else 2]:
+                    if address == pc - 1 and pc in halts:
+                        self.halted = True
+                        break
+                    pc = address & 0x7FFF
+                else:
+                    pc = (pc + 1) & 0x7FFF
+            if stops[pc]:
+                break
+
+        self.a, self.d, self.pc = a, d, pc
+        executed = cycles - remaining
+        self.cycles += executed
+        return executed
+
+    def execute(  # noqa: PLR0912
+        self,
+        cycles: int,
+        *,
+        on_jump: JumpHook | None = None,
+        on_step: StepHook | None = None,
+    ) -> int:
+        """Execute up to `cycles` instructions calling hooks on the way.
+
+        Besides halting, execution stops early at the target of a jump for
+        which `on_jump` returns true. `on_step` receives every instruction
+        executed with the registers after it. Return how many instructions
+        were run.
+
+        This is the loop instrumented emulators share. It is kept apart from
+        `run_until_marked`, since checking the hooks of both in one loop costs
+        every caller about 8%.
+        """
+        if self.halted:
+            return 0
+
+        program = self._program
+        halts = self._halts
+        ram = self.ram
+        a, d, pc = self.a, self.d, self.pc
+        start = self.cycles
+        remaining = cycles
+
+        while remaining > 0:
+            remaining -= 1
+            fn, y, dest, jump = program[pc]
+            if fn is None:
+                a = y
+                if on_step is not None:
+                    on_step((pc, a, d, -1, 0))
+                pc = (pc + 1) & 0x7FFF
+                continue
+
+            address = a
+            out = fn(d, ram[address] if y else address)
+            written, value = -1, 0
+            if dest:
+                if dest & 0b001:
+                    ram[address] = out
+                    written, value = address & 0x7FFF, out
+                if dest & 0b010:
+                    d = out
+                if dest & 0b100:
+                    a = out
+            if on_step is not None:
+                on_step((pc, a, d, written, value))
+
+            if jump is not None and jump[0 if out < 0 else 1 if out == 0 else 2]:
+                if address == pc - 1 and pc in halts:
+                    self.halted = True
+                    break
+                target = address & 0x7FFF
+                cycle = start + cycles - remaining
+                if on_jump is not None and on_jump(pc, target, cycle):
+                    pc = target
+                    break
+                pc = target
+            else:
+                pc = (pc + 1) & 0x7FFF
+
+        self.a, self.d, self.pc = a, d, pc
+        executed = cycles - remaining
+        self.cycles += executed
+        return executed
+
+
+def benchmark(emulator: Emulator, cycles: int) -> float:
+    """Measure the number of executed instructions per second."""
+    start = time.perf_counter()
+    executed = emulator.run(cycles)
+    return executed / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help=f"hack-file or ROM image ({rom.SUFFIX})")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    arg_parser.add_argument(
+        "--turbo",
+        action="store_true",
+        help="execute compiled blocks instead of interpreting instructions",
+    )
+    arg_parser.add_argument(
+        "--fast-forward",
+        action="store_true",
+        help="skip the iterations of loops which only count or wait",
+    )
+    args = arg_parser.parse_args()
+
+    if args.turbo:
+        from turbo import TurboEmulator
+
+        emulator = TurboEmulator.from_file(args.path)
+    elif args.fast_forward:
+        from idle import FastForwardEmulator
+
+        emulator = FastForwardEmulator.from_file(args.path)
+    else:
+        emulator = Emulator.from_file(args.path)
+    start = time.perf_counter()
+    executed = emulator.run(args.cycles)
+    elapsed = time.perf_counter() - start
+
+    print(f"{executed} cycles in {elapsed:.3f}s ({executed / elapsed:,.0f} cycles/s)")
+    print(f"{'halted' if emulator.halted else 'stopped'} at PC={emulator.pc}")
+    print(f"A={emulator.a} D={emulator.d}")
+    print("RAM[0:16] =", emulator.ram[:16].tolist())
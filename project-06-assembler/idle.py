@@ -0,0 +1,173 @@
+"""Fast-forward loops of Hack programs which only count or wait."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+
+from emulator import Emulator, wrap
+
+# number of iterations before a loop is analyzed
+LOOP_THRESHOLD = 8
+# number of iterations before a loop is analyzed again after a failure
+COOLDOWN = 1024
+# maximum number of instructions of one iteration
+MAX_LOOP_LENGTH = 512
+
+# (executed addresses, A of every C-instruction) of one iteration
+Path = tuple[tuple[int, ...], tuple[int, ...]]
+
+
+def is_linear(word: int) -> bool:
+    """Check whether a C-instruction computes an affine function of D and A/M.
+
+    Only `&` and `|` of two variable operands aren't affine modulo 2^16,
+    since negation is `~v = -v - 1`.
+    """
+    comp = (word >> 6) & 0b111111
+    return bool(comp & 0b101010)  # x or y is zeroed, or f adds them
+
+
+def iterations_until_change(out: int, delta: int) -> int | None:
+    """Count the iterations until the sign of `out + n * delta` changes.
+
+    The sign of a computation decides whether its jump is taken, so the path
+    through a loop stays the same for fewer iterations. None means never.
+    """
+    if delta == 0:
+        return None
+    if out == 0:
+        return 1
+    if out > 0:
+        if delta > 0:
+            return (32767 - out) // delta + 1  # wraps around to negative
+        return -(-out // -delta)
+    if delta < 0:
+        return (out + 32768) // -delta + 1  # wraps around to positive
+    return -(out // delta)
+
+
+class FastForwardEmulator(Emulator):
+    """Execute Hack machine code, skipping the iterations of idle loops.
+
+    A loop whose every iteration takes the same path, accesses the same
+    addresses and only uses affine computations changes each register and
+    RAM word by a constant per iteration. Once two iterations show that
+    constant, the remaining iterations are skipped analytically until the
+    sign of a jump condition might change. A busy-waiting loop, e.g. waiting
+    for a key, doesn't change anything and is skipped until the cycle budget
+    runs out, so callers scripting input should run until the next event.
+    Cycle counts and states are the same as executing every instruction.
+    """
+
+    def __init__(self, words: Sequence[int]):
+        super().__init__(words)
+        # number of cycles which were skipped instead of executed
+        self.skipped = 0
+        # iterations of every loop head, i.e. target of a backward jump
+        self._iterations: dict[int, int] = {}
+        self._hot: int | None = None
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run."""
+        start = self.cycles
+        while self.cycles - start < cycles and not self.halted:
+            self._run_until_hot(cycles - (self.cycles - start))
+            head, self._hot = self._hot, None
+            remaining = cycles - (self.cycles - start)
+            if head is not None and remaining and not self._fast_forward(remaining):
+                self._iterations[head] = -COOLDOWN
+        return self.cycles - start
+
+    def _run_until_hot(self, cycles: int) -> None:
+        """Interpret instructions until a loop head becomes hot."""
+        self.execute(cycles, on_jump=self._count_iteration)
+
+    def _count_iteration(self, pc: int, target: int, cycle: int) -> bool:
+        """Count a backward jump as an iteration and tell whether it is hot."""
+        if target > pc:
+            return False
+        count = self._iterations.get(target, 0) + 1
+        self._iterations[target] = count
+        if count >= LOOP_THRESHOLD:
+            self._hot = target
+            return True
+        return False
+
+    def _trace(self, cycles: int) -> tuple[Path, list[int], set[int]] | None:
+        """Execute one iteration of the loop starting at the current PC.
+
+        Return its path, the results of its jumping instructions and the
+        addresses it writes to, or None if the iteration can't be skipped.
+        """
+        head = self.pc
+        addresses: list[int] = []
+        path: list[int] = []
+        outs: list[int] = []
+        writes: set[int] = set()
+        for _ in range(min(cycles, MAX_LOOP_LENGTH)):
+            pc = self.pc
+            fn, y, dest, jump = self._program[pc]
+            if fn is not None:
+                if not is_linear(self.rom[pc]):
+                    return None
+                addresses.append(self.a)
+                if dest & 0b001:
+                    writes.add(self.a & 0x7FFF)
+                if jump is not None:
+                    outs.append(fn(self.d, self.ram[self.a] if y else self.a))
+            path.append(pc)
+            Emulator.run(self, 1)
+            if self.halted:
+                return None
+            if self.pc == head:
+                return (tuple(path), tuple(addresses)), outs, writes
+        return None
+
+    def _fast_forward(self, cycles: int) -> bool:
+        """Skip iterations of the loop at the current PC within `cycles`.
+
+        Two iterations are executed to measure their effect. Return whether
+        the loop turned out to be affine.
+        """
+        start = self.cycles
+        before = (self.a, self.d, array("h", bytes(self.ram)))
+        first = self._trace(cycles)
+        if first is None:
+            return False
+        middle = (self.a, self.d, {w: self.ram[w] for w in first[2]})
+        second = self._trace(cycles - (self.cycles - start))
+        if second is None or second[0] != first[0]:
+            return False
+
+        delta_a = wrap(self.a - middle[0])
+        delta_d = wrap(self.d - middle[1])
+        deltas = {w: wrap(self.ram[w] - value) for w, value in middle[2].items()}
+        same_deltas = (
+            delta_a == wrap(middle[0] - before[0])
+            and delta_d == wrap(middle[1] - before[1])
+            and all(
+                delta == wrap(middle[2][w] - before[2][w])
+                for w, delta in deltas.items()
+            )
+        )
+        if not same_deltas:
+            return False
+
+        # iteration n computes first + n * (second - first), the third is n = 2
+        length = len(first[0][0])
+        safe = (cycles - (self.cycles - start)) // length
+        for out_first, out_second in zip(first[1], second[1], strict=True):
+            change = iterations_until_change(out_first, wrap(out_second - out_first))
+            if change is not None:
+                safe = min(safe, change - 2)
+        if safe > 0:
+            self.a = wrap(self.a + safe * delta_a)
+            self.d = wrap(self.d + safe * delta_d)
+            for w, delta in deltas.items():
+                self.ram[w] = wrap(self.ram[w] + safe * delta)
+            self.cycles += safe * length
+            self.skipped += safe * length
+        # analyze the loop right away when it is entered again
+        self._iterations[self.pc] = LOOP_THRESHOLD - 1
+        return True
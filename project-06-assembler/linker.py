@@ -0,0 +1,179 @@
+"""Assemble relocatable object files and link them into a Hack program."""
+
+from __future__ import annotations
+
+import json
+import pathlib
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import TextIO
+
+import lookup
+import optimizer
+import regions
+from assembler import encode, extract_pseudo_code, resolve_labels
+
+SUFFIX = ".obj"
+
+
+@dataclass
+class ObjectFile:
+    """Machine code of a partial program which still needs to be placed."""
+    words: list[int]
+    # (index of the word, symbol) of every A-instruction referring to a label
+    # or a variable, which is only known during linking
+    relocations: list[tuple[int, str]] = field(default_factory=list)
+    # functions defined in this object, relative to its first word
+    exports: dict[str, int] = field(default_factory=dict)
+    # index of every word holding the address of a label local to this
+    # object, relative to its first word until the object is placed
+    local_relocations: list[int] = field(default_factory=list)
+
+    def dump(self, f_out: TextIO) -> None:
+        """Serialize the object file as JSON."""
+        json.dump(
+            {
+                "words": self.words,
+                "relocations": self.relocations,
+                "exports": self.exports,
+                "local_relocations": self.local_relocations,
+            },
+            f_out,
+        )
+
+    @classmethod
+    def load(cls, f_in: TextIO) -> ObjectFile:
+        """Deserialize an object file from JSON."""
+        content = json.load(f_in)
+        return cls(
+            content["words"],
+            [(index, symbol) for index, symbol in content["relocations"]],
+            content["exports"],
+            content["local_relocations"],
+        )
+
+
+def assemble_object(program: str, optimize: bool = False) -> ObjectFile:
+    """Convert Hack assembly code to a relocatable object file.
+
+    Only the labels of functions and of the shared call and return routines
+    are exported. Labels generated for returns, comparisons and control flow
+    are only unique within one translation, so they are resolved locally.
+    """
+    pseudo_code = extract_pseudo_code(program)
+    if optimize:
+        pseudo_code = optimizer.optimize(pseudo_code)
+    labels: dict[str, int] = {}
+    pure_code = resolve_labels(pseudo_code, labels)
+    exports = {
+        name: offset for name, offset in labels.items() if regions.is_function(name)
+    }
+
+    words: list[int] = []
+    relocations: list[tuple[int, str]] = []
+    local_relocations: list[int] = []
+    for index, symbol in enumerate(pure_code):
+        name = symbol[1:]
+        if not symbol.startswith("@") or name.isnumeric() or name in lookup.predefined:
+            words.append(encode(symbol, lookup.predefined))
+        elif name in labels and name not in exports:
+            local_relocations.append(index)
+            words.append(labels[name])
+        else:
+            relocations.append((index, name))
+            words.append(0)
+    return ObjectFile(words, relocations, exports, local_relocations)
+
+
+def link(objects: Iterable[ObjectFile]) -> array[int]:
+    """Place object files after each other and resolve their symbols.
+
+    Variables are allocated from address 16 in order of their first
+    appearance, so linking the objects of several programs gives the same
+    result as assembling the concatenated programs.
+    """
+    objects = list(objects)
+    labels: dict[str, int] = {}
+    base = 0
+    for obj in objects:
+        for name, offset in obj.exports.items():
+            if name in labels:
+                raise ValueError(f"Duplicate symbol: {name!r}")
+            labels[name] = base + offset
+        base += len(obj.words)
+    regions.check_budget(labels, base)
+
+    symbol_table = lookup.predefined | labels
+
+    words = array("H")
+    address_offset = 16
+    for obj in objects:
+        base = len(words)
+        words.extend(obj.words)
+        for index in obj.local_relocations:
+            words[base + index] += base
+        for index, name in obj.relocations:
+            if name not in symbol_table:
+                symbol_table[name] = address_offset
+                address_offset += 1
+            words[base + index] = symbol_table[name]
+    return words
+
+
+def load_object(path: pathlib.Path, optimize: bool = False) -> ObjectFile:
+    """Load an object file or assemble an asm-file into one."""
+    with path.open() as f_in:
+        if path.suffix == SUFFIX:
+            return ObjectFile.load(f_in)
+        return assemble_object(f_in.read(), optimize)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import rom
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "inputs",
+        nargs="+",
+        type=pathlib.Path,
+        help=f"asm-files or object files ({SUFFIX}) in link order",
+    )
+    arg_parser.add_argument(
+        "-c",
+        "--compile",
+        action="store_true",
+        help="only write an object file next to each asm-file",
+    )
+    arg_parser.add_argument("-o", "--output", type=pathlib.Path, help="linked program")
+    arg_parser.add_argument(
+        "--binary",
+        action="store_true",
+        help=f"write a packed binary ROM image ({rom.SUFFIX}) instead of text",
+    )
+    arg_parser.add_argument(
+        "-O",
+        "--optimize",
+        action="store_true",
+        help="optimize asm-files before assembling them",
+    )
+    args = arg_parser.parse_args()
+
+    objects = [load_object(path, args.optimize) for path in args.inputs]
+
+    if args.compile:
+        for path, obj in zip(args.inputs, objects, strict=True):
+            with path.with_suffix(SUFFIX).open(mode="w") as f_out:
+                obj.dump(f_out)
+    else:
+        suffix = rom.SUFFIX if args.binary else ".hack"
+        output = args.output or args.inputs[-1].with_suffix(suffix)
+        words = link(objects)
+        if args.binary:
+            with output.open(mode="wb") as f_out:
+                rom.write(words, f_out)
+        else:
+            with output.open(mode="w") as f_out:
+                f_out.write("\n".join(f"{word:016b}" for word in words))
@@ -0,0 +1,186 @@
+"""Execute many instances of one Hack program in lockstep with NumPy."""
+
+from __future__ import annotations
+
+import pathlib
+import time
+from collections.abc import Sequence
+
+import lookup
+import numpy as np
+import rom
+from emulator import JUMPS, find_halts
+
+# predecoded instruction: (comp-field, y is M, dest mask, jump conditions);
+# A-instructions have no comp-field and carry their value instead
+Operation = tuple[int | None, int, int, tuple[bool, bool, bool] | None]
+
+
+def alu(comp: int, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Compute x (= D) and y (= A or M) like the ALU for many instances.
+
+    The arrays hold 16-bit words, so additions wrap around like the hardware.
+    """
+    zx, nx, zy, ny, f, no = (bool(comp & (1 << bit)) for bit in range(5, -1, -1))
+    if zx:
+        x = np.zeros_like(x)
+    if nx:
+        x = ~x
+    if zy:
+        y = np.zeros_like(y)
+    if ny:
+        y = ~y
+    out = x + y if f else x & y
+    if no:
+        out = ~out
+    return out
+
+
+def decode(word: int) -> Operation:
+    """Split a machine word into the parts needed to execute it."""
+    if not word & 0x8000:
+        return (None, word, 0, None)
+    return (
+        (word >> 6) & 0b111111,
+        (word >> 12) & 1,
+        (word >> 3) & 0b111,
+        JUMPS[word & 0b111],
+    )
+
+
+class LockstepEmulator:
+    """Execute one program on many independent RAMs at the same time.
+
+    A, D, PC and RAM of all instances are NumPy arrays over the instance axis
+    (the first one). Every step executes the next instruction of each group of
+    instances sharing a PC with vector operations, so instances taking
+    different branches proceed as separate groups until their PCs meet again.
+    """
+
+    def __init__(self, words: Sequence[int], instances: int):
+        if len(words) > lookup.ROM_SIZE:
+            raise ValueError(f"Program of {len(words)} words exceeds the ROM")
+        self.rom = np.array(words, dtype=np.uint16)
+        self.ram = np.zeros((instances, lookup.RAM_SIZE), dtype=np.int16)
+        self.a = np.zeros(instances, dtype=np.int16)
+        self.d = np.zeros(instances, dtype=np.int16)
+        self.pc = np.zeros(instances, dtype=np.int32)
+        self.cycles = np.zeros(instances, dtype=np.int64)
+        self.halted = np.zeros(instances, dtype=bool)
+        # the empty part of the ROM contains zeros, i.e. `@0`
+        self._program = [decode(word) for word in words]
+        self._program += [decode(0)] * (lookup.ROM_SIZE - len(words))
+        self._halts = find_halts(words)
+        self._rows = np.arange(instances)
+
+    @classmethod
+    def from_file(
+        cls, path: str | pathlib.Path, instances: int
+    ) -> LockstepEmulator:
+        """Load a program from a `.hack` file or a binary ROM image."""
+        return cls(rom.load(path), instances)
+
+    @property
+    def instances(self) -> int:
+        """Number of instances executing the program."""
+        return len(self.pc)
+
+    def reset(self) -> None:
+        """Restart all instances without clearing their RAM."""
+        self.pc[:] = 0
+        self.halted[:] = False
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` steps and return how many were run.
+
+        Each step executes one instruction of every instance which hasn't
+        halted yet. Execution stops early once all instances have halted.
+        """
+        for step in range(cycles):
+            if self.halted.any():
+                active = np.flatnonzero(~self.halted)
+                if not active.size:
+                    return step
+            else:
+                active = self._rows
+
+            pcs = self.pc[active]
+            first = pcs[0]
+            if (pcs == first).all():
+                self._execute(int(first), active)
+            else:
+                values, groups = np.unique(pcs, return_inverse=True)
+                for group, pc in enumerate(values.tolist()):
+                    self._execute(pc, active[groups == group])
+            self.cycles[active] += 1
+        return cycles
+
+    def _execute(self, pc: int, rows: np.ndarray) -> None:
+        """Execute the instruction at `pc` for the instances in `rows`."""
+        # slices are much faster than index arrays, if all instances take part
+        index = slice(None) if len(rows) == len(self._rows) else rows
+        comp, y, dest, jump = self._program[pc]
+        following = (pc + 1) & 0x7FFF
+        if comp is None:
+            self.a[index] = y
+            self.pc[index] = following
+            return
+
+        address = self.a[rows]
+        out = alu(comp, self.d[index], self.ram[rows, address] if y else address)
+        if dest & 0b001:
+            self.ram[rows, address] = out
+        if dest & 0b010:
+            self.d[index] = out
+        if dest & 0b100:
+            self.a[index] = out
+
+        if jump is None:
+            self.pc[index] = following
+            return
+        negative, zero, positive = jump
+        taken = np.zeros(len(rows), dtype=bool)
+        if negative:
+            taken |= out < 0
+        if zero:
+            taken |= out == 0
+        if positive:
+            taken |= out > 0
+        next_pc = np.where(taken, address.astype(np.int32) & 0x7FFF, following)
+        if pc in self._halts:
+            halting = taken & (address == pc - 1)
+            next_pc[halting] = pc
+            self.halted[rows[halting]] = True
+        self.pc[index] = next_pc
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help=f"hack-file or ROM image ({rom.SUFFIX})")
+    arg_parser.add_argument(
+        "-k",
+        "--instances",
+        type=int,
+        default=1000,
+        help="number of instances executing the program",
+    )
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=100_000,
+        help="maximum number of steps to execute",
+    )
+    args = arg_parser.parse_args()
+
+    emulator = LockstepEmulator.from_file(args.path, args.instances)
+    start = time.perf_counter()
+    executed = emulator.run(args.cycles)
+    elapsed = time.perf_counter() - start
+
+    total = int(emulator.cycles.sum())
+    print(f"{executed} steps of {args.instances} instances in {elapsed:.3f}s")
+    print(f"{total} cycles ({total / elapsed:,.0f} cycles/s)")
+    print(f"{int(emulator.halted.sum())} instances halted")
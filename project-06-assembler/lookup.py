@@ -55,3 +55,9 @@ predefined = {
 # register R0 - R15
 for i in range(16):
     predefined[f"R{i}"] = i
+
+# size of the instruction memory in words
+ROM_SIZE = 0x8000
+
+# size of the data memory in words, including screen and keyboard
+RAM_SIZE = 0x8000
@@ -0,0 +1,129 @@
+"""Optimize Hack assembly code before labels are resolved."""
+
+from collections.abc import Iterable
+
+import lookup
+
+# pairs of adjacent instructions (same A register) and their replacement
+REWRITES = {
+    ("M=M+1", "AM=M-1"): ["A=M"],
+    ("M=M+1", "MA=M-1"): ["A=M"],
+    ("M=M+1", "M=M-1"): [],
+    ("M=M-1", "M=M+1"): [],
+    ("M=D", "D=M"): ["M=D"],
+    ("D=M", "M=D"): ["D=M"],
+}
+
+
+def count_instructions(pseudo_code: Iterable[str]) -> int:
+    """Count the instructions, i.e. everything except labels."""
+    return sum(not symbol.startswith("(") for symbol in pseudo_code)
+
+
+def _address_key(symbol: str) -> str:
+    """Normalize an A-instruction so aliases like `@SP` and `@0` compare equal."""
+    name = symbol[1:]
+    return str(lookup.predefined.get(name, name))
+
+
+def _is_unconditional_jump(symbol: str) -> bool:
+    """Check whether a C-instruction always jumps."""
+    return symbol.endswith(";JMP")
+
+
+def _writes_a(symbol: str) -> bool:
+    """Check whether a C-instruction stores its result in the A register."""
+    return "=" in symbol and "A" in symbol.partition("=")[0]
+
+
+def peephole(pseudo_code: list[str]) -> list[str]:
+    """Remove redundant A-instructions and simplify adjacent instructions."""
+    optimized: list[str] = []
+    # value of the A register as a normalized symbol, unknown after labels
+    a_register: str | None = None
+    # index of the last instruction which may be combined with the next one
+    last = -1
+
+    for symbol in pseudo_code:
+        if symbol.startswith("("):
+            optimized.append(symbol)
+            a_register = None
+            last = -1
+        elif symbol.startswith("@"):
+            if _address_key(symbol) == a_register:
+                continue
+            optimized.append(symbol)
+            a_register = _address_key(symbol)
+            last = -1
+        elif last >= 0 and (optimized[last], symbol) in REWRITES:
+            replacement = REWRITES[optimized[last], symbol]
+            optimized[last:] = replacement
+            last = -1
+            if any(_writes_a(c) for c in replacement):
+                a_register = None
+        else:
+            optimized.append(symbol)
+            last = len(optimized) - 1
+            if _writes_a(symbol):
+                a_register = None
+    return optimized
+
+
+def _split_blocks(pseudo_code: list[str]) -> list[list[str]]:
+    """Split the program into basic blocks starting at labels."""
+    blocks: list[list[str]] = [[]]
+    for symbol in pseudo_code:
+        starts_block = symbol.startswith("(") and (
+            blocks[-1] and not blocks[-1][-1].startswith("(")
+        )
+        if starts_block:
+            blocks.append([])
+        blocks[-1].append(symbol)
+    return blocks
+
+
+def remove_unreachable(pseudo_code: list[str]) -> list[str]:
+    """Remove code which can neither be jumped to nor reached sequentially.
+
+    Every label referenced by an A-instruction of reachable code is considered
+    a potential jump target, since its address may also be used as data (e.g.
+    return addresses).
+    """
+    blocks = _split_blocks(pseudo_code)
+    label_to_block: dict[str, int] = {}
+    for i, block in enumerate(blocks):
+        # code behind an unconditional jump is only reachable through a label
+        for j, symbol in enumerate(block):
+            if symbol.startswith("("):
+                label_to_block[symbol[1:-1]] = i
+            elif _is_unconditional_jump(symbol):
+                del block[j + 1:]
+                break
+
+    reachable = {0}
+    pending = [0]
+    while pending:
+        i = pending.pop()
+        block = blocks[i]
+        successors = [
+            label_to_block[symbol[1:]]
+            for symbol in block
+            if symbol.startswith("@") and symbol[1:] in label_to_block
+        ]
+        if i + 1 < len(blocks) and not (block and _is_unconditional_jump(block[-1])):
+            successors.append(i + 1)
+        for successor in successors:
+            if successor not in reachable:
+                reachable.add(successor)
+                pending.append(successor)
+
+    return [symbol for i in sorted(reachable) for symbol in blocks[i]]
+
+
+def optimize(pseudo_code: list[str]) -> list[str]:
+    """Apply all optimizations until the program doesn't change anymore."""
+    while True:
+        optimized = remove_unreachable(peephole(pseudo_code))
+        if optimized == pseudo_code:
+            return optimized
+        pseudo_code = optimized
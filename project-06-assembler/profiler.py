@@ -0,0 +1,183 @@
+"""Profile Hack programs by counting the cycles spent in each label."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import lookup
+import regions
+from emulator import Emulator
+
+# prefix of the labels behind every `call` of the VM translator
+RETURN_PREFIX = "RETADDR_"
+# register holding the callee while jumping to the shared call routine
+CALLEE = lookup.predefined["R14"]
+
+
+class Profiler(Emulator):
+    """Execute Hack machine code counting the executions of every address.
+
+    Jumps right in front of a return address label are calls, which push the
+    region jumped to onto a shadow call stack. A jump to the shared call
+    routine pushes the callee passed to it in R14 instead. Jumping to the
+    return address on top of it pops it again. Cycles are attributed to the
+    call stack they were executed in, which gives the collapsed stacks of a
+    flame graph. Executions are counted per straight run of instructions
+    between two jumps taken, so only jumps slow down execution.
+    """
+
+    def __init__(self, words: Sequence[int], labels: dict[str, int]):
+        super().__init__(words)
+        self.labels = labels
+        # straight runs of instructions, i.e. without a jump taken, starting
+        # and ending at every ROM address, which sum up to the executions
+        self._entered = [0] * lookup.ROM_SIZE
+        self._left = [0] * lookup.ROM_SIZE
+        # address and cycle the current straight run started at
+        self._entry = (0, 0)
+        # cycles per call stack, e.g. ("(start)", "Sys.init", "Main.main")
+        self.stacks: dict[tuple[str, ...], int] = {}
+        self._regions = regions.regions(labels, len(self.rom))
+        self._shared_call = labels.get(regions.SHARED_CALL)
+        self._calls = {
+            address - 1
+            for label, address in labels.items()
+            if label.startswith(RETURN_PREFIX)
+        }
+        # (function, return address) of every active call
+        self._frames: list[tuple[str, int]] = [(regions.START, -1)]
+        self._since = 0
+
+    def _switch(self, pc: int, target: int, cycles: int) -> None:
+        """Update the call stack for a jump from `pc` to `target`."""
+        stack = tuple(name for name, _ in self._frames)
+        self.stacks[stack] = self.stacks.get(stack, 0) + cycles - self._since
+        self._since = cycles
+        if pc in self._calls:
+            if target == self._shared_call:
+                target = self.ram[CALLEE]
+            name = regions.find_region(self._regions, target)
+            self._frames.append((name, pc + 1))
+        else:
+            self._frames.pop()
+
+    def _jump(self, pc: int, target: int, cycle: int) -> bool:
+        """Count the straight run up to a jump and follow calls and returns."""
+        entry, since = self._entry
+        if cycle - since == pc - entry + 1:  # didn't wrap around the ROM
+            self._entered[entry] += 1
+            self._left[pc] += 1
+        else:
+            self._count(cycle)
+        self._entry = (target, cycle)
+        if pc in self._calls or target == self._frames[-1][1]:
+            self._switch(pc, target, cycle)
+        return False
+
+    def _count(self, cycle: int) -> None:
+        """Count the straight run of instructions from its entry up to `cycle`."""
+        entry, since = self._entry
+        length = cycle - since
+        while length > 0:
+            end = min(entry + length, lookup.ROM_SIZE)
+            self._entered[entry] += 1
+            self._left[end - 1] += 1
+            length -= end - entry
+            entry = 0  # the PC wraps around at the end of the ROM
+
+    @property
+    def counts(self) -> list[int]:
+        """Number of executions per ROM address."""
+        counts = []
+        running = 0
+        for entered, left in zip(self._entered, self._left, strict=True):
+            running += entered
+            counts.append(running)
+            running -= left
+        return counts
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run."""
+        self._entry = (self.pc, self.cycles)
+        executed = self.execute(cycles, on_jump=self._jump)
+        self._count(self.cycles)
+        return executed
+
+    def flat_profile(self, by_function: bool = False) -> dict[str, int]:
+        """Sum the executions per region, most expensive first."""
+        profile: dict[str, int] = {}
+        counts = self.counts
+        spans = regions.regions(self.labels, len(self.rom), by_function)
+        for name, start, end in spans:
+            profile[name] = profile.get(name, 0) + sum(counts[start:end])
+        return dict(sorted(profile.items(), key=lambda item: item[1], reverse=True))
+
+    def collapsed_stacks(self) -> list[str]:
+        """List the cycles per call stack in the collapsed format of flame graphs.
+
+        Every line contains the functions of a stack separated by `;` and the
+        number of cycles executed in its innermost function.
+        """
+        stacks = dict(self.stacks)
+        stack = tuple(name for name, _ in self._frames)
+        stacks[stack] = stacks.get(stack, 0) + self.cycles - self._since
+        return [
+            f"{';'.join(stack)} {count}"
+            for stack, count in sorted(stacks.items())
+            if count
+        ]
+
+
+def format_profile(profile: dict[str, int], top: int | None = None) -> str:
+    """Format a table of cycles per region with their share of the total."""
+    total = sum(profile.values())
+    lines = [f"{'cycles':>12}  {'share':>6}  region"]
+    for name, count in list(profile.items())[:top]:
+        lines.append(f"{count:>12}  {count / max(total, 1):>6.1%}  {name}")
+    if top is not None and len(profile) > top:
+        rest = sum(list(profile.values())[top:])
+        lines.append(
+            f"{rest:>12}  {rest / max(total, 1):>6.1%}  ({len(profile) - top} more)"
+        )
+    lines.append(f"{total:>12}  {1:>6.1%}  total")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+
+    from assembler import assemble_with_labels
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", type=pathlib.Path, help="asm-file")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    arg_parser.add_argument(
+        "--top", type=int, default=20, help="number of regions to show"
+    )
+    arg_parser.add_argument(
+        "-f",
+        "--functions",
+        action="store_true",
+        help="fold helper labels into their enclosing VM function",
+    )
+    arg_parser.add_argument(
+        "--stacks",
+        type=pathlib.Path,
+        help="write the collapsed call stacks for a flame graph to this file",
+    )
+    args = arg_parser.parse_args()
+
+    words, labels = assemble_with_labels(args.path.read_text())
+    profiler = Profiler(words, labels)
+    profiler.run(args.cycles)
+
+    print(format_profile(profiler.flat_profile(args.functions), args.top))
+    if args.stacks:
+        args.stacks.write_text("\n".join(profiler.collapsed_stacks()) + "\n")
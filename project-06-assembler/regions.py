@@ -0,0 +1,128 @@
+"""Attribute ROM addresses to the regions following each label."""
+
+from __future__ import annotations
+
+import bisect
+
+import lookup
+
+# name of the region in front of the first label
+START = "(start)"
+# labels of the routines shared by all calls and returns of the VM translator
+SHARED_CALL = "VM_CALL"
+SHARED_RETURN = "VM_RETURN"
+
+
+def is_function(label: str) -> bool:
+    """Check whether a label marks a VM function, e.g. `Math.multiply`.
+
+    Labels generated for returns and comparisons (`RETADDR_3`, `CMP7_TRUE`,
+    ...) contain no dot, control flow is scoped like `Main.main$WHILE_0`, and
+    both belong to the enclosing function instead. The shared call and return
+    routines are regions of their own as well.
+    """
+    if label in (SHARED_CALL, SHARED_RETURN):
+        return True
+    return "." in label and "$" not in label
+
+
+def regions(
+    labels: dict[str, int],
+    size: int,
+    by_function: bool = False,
+) -> list[tuple[str, int, int]]:
+    """Split a program of `size` instructions into regions at its labels.
+
+    Return (name, start, end) for every region in address order. Several
+    labels at the same address share one region named after the last of them.
+    """
+    starts: dict[int, str] = {}
+    for label, address in sorted(labels.items(), key=lambda item: item[1]):
+        if not by_function or is_function(label):
+            starts[address] = label
+    starts.setdefault(0, START)
+
+    addresses = sorted(address for address in starts if address <= size)
+    ends = [*addresses[1:], size]
+    return [
+        (starts[start], start, end)
+        for start, end in zip(addresses, ends, strict=True)
+    ]
+
+
+def find_region(regions: list[tuple[str, int, int]], address: int) -> str:
+    """Find the name of the region containing an address."""
+    starts = [start for _, start, _ in regions]
+    return regions[bisect.bisect_right(starts, address) - 1][0]
+
+
+def region_sizes(
+    labels: dict[str, int],
+    size: int,
+    by_function: bool = False,
+) -> dict[str, int]:
+    """Count the instructions attributed to each region, largest first."""
+    sizes: dict[str, int] = {}
+    for name, start, end in regions(labels, size, by_function):
+        sizes[name] = sizes.get(name, 0) + end - start
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+
+def format_report(sizes: dict[str, int], top: int | None = None) -> str:
+    """Format a table of region sizes with their share of the total."""
+    total = sum(sizes.values())
+    lines = [f"{'words':>7}  {'share':>6}  region"]
+    for name, count in list(sizes.items())[:top]:
+        lines.append(f"{count:>7}  {count / max(total, 1):>6.1%}  {name}")
+    if top is not None and len(sizes) > top:
+        rest = sum(list(sizes.values())[top:])
+        lines.append(f"{rest:>7}  {rest / total:>6.1%}  ({len(sizes) - top} more)")
+    lines.append(f"{total:>7}  {total / lookup.ROM_SIZE:>6.1%}  of ROM")
+    return "\n".join(lines)
+
+
+def check_budget(
+    labels: dict[str, int],
+    size: int,
+    rom_size: int | None = None,
+    top: int = 10,
+) -> None:
+    """Make sure a program fits into the ROM, explaining it if it doesn't."""
+    if rom_size is None:
+        rom_size = lookup.ROM_SIZE
+    if size <= rom_size:
+        return
+    sizes = region_sizes(labels, size, by_function=True)
+    raise ValueError(
+        f"Program of {size} instructions exceeds the ROM of {rom_size} words "
+        f"by {size - rom_size}. Largest functions:\n"
+        + format_report(sizes, top)
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from assembler import extract_pseudo_code, resolve_labels
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help="asm-file")
+    arg_parser.add_argument(
+        "-n", "--top", type=int, default=20, help="number of regions to show"
+    )
+    arg_parser.add_argument(
+        "-f",
+        "--functions",
+        action="store_true",
+        help="fold helper labels into their enclosing VM function",
+    )
+    args = arg_parser.parse_args()
+
+    with open(args.path) as f_in:
+        pseudo_code = extract_pseudo_code(f_in.read())
+    labels: dict[str, int] = {}
+    size = len(resolve_labels(pseudo_code, labels))
+
+    print(format_report(region_sizes(labels, size, args.functions), args.top))
+    sys.exit(1 if size > lookup.ROM_SIZE else 0)
@@ -0,0 +1,266 @@
+"""Run regression cases of Hack programs concurrently.
+
+A manifest is a JSON file listing the cases, for example
+
+    {"cases": [{"name": "Mult 3*4",
+                "rom": "Mult/Mult.asm",
+                "ram": {"R0": 3, "R1": 4},
+                "cycles": 1000,
+                "halts": true,
+                "expect": {"R2": 12}}]}
+
+ROMs are asm-files, hack-files, binary ROM images or directories of Jack
+classes, which are compiled together with the OS. Paths are relative to the
+manifest. RAM addresses are numbers or predefined symbols, and a list of
+values covers consecutive words. Besides the expected RAM, a case can check
+the screen checksum of the benchmark with `"screen"`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TextIO
+
+import lookup
+import rom
+from assembler import assemble_path, assemble_words
+from emulator import Emulator
+
+# decoded programs of this process by resolved ROM path, reused across cases
+_emulators: dict[pathlib.Path, Emulator] = {}
+
+
+@dataclass
+class Case:
+    """Program with its initial RAM and the RAM expected after running it."""
+    name: str
+    rom: pathlib.Path
+    cycles: int
+    ram: dict[int, list[int]] = field(default_factory=dict)
+    expect: dict[int, list[int]] = field(default_factory=dict)
+    screen: str | None = None
+    # the program must reach its final infinite loop within the cycles
+    halts: bool = False
+
+
+@dataclass
+class Result:
+    """Outcome of running a case."""
+    name: str
+    cycles: int = 0
+    seconds: float = 0.0
+    failures: list[str] = field(default_factory=list)
+    # the case couldn't run, e.g. the ROM is missing
+    error: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        return not (self.failures or self.error)
+
+
+def parse_address(key: str) -> int:
+    """Convert a RAM address or predefined symbol to an address."""
+    address = int(key) if key.isnumeric() else lookup.predefined.get(key)
+    if address is None or not 0 <= address < lookup.RAM_SIZE:
+        raise ValueError(f"Invalid RAM address: {key!r}")
+    return address
+
+
+def parse_words(content: dict[str, int | list[int]]) -> dict[int, list[int]]:
+    """Convert a mapping of addresses to a value or a list of values."""
+    words = {}
+    for key, values in content.items():
+        address = parse_address(key)
+        words[address] = values if isinstance(values, list) else [values]
+        if address + len(words[address]) > lookup.RAM_SIZE:
+            raise ValueError(f"Values exceed the RAM: {key!r}")
+    return words
+
+
+def load_manifest(path: str | pathlib.Path) -> list[Case]:
+    """Read the cases of a manifest."""
+    path = pathlib.Path(path)
+    content = json.loads(path.read_text())
+    cases = []
+    for number, case in enumerate(content["cases"]):
+        cases.append(
+            Case(
+                case.get("name", f"{path.stem}[{number}]"),
+                path.parent / case["rom"],
+                case["cycles"],
+                parse_words(case.get("ram", {})),
+                parse_words(case.get("expect", {})),
+                case.get("screen"),
+                case.get("halts", False),
+            )
+        )
+    return cases
+
+
+def load_rom(path: pathlib.Path) -> Sequence[int]:
+    """Assemble, compile or load the words of a program."""
+    if path.is_dir():
+        from benchmark import OS, compile_jack
+
+        # the unoptimized OS and a game exceed the ROM
+        return assemble_words(compile_jack(OS, path), optimize=True)
+    if path.suffix == ".asm":
+        return assemble_path(path)
+    return rom.load(path)
+
+
+def _emulator(path: pathlib.Path) -> Emulator:
+    """Get the emulator of a ROM in its initial state, loading it only once."""
+    path = path.resolve()
+    if path not in _emulators:
+        _emulators[path] = Emulator(load_rom(path))
+    emulator = _emulators[path]
+    emulator.reset()
+    emulator.a = emulator.d = emulator.cycles = 0
+    emulator.ram[:] = array("h", bytes(2 * lookup.RAM_SIZE))
+    return emulator
+
+
+def check(case: Case, emulator: Emulator) -> list[str]:
+    """Compare the state after running a case with the expected one."""
+    failures = []
+    if case.halts and not emulator.halted:
+        failures.append(f"didn't halt within {case.cycles} cycles")
+    for address, values in case.expect.items():
+        actual = emulator.ram[address:address + len(values)].tolist()
+        for offset, (expected, value) in enumerate(zip(values, actual, strict=True)):
+            if value != expected:
+                failures.append(
+                    f"RAM[{address + offset}] is {value}, expected {expected}"
+                )
+    if case.screen is not None:
+        from benchmark import screen_checksum
+
+        checksum = screen_checksum(emulator)
+        if checksum != case.screen:
+            failures.append(f"screen is {checksum}, expected {case.screen}")
+    return failures
+
+
+def run_case(case: Case) -> Result:
+    """Run a case on its emulator and check the result.
+
+    Any error loading, preparing or running the program is reported as the
+    error of the case, so it doesn't abort the other cases.
+    """
+    try:
+        emulator = _emulator(case.rom)
+        for address, values in case.ram.items():
+            emulator.ram[address:address + len(values)] = array("h", values)
+        start = time.perf_counter()
+        cycles = emulator.run(case.cycles)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        return Result(case.name, error=repr(e))
+    return Result(case.name, cycles, elapsed, check(case, emulator))
+
+
+def run_cases(cases: list[Case], jobs: int = 1) -> list[Result]:
+    """Run all cases, concurrently if more than one job is requested.
+
+    Every worker process keeps the programs it loaded, so a ROM is loaded at
+    most once per worker. The results are in the order of the cases.
+    """
+    if jobs > 1 and len(cases) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(run_case, cases))
+    return [run_case(case) for case in cases]
+
+
+def write_junit(results: list[Result], f_out: TextIO, name: str = "hack") -> None:
+    """Write the results as a JUnit XML test suite."""
+    suite = ET.Element(
+        "testsuite",
+        name=name,
+        tests=str(len(results)),
+        failures=str(sum(bool(result.failures) for result in results)),
+        errors=str(sum(result.error is not None for result in results)),
+        time=f"{sum(result.seconds for result in results):.3f}",
+    )
+    for result in results:
+        testcase = ET.SubElement(
+            suite,
+            "testcase",
+            name=result.name,
+            classname=name,
+            time=f"{result.seconds:.3f}",
+        )
+        if result.error is not None:
+            ET.SubElement(testcase, "error", message=result.error)
+        elif result.failures:
+            failure = ET.SubElement(testcase, "failure", message=result.failures[0])
+            failure.text = "\n".join(result.failures)
+        ET.SubElement(testcase, "system-out").text = f"{result.cycles} cycles"
+    ET.indent(suite)
+    ET.ElementTree(suite).write(f_out, encoding="unicode", xml_declaration=True)
+
+
+def format_table(results: list[Result]) -> str:
+    """Format the status, cycles and time of every case."""
+    width = max((len(result.name) for result in results), default=4)
+    lines = [f"{'case':<{width}}  status  {'cycles':>12}  {'seconds':>8}  cycles/s"]
+    for result in results:
+        status = "ERROR" if result.error else "FAIL" if result.failures else "ok"
+        rate = result.cycles / result.seconds if result.seconds else 0
+        lines.append(
+            f"{result.name:<{width}}  {status:<6}  {result.cycles:>12}  "
+            f"{result.seconds:>8.3f}  {rate:,.0f}"
+        )
+        lines.extend(
+            f"{'':<{width}}  {message}"
+            for message in result.failures or [result.error or ""]
+            if message
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument(
+        "manifests", type=pathlib.Path, nargs="+", help="manifest (.json)"
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of cases to run concurrently",
+    )
+    arg_parser.add_argument(
+        "--junit", type=pathlib.Path, help="write the results as JUnit XML"
+    )
+    args = arg_parser.parse_args()
+
+    cases = [case for path in args.manifests for case in load_manifest(path)]
+    start = time.perf_counter()
+    results = run_cases(cases, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    print(format_table(results))
+    failed = sum(not result.passed for result in results)
+    print(
+        f"{len(results)} cases, {len(results) - failed} passed, "
+        f"{failed} failed in {elapsed:.3f}s"
+    )
+    if args.junit:
+        with args.junit.open(mode="w") as f_out:
+            write_junit(results, f_out)
+    sys.exit(1 if failed else 0)
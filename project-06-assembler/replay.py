@@ -0,0 +1,163 @@
+"""Replay scripted key events into the keyboard of an emulated Hack computer.
+
+A script contains one event per line: a cycle number, or a frame number
+followed by `f`, and the key pressed from then on. Keys are single
+characters, names of special keys like `left` or `none`, or key codes of
+at least two digits.
+
+    # wait for the title screen, then play and turn left
+    2000000  p
+    2100000  none
+    3f       left
+"""
+
+from __future__ import annotations
+
+import operator
+import pathlib
+from collections import deque
+from dataclasses import dataclass
+
+import lookup
+from emulator import Emulator
+
+KBD = lookup.predefined["KBD"]
+
+# number of cycles executed at once if only frames are limited
+CHUNK = 1 << 20
+
+# codes of the keys which are no printable characters, see Keyboard.jack
+KEYS = {
+    "none": 0,
+    "space": 32,
+    "newline": 128,
+    "backspace": 129,
+    "left": 130,
+    "up": 131,
+    "right": 132,
+    "down": 133,
+    "home": 134,
+    "end": 135,
+    "pageup": 136,
+    "pagedown": 137,
+    "insert": 138,
+    "delete": 139,
+    "esc": 140,
+    **{f"f{number}": 140 + number for number in range(1, 13)},
+}
+
+
+@dataclass(frozen=True)
+class Event:
+    """Key pressed from a cycle, or from a frame on, until the next event."""
+    stamp: int
+    key: int
+    in_frames: bool = False
+
+
+def parse_key(text: str) -> int:
+    """Convert a character, a key name or a key code to the code."""
+    if text.lower() in KEYS:
+        return KEYS[text.lower()]
+    if len(text) == 1:
+        return ord(text)
+    if text.isnumeric():
+        return int(text)
+    raise ValueError(f"Unknown key: {text!r}")
+
+
+def parse_events(script: str) -> list[Event]:
+    """Parse the events of a script, ignoring empty lines and comments."""
+    events = []
+    for raw_line in script.splitlines():
+        line = raw_line.partition("#")[0].strip()
+        if not line:
+            continue
+        stamp, _, key = line.partition(" ")
+        in_frames = stamp.endswith("f")
+        events.append(
+            Event(int(stamp.removesuffix("f")), parse_key(key.strip()), in_frames)
+        )
+    return events
+
+
+def load_events(path: str | pathlib.Path) -> list[Event]:
+    """Read a script of key events."""
+    return parse_events(pathlib.Path(path).read_text())
+
+
+class Replay:
+    """Set the keyboard of an emulator to scripted keys while it runs.
+
+    Frames are counted every time execution reaches `frame_address`, e.g. the
+    first instruction of the function drawing the screen. Events happen
+    before the instruction executed in their cycle or frame, so replaying
+    a script always gives the same execution.
+
+    Counting frames runs the emulator with the plain `Emulator.run_until`,
+    so a `FastForwardEmulator` only skips idle loops when no `frame_address`
+    is given.
+    """
+
+    def __init__(
+        self,
+        emulator: Emulator,
+        events: list[Event],
+        frame_address: int | None = None,
+    ):
+        if frame_address is None and any(event.in_frames for event in events):
+            raise ValueError("Frame events require the address of a frame")
+        self.emulator = emulator
+        self.frame_address = frame_address
+        self.frames = 0
+        # events at the same stamp keep their order, so the last one wins
+        by_stamp = operator.attrgetter("stamp")
+        self._cycle_events = deque(
+            sorted((e for e in events if not e.in_frames), key=by_stamp)
+        )
+        self._frame_events = deque(
+            sorted((e for e in events if e.in_frames), key=by_stamp)
+        )
+
+    def _press_due_keys(self) -> None:
+        """Set the keys of all events which are due."""
+        emulator = self.emulator
+        while self._cycle_events and self._cycle_events[0].stamp <= emulator.cycles:
+            emulator.ram[KBD] = self._cycle_events.popleft().key
+        while self._frame_events and self._frame_events[0].stamp <= self.frames:
+            emulator.ram[KBD] = self._frame_events.popleft().key
+
+    def run(self, cycles: int | None = None, frames: int | None = None) -> int:
+        """Run until `cycles` more cycles or `frames` more frames have passed.
+
+        Return the number of executed cycles, which is smaller if the program
+        halts before.
+        """
+        if cycles is None and frames is None:
+            raise ValueError("Either cycles or frames must be limited")
+        if frames is not None and self.frame_address is None:
+            raise ValueError("Counting frames requires the address of a frame")
+        emulator = self.emulator
+        start = emulator.cycles
+        end_frame = None if frames is None else self.frames + frames
+
+        while not emulator.halted:
+            self._press_due_keys()
+            if end_frame is not None and self.frames >= end_frame:
+                break
+            budget = cycles - (emulator.cycles - start) if cycles is not None else None
+            if self._cycle_events:
+                until_event = self._cycle_events[0].stamp - emulator.cycles
+                budget = until_event if budget is None else min(budget, until_event)
+            if budget is None:
+                budget = CHUNK
+            elif budget <= 0:
+                break
+
+            if self.frame_address is None:
+                emulator.run(budget)
+            else:
+                emulator.run_until(budget, self.frame_address)
+                if emulator.pc == self.frame_address:
+                    self.frames += 1
+        return emulator.cycles - start
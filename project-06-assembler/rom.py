@@ -0,0 +1,74 @@
+"""Read and write Hack ROM images in text or packed binary format."""
+
+from __future__ import annotations
+
+import mmap
+import pathlib
+import struct
+import sys
+from array import array
+from typing import BinaryIO
+
+SUFFIX = ".rom"
+MAGIC = b"HACK"
+VERSION = 1
+
+# magic, version, reserved, number of words; followed by little-endian words
+HEADER = struct.Struct("<4sHHI")
+
+
+def write(words: array[int], f_out: BinaryIO) -> None:
+    """Write words as a binary ROM image."""
+    f_out.write(HEADER.pack(MAGIC, VERSION, 0, len(words)))
+    if sys.byteorder == "big":
+        words = array("H", words)
+        words.byteswap()
+    f_out.write(words.tobytes())
+
+
+def parse_header(data: bytes | mmap.mmap) -> int:
+    """Validate the header of a binary ROM image and return its word count."""
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated ROM header")
+    magic, version, _, size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Invalid ROM magic: {magic!r}")
+    if version != VERSION:
+        raise ValueError(f"Unsupported ROM version: {version}")
+    if len(data) < HEADER.size + 2 * size:
+        raise ValueError(f"Truncated ROM: expected {size} words")
+    return size
+
+
+def loads(data: bytes) -> array[int]:
+    """Convert a binary ROM image or the contents of a `.hack` file to words."""
+    if not data.startswith(MAGIC):
+        text = data.decode("ascii")
+        return array("H", [int(line, 2) for line in text.split()])
+
+    size = parse_header(data)
+    words = array("H")
+    words.frombytes(data[HEADER.size:HEADER.size + 2 * size])
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words
+
+
+def load(path: str | pathlib.Path) -> array[int]:
+    """Load a ROM from either a binary image or a text `.hack` file."""
+    return loads(pathlib.Path(path).read_bytes())
+
+
+def map_words(path: str | pathlib.Path) -> memoryview:
+    """Memory-map a binary ROM image as a read-only view of unsigned words.
+
+    The view stays valid as long as it is referenced; the words are only
+    decoded when they are accessed. Only available on little-endian hosts.
+    """
+    if sys.byteorder == "big":
+        raise NotImplementedError("Mapping ROM images requires little endian")
+    with open(path, mode="rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    size = parse_header(buffer)
+    view = memoryview(buffer)[HEADER.size:HEADER.size + 2 * size]
+    return view.cast("H")
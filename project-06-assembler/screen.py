@@ -0,0 +1,136 @@
+"""Share the RAM of an emulator with other processes and inspect its screen."""
+
+from __future__ import annotations
+
+import mmap
+import pathlib
+from array import array
+from multiprocessing import shared_memory
+
+import lookup
+import numpy as np
+from emulator import Emulator
+
+SCREEN = lookup.predefined["SCREEN"]
+KBD = lookup.predefined["KBD"]
+WIDTH = 512
+HEIGHT = 256
+# every word holds 16 pixels, the least significant bit is the leftmost
+SCREEN_WORDS = WIDTH * HEIGHT // 16
+
+Buffer = bytes | bytearray | memoryview | mmap.mmap | array
+
+
+def words(buffer: Buffer) -> memoryview:
+    """View any buffer holding the RAM, e.g. shared memory, as signed words."""
+    return memoryview(buffer).cast("B")[:2 * lookup.RAM_SIZE].cast("h")
+
+
+def attach(emulator: Emulator, buffer: Buffer) -> None:
+    """Move the RAM of an emulator into a writable buffer of at least 64 KiB.
+
+    The emulator keeps executing on the buffer directly, so every change is
+    immediately visible to whoever else maps it.
+    """
+    ram = words(buffer)
+    if len(ram) < lookup.RAM_SIZE:
+        raise ValueError(f"Buffer of {2 * len(ram)} bytes is too small for the RAM")
+    ram[:] = words(emulator.ram)
+    emulator.ram = ram
+
+
+def detach(emulator: Emulator) -> None:
+    """Copy the RAM back into the emulator, so the buffer can be closed."""
+    emulator.ram = array("h", bytes(emulator.ram))
+
+
+def share(emulator: Emulator, name: str | None = None) -> shared_memory.SharedMemory:
+    """Move the RAM of an emulator into new shared memory.
+
+    Other processes open it with `SharedMemory(name)`. The caller has to
+    `detach` the emulator before closing and unlinking the shared memory.
+    """
+    memory = shared_memory.SharedMemory(name, create=True, size=2 * lookup.RAM_SIZE)
+    attach(emulator, memory.buf)
+    return memory
+
+
+def map_file(emulator: Emulator, path: str | pathlib.Path) -> mmap.mmap:
+    """Move the RAM of an emulator into a memory-mapped file."""
+    with open(path, mode="w+b") as f:
+        f.truncate(2 * lookup.RAM_SIZE)
+        buffer = mmap.mmap(f.fileno(), 0)
+    attach(emulator, buffer)
+    return buffer
+
+
+def press(buffer: Buffer, key: int) -> None:
+    """Set the code of the pressed key, 0 meaning no key."""
+    words(buffer)[KBD] = key
+
+
+def screenshot(buffer: Buffer) -> np.ndarray:
+    """Unpack the screen memory map to HEIGHT x WIDTH booleans, True is black."""
+    screen = np.frombuffer(
+        words(buffer), dtype=np.uint16, count=SCREEN_WORDS, offset=2 * SCREEN
+    )
+    pixels = np.unpackbits(
+        screen.astype("<u2", copy=False).view(np.uint8), bitorder="little"
+    )
+    return pixels.view(np.bool_).reshape(HEIGHT, WIDTH)
+
+
+def diff(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """Return the (row, column) of every pixel that differs."""
+    return np.argwhere(before != after)
+
+
+def to_pbm(image: np.ndarray) -> bytes:
+    """Encode a screenshot as binary portable bitmap, e.g. for golden images."""
+    height, width = image.shape
+    return f"P4\n{width} {height}\n".encode() + np.packbits(image, axis=1).tobytes()
+
+
+def from_pbm(data: bytes) -> np.ndarray:
+    """Decode a binary portable bitmap written by `to_pbm`."""
+    magic, size, pixels = data.split(b"\n", 2)
+    if magic != b"P4":
+        raise ValueError(f"Invalid bitmap magic: {magic!r}")
+    width, height = (int(value) for value in size.split())
+    packed = np.frombuffer(pixels, dtype=np.uint8).reshape(height, -1)
+    return np.unpackbits(packed, axis=1, count=width).view(np.bool_)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import rom
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help=f"hack-file or ROM image ({rom.SUFFIX})")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    arg_parser.add_argument(
+        "--shared", help="name of shared memory holding the RAM for viewers"
+    )
+    arg_parser.add_argument(
+        "-o", "--output", type=pathlib.Path, help="screenshot (.pbm)"
+    )
+    args = arg_parser.parse_args()
+
+    emulator = Emulator.from_file(args.path)
+    memory = share(emulator, args.shared) if args.shared else None
+    try:
+        emulator.run(args.cycles)
+        output = args.output or pathlib.Path(args.path).with_suffix(".pbm")
+        output.write_bytes(to_pbm(screenshot(emulator.ram)))
+    finally:
+        if memory is not None:
+            detach(emulator)
+            memory.close()
+            memory.unlink()
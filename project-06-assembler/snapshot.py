@@ -0,0 +1,146 @@
+"""Save and restore the complete state of an emulated Hack computer."""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import pathlib
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import lookup
+from emulator import Emulator
+
+SUFFIX = ".snap"
+MAGIC = b"HSNP"
+VERSION = 1
+
+# magic, version, halted, SHA-256 of the ROM, PC, A, D, cycles;
+# followed by the RAM as little-endian words
+HEADER = struct.Struct("<4sHH32sHhhQ")
+
+
+def rom_hash(words: Sequence[int]) -> bytes:
+    """Identify a program by the SHA-256 of its little-endian words."""
+    words = array("H", words)
+    if sys.byteorder == "big":
+        words.byteswap()
+    return hashlib.sha256(words.tobytes()).digest()
+
+
+@dataclass
+class Snapshot:
+    """State of an emulator which can be restored into another one."""
+    rom_hash: bytes
+    pc: int
+    a: int
+    d: int
+    cycles: int
+    halted: bool
+    # little-endian RAM words, possibly a view of a mapped file
+    ram: bytes | memoryview
+
+    @classmethod
+    def capture(cls, emulator: Emulator) -> Snapshot:
+        """Copy the state of an emulator."""
+        ram = array("h", bytes(emulator.ram))
+        if sys.byteorder == "big":
+            ram.byteswap()
+        return cls(
+            rom_hash(emulator.rom),
+            emulator.pc,
+            emulator.a,
+            emulator.d,
+            emulator.cycles,
+            emulator.halted,
+            ram.tobytes(),
+        )
+
+    def restore(self, emulator: Emulator) -> None:
+        """Continue the execution of the snapshot in an emulator.
+
+        The emulator must run the same program the snapshot was taken of.
+        """
+        if rom_hash(emulator.rom) != self.rom_hash:
+            raise ValueError("Snapshot was taken of a different program")
+        if sys.byteorder == "big":
+            ram = array("h", bytes(self.ram))
+            ram.byteswap()
+            emulator.ram[:] = ram
+        else:
+            memoryview(emulator.ram).cast("B")[:] = self.ram
+        emulator.pc, emulator.a, emulator.d = self.pc, self.a, self.d
+        emulator.cycles, emulator.halted = self.cycles, self.halted
+
+    def dump(self, f_out: BinaryIO) -> None:
+        """Write the snapshot in its binary format."""
+        f_out.write(HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.halted,
+            self.rom_hash,
+            self.pc,
+            self.a,
+            self.d,
+            self.cycles,
+        ))
+        f_out.write(self.ram)
+
+    @classmethod
+    def loads(cls, data: bytes | memoryview) -> Snapshot:
+        """Read a snapshot from its binary format without copying the RAM."""
+        if len(data) < HEADER.size:
+            raise ValueError("Truncated snapshot header")
+        magic, version, halted, hash_, pc, a, d, cycles = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"Invalid snapshot magic: {magic!r}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+        if len(data) != HEADER.size + 2 * lookup.RAM_SIZE:
+            raise ValueError("Truncated snapshot RAM")
+        ram = memoryview(data)[HEADER.size:]
+        return cls(hash_, pc, a, d, cycles, bool(halted), ram)
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> Snapshot:
+        """Memory-map a snapshot file, so restoring it only copies the RAM."""
+        with open(path, mode="rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.loads(memoryview(buffer))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import rom
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", help=f"hack-file or ROM image ({rom.SUFFIX})")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        required=True,
+        help="number of instructions to execute before taking the snapshot",
+    )
+    arg_parser.add_argument(
+        "-o", "--output", type=pathlib.Path, help=f"snapshot file ({SUFFIX})"
+    )
+    arg_parser.add_argument(
+        "--resume", type=pathlib.Path, help="continue from this snapshot"
+    )
+    args = arg_parser.parse_args()
+
+    emulator = Emulator.from_file(args.path)
+    if args.resume:
+        Snapshot.load(args.resume).restore(emulator)
+    emulator.run(args.cycles)
+
+    output = args.output or pathlib.Path(args.path).with_suffix(SUFFIX)
+    with output.open(mode="wb") as f_out:
+        Snapshot.capture(emulator).dump(f_out)
+    print(f"saved cycle {emulator.cycles} at PC={emulator.pc} to {output}")
@@ -0,0 +1,267 @@
+"""Sample the stack and heap of compiled Jack programs while they run.
+
+The stack grows from 256 towards the heap at 2048. `Memory.alloc` of the OS
+carves blocks from the end of the first free segment large enough, so the
+used heap grows downwards from 16382. Every block is preceded by two words,
+the next segment while it is free and its size at `block[-1]`. Since carving
+always takes the tail of a segment, the carved words are a gapless sequence
+of blocks which can be walked by their sizes.
+"""
+
+from __future__ import annotations
+
+import csv
+import dataclasses
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TextIO
+
+import regions
+from emulator import Emulator
+
+STACK = 256
+# free list of Memory.jack: next segment and size of the initial segment
+HEAP = 2048
+HEAP_SIZE = 14333
+# end of the initial segment, which is also the end of the last block
+HEAP_END = HEAP + 2 + HEAP_SIZE
+# value filling the unused stack, overwritten words tell the high-water mark
+PAINT = 0x5AA5
+
+SP, LCL = 0, 1
+
+
+@dataclass
+class HeapStats:
+    """Blocks of the heap at one moment."""
+    live_blocks: int
+    live_words: int
+    free_segments: int
+    free_words: int
+    largest_free: int
+    # the layout is broken, e.g. the stack overwrote it
+    corrupt: bool = False
+
+
+@dataclass
+class Sample:
+    """State of the stack and heap at a cycle."""
+    cycles: int
+    sp: int
+    sp_high_water: int
+    depth: int
+    live_blocks: int
+    live_words: int
+    free_segments: int
+    free_words: int
+    largest_free: int
+    corrupt: bool
+
+
+def free_list(ram: Sequence[int]) -> dict[int, int] | None:
+    """Map the address of every free segment to its size.
+
+    None means the list is broken, e.g. it contains a cycle.
+    """
+    segments: dict[int, int] = {}
+    segment = HEAP
+    while segment:
+        if segment in segments or not HEAP <= segment < HEAP_END:
+            return None
+        segments[segment] = ram[segment + 1]
+        segment = ram[segment]
+    return segments
+
+
+def heap_stats(ram: Sequence[int]) -> HeapStats:
+    """Walk the free list and the carved blocks of the heap."""
+    if not any(ram[HEAP:HEAP + 4]):
+        # Memory.init didn't run yet, a full heap still has a live block
+        return HeapStats(0, 0, 0, 0, 0)
+    segments = free_list(ram)
+    if segments is None:
+        return HeapStats(0, 0, 0, 0, 0, corrupt=True)
+
+    live_blocks = live_words = 0
+    corrupt = False
+    # the first carved block starts behind the remaining initial segment
+    block = HEAP + 2 + ram[HEAP + 1]
+    while block < HEAP_END:
+        size = ram[block + 1]
+        free = block in segments
+        if size < (0 if free else 1) or block + 2 + size > HEAP_END:
+            corrupt = True
+            break
+        if not free:
+            live_blocks += 1
+            live_words += size
+        block += 2 + size
+
+    sizes = segments.values()
+    return HeapStats(
+        live_blocks,
+        live_words,
+        len(segments),
+        sum(sizes),
+        max(sizes),
+        corrupt,
+    )
+
+
+def call_stack(
+    ram: Sequence[int],
+    pc: int,
+    function_regions: list[tuple[str, int, int]],
+) -> list[str]:
+    """Name the functions of all frames, innermost first.
+
+    The frames of the VM are linked by the saved LCL at `LCL - 4`, the
+    return address into the caller is stored at `LCL - 5`.
+    """
+    stack = [regions.find_region(function_regions, pc)]
+    frame = ram[LCL]
+    # the bootstrap call of Sys.init saved LCL = 0
+    while STACK + 5 <= frame < HEAP and len(stack) <= (HEAP - STACK) // 5:
+        stack.append(regions.find_region(function_regions, ram[frame - 5]))
+        frame = ram[frame - 4]
+    return stack
+
+
+class Telemetry:
+    """Record samples of the stack and heap of an emulator at an interval.
+
+    The emulator executes the cycles between samples at full speed, and its
+    RAM stays untouched, so the SP high-water mark is the highest SP sampled.
+    With `paint` before the first instruction, the unused stack is filled
+    with `PAINT` to make the mark exact. The program can see these words, so
+    a program reading uninitialized stack may behave differently.
+    """
+
+    def __init__(
+        self,
+        emulator: Emulator,
+        labels: dict[str, int] | None = None,
+        interval: int = 100_000,
+        paint: bool = False,
+    ):
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive: {interval}")
+        self.emulator = emulator
+        self.interval = interval
+        self.samples: list[Sample] = []
+        # deepest level every function was sampled at, 1 being the outermost
+        self.max_depth: dict[str, int] = {}
+        self.sp_high_water = max(emulator.ram[SP], STACK)
+        self._regions = regions.regions(
+            labels or {}, len(emulator.rom), by_function=True
+        )
+        self._painted = paint and emulator.cycles == 0
+        if self._painted:
+            ram = emulator.ram
+            for address in range(max(ram[SP], STACK), HEAP):
+                ram[address] = PAINT
+
+    def _stack_high_water(self) -> int:
+        """Find the lowest address above all words the stack ever used."""
+        ram = self.emulator.ram
+        high_water = max(self.sp_high_water, ram[SP])
+        if self._painted:
+            while high_water < HEAP and ram[high_water] != PAINT:
+                high_water += 1
+        return high_water
+
+    def sample(self) -> Sample:
+        """Take a sample of the current state."""
+        emulator = self.emulator
+        ram = emulator.ram
+        self.sp_high_water = self._stack_high_water()
+
+        stack = call_stack(ram, emulator.pc, self._regions)
+        for depth, name in enumerate(reversed(stack), start=1):
+            if depth > self.max_depth.get(name, 0):
+                self.max_depth[name] = depth
+
+        heap = heap_stats(ram)
+        sample = Sample(
+            emulator.cycles,
+            ram[SP],
+            self.sp_high_water,
+            len(stack),
+            *dataclasses.astuple(heap),
+        )
+        self.samples.append(sample)
+        return sample
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions, sampling every interval."""
+        emulator = self.emulator
+        start = emulator.cycles
+        while not emulator.halted and emulator.cycles - start < cycles:
+            emulator.run(min(self.interval, cycles - (emulator.cycles - start)))
+            self.sample()
+        return emulator.cycles - start
+
+
+def write_csv(samples: list[Sample], f_out: TextIO) -> None:
+    """Write samples as a table with a header row."""
+    writer = csv.writer(f_out)
+    writer.writerow(field.name for field in dataclasses.fields(Sample))
+    writer.writerows(dataclasses.astuple(sample) for sample in samples)
+
+
+def format_depths(max_depth: dict[str, int], top: int | None = None) -> str:
+    """Format the deepest level of every function, deepest first."""
+    lines = [f"{'depth':>5}  function"]
+    ordered = sorted(max_depth.items(), key=lambda item: item[1], reverse=True)
+    for name, depth in ordered[:top]:
+        lines.append(f"{depth:>5}  {name}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+    import sys
+
+    from assembler import assemble_with_labels
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("path", type=pathlib.Path, help="asm-file")
+    arg_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    arg_parser.add_argument(
+        "-i",
+        "--interval",
+        type=int,
+        default=100_000,
+        help="number of instructions between samples",
+    )
+    arg_parser.add_argument(
+        "-O", "--optimize", action="store_true", help="optimize the program"
+    )
+    arg_parser.add_argument(
+        "-o", "--output", type=pathlib.Path, help="time series (.csv)"
+    )
+    arg_parser.add_argument(
+        "--paint",
+        action="store_true",
+        help="fill the unused stack for an exact SP high-water mark",
+    )
+    args = arg_parser.parse_args()
+
+    words, labels = assemble_with_labels(args.path.read_text(), args.optimize)
+    telemetry = Telemetry(Emulator(words), labels, args.interval, args.paint)
+    telemetry.run(args.cycles)
+
+    if args.output:
+        with args.output.open(mode="w", newline="") as f_out:
+            write_csv(telemetry.samples, f_out)
+    else:
+        write_csv(telemetry.samples, sys.stdout)
+    print(f"SP high-water mark: {telemetry.sp_high_water}", file=sys.stderr)
+    print(format_depths(telemetry.max_depth, 20), file=sys.stderr)
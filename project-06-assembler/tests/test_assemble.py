@@ -0,0 +1,100 @@
+import io
+
+import pytest
+
+from assembler import (
+    assemble,
+    assemble_path,
+    assemble_stream,
+    assemble_with_labels,
+    assemble_words,
+    extract_pseudo_code,
+    read_pseudo_code,
+)
+
+PROGRAM = """\
+// Multiplies R0 and R1 and stores the result in R2.
+    @sum
+    M=0
+    @i
+    M=0
+(LOOP)
+    @i
+    D=M
+    @R1
+    D=D-M
+    @STOP  // forward reference
+    D;JGE
+    @R0
+    D=M
+    @sum
+    M=D+M
+    @i
+    M=M+1
+    @LOOP  // backward reference
+    0;JMP
+(STOP)
+    @sum
+    D=M
+    @R2
+    M=D
+(END)
+    @END
+    0;JMP
+"""
+
+
+def test_should_resolve_labels_and_variables():
+    assembled = assemble("@x\n(L)\n@L\n@y\n@x\n").split("\n")
+    assert assembled == [
+        "0000000000010000",
+        "0000000000000001",
+        "0000000000010001",
+        "0000000000010000",
+    ]
+
+
+def test_should_return_addresses_of_labels():
+    words, labels = assemble_with_labels("@x\n(L)\n@L\n(M)\n@M\n0;JMP\n")
+    assert labels == {"L": 1, "M": 2}
+    assert list(words) == [16, 1, 2, 0b1110101010000111]
+
+
+class TestAssembleStream:
+    @pytest.mark.parametrize("program", [
+        PROGRAM,
+        "@x\n(L)\n@L\n@y\n@x\n",
+        "(START)\n@START\n0;JMP",
+        "",
+    ])
+    def test_should_match_assemble(self, program):
+        f_out = io.StringIO()
+        assemble_stream(io.StringIO(program), f_out)
+        assert f_out.getvalue() == assemble(program)
+
+    def test_should_return_number_of_instructions(self):
+        count = assemble_stream(io.StringIO(PROGRAM), io.StringIO())
+        assert count == 24
+
+    def test_should_leave_file_position_at_end(self):
+        f_out = io.StringIO()
+        assemble_stream(io.StringIO(PROGRAM), f_out)
+        f_out.write("!")
+        assert f_out.getvalue().endswith("1110101010000111!")
+
+
+class TestReadPseudoCode:
+    def test_should_match_extract_pseudo_code(self, tmp_path):
+        path = tmp_path / "prog.asm"
+        path.write_text(PROGRAM + "// commentaire à la fin\n", encoding="utf-8")
+        assert list(read_pseudo_code(path)) == extract_pseudo_code(PROGRAM)
+
+    def test_should_accept_empty_file(self, tmp_path):
+        path = tmp_path / "empty.asm"
+        path.touch()
+        assert list(read_pseudo_code(path)) == []
+
+    def test_should_assemble_path(self, tmp_path):
+        path = tmp_path / "prog.asm"
+        path.write_text(PROGRAM)
+        assert assemble_path(path) == assemble_words(PROGRAM)
@@ -1,6 +1,6 @@
 import pytest
 
-from assembler import CInstruction
+from assembler import C_INSTRUCTIONS, CInstruction, encode
 
 
 @pytest.mark.parametrize("token, expected", [
@@ -30,3 +30,20 @@ class TestFromSymbol():
     ])
     def test_should_parse_c_instruction_with_dest(self, symbol, expected):
         assert CInstruction.from_symbol(symbol) == expected
+
+
+class TestEncodingTable:
+    def test_should_contain_all_canonical_spellings(self):
+        assert len(C_INSTRUCTIONS) == 28 * 16 * 8
+
+    @pytest.mark.parametrize("symbol", ["D=M", "MD=D+1", "DM=D+1", "AMD=M-1", "0;JMP", "D;JGE"])
+    def test_should_match_parsed_instruction(self, symbol):
+        assert C_INSTRUCTIONS[symbol] == int(CInstruction.from_symbol(symbol))
+
+    def test_should_fall_back_to_parsing_unusual_spellings(self):
+        assert "MM=1" not in C_INSTRUCTIONS
+        assert encode("MM=1", {}) == C_INSTRUCTIONS["M=1"]
+
+    def test_should_raise_for_invalid_instruction(self):
+        with pytest.raises(KeyError):
+            encode("D=M+D", {})
@@ -0,0 +1,132 @@
+import pytest
+from assembler import assemble_with_labels
+from debugger import BREAKPOINT, WATCHPOINT, Debugger, Stop
+from emulator import Emulator
+
+# count R0 down from 5, storing every value to R1 in a subroutine-like block
+COUNTDOWN = """
+@5
+D=A
+@R0
+M=D
+(LOOP)
+@R0
+D=M
+@R1
+M=D
+(STORE)
+@R2
+M=M+1
+@R0
+MD=M-1
+@LOOP
+D;JGT
+(END)
+@END
+0;JMP
+"""
+
+
+def load(program=COUNTDOWN):
+    words, labels = assemble_with_labels(program)
+    return Debugger(words, labels), labels
+
+
+def test_should_run_like_emulator_without_stops():
+    debugger, _ = load()
+    emulator = Emulator(debugger.rom)
+    assert debugger.run(1000) == emulator.run(1000)
+    assert debugger.halted
+    assert debugger.stop is None
+    assert (debugger.a, debugger.d, debugger.pc) == (emulator.a, emulator.d, emulator.pc)
+    assert debugger.ram[:3].tolist() == emulator.ram[:3].tolist() == [0, 1, 5]
+
+
+@pytest.mark.parametrize("location", ["STORE", 8])
+def test_should_stop_at_breakpoint(location):
+    debugger, labels = load()
+    debugger.add_breakpoint(location)
+    counters = []
+    while not debugger.halted:
+        debugger.run(1000)
+        if debugger.stop is not None:
+            assert debugger.stop == Stop(BREAKPOINT, labels["STORE"])
+            assert debugger.pc == labels["STORE"]
+            counters.append(debugger.ram[1])
+    assert counters == [5, 4, 3, 2, 1]
+
+
+def test_should_stop_in_middle_of_block_entered_by_jump():
+    debugger, labels = load()
+    # reached from LOOP by falling through and from the jump back to LOOP
+    debugger.add_breakpoint(labels["LOOP"] + 2)
+    debugger.run(1000)
+    debugger.run(1000)
+    assert debugger.stop == Stop(BREAKPOINT, labels["LOOP"] + 2)
+    assert debugger.ram[0] == 4
+
+
+def test_should_remove_breakpoint():
+    debugger, _ = load()
+    debugger.add_breakpoint("STORE")
+    debugger.run(1000)
+    debugger.remove_breakpoint("STORE")
+    debugger.run(1000)
+    assert debugger.stop is None
+    assert debugger.halted
+
+
+def test_should_stop_after_watched_store():
+    debugger, labels = load()
+    debugger.watch("R0")
+    stops = []
+    while not debugger.halted:
+        debugger.run(1000)
+        if debugger.stop is not None:
+            stops.append(debugger.stop)
+    assert stops[0] == Stop(WATCHPOINT, 3, 0, 0, 5)
+    assert [(stop.old, stop.new) for stop in stops[1:]] == [
+        (5, 4),
+        (4, 3),
+        (3, 2),
+        (2, 1),
+        (1, 0),
+    ]
+    assert {stop.pc for stop in stops[1:]} == {labels["STORE"] + 3}
+
+
+def test_should_watch_range():
+    debugger, labels = load()
+    debugger.watch(1, 2)
+    debugger.run(1000)
+    assert debugger.stop == Stop(WATCHPOINT, labels["STORE"] - 1, 1, 0, 5)
+    debugger.run(1000)
+    assert debugger.stop == Stop(WATCHPOINT, labels["STORE"] + 1, 2, 0, 1)
+    debugger.unwatch(1, 2)
+    debugger.run(1000)
+    assert debugger.stop is None
+    assert debugger.ram[:3].tolist() == [0, 1, 5]
+
+
+def test_should_count_cycles_like_emulator():
+    debugger, _ = load()
+    debugger.add_breakpoint("STORE")
+    debugger.watch("R2")
+    total = 0
+    while not debugger.halted:
+        total += debugger.run(7)
+    emulator = Emulator(debugger.rom)
+    assert total == debugger.cycles == emulator.run(1000)
+
+
+@pytest.mark.parametrize("location", ["MISSING", -1])
+def test_should_reject_unknown_breakpoints(location):
+    debugger, _ = load()
+    with pytest.raises(ValueError):
+        debugger.add_breakpoint(location)
+
+
+def test_should_reject_watch_outside_ram():
+    debugger, _ = load()
+    with pytest.raises(ValueError):
+        debugger.watch(32767, 2)
@@ -0,0 +1,107 @@
+import pathlib
+
+import pytest
+
+import rom
+from assembler import assemble_words
+from emulator import ALU, ALU_FUNCTIONS, Emulator, alu, benchmark
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+
+def run(program: str, cycles: int = 1000, **ram: int) -> Emulator:
+    emulator = Emulator(assemble_words(program))
+    for register, value in ram.items():
+        emulator.ram[int(register[1:])] = value
+    emulator.run(cycles)
+    return emulator
+
+
+@pytest.mark.parametrize("comp", sorted(ALU_FUNCTIONS))
+@pytest.mark.parametrize("x, y", [(0, 0), (1, -1), (-32768, 32767), (12345, -2)])
+def test_specialized_alu_should_match_control_bits(comp, x, y):
+    assert ALU_FUNCTIONS[comp](x, y) == alu(comp)(x, y)
+
+
+def test_should_decode_every_comp_field():
+    assert all(callable(fn) for fn in ALU)
+
+
+@pytest.mark.parametrize("r0, r1", [(0, 0), (3, 5), (123, 45), (7, 0)])
+def test_should_run_mult(r0, r1):
+    program = (PROJECT_04 / "Mult" / "Mult.asm").read_text()
+    emulator = run(program, 100_000, R0=r0, R1=r1)
+    assert emulator.halted
+    assert emulator.ram[2] == r0 * r1
+
+
+def test_should_halt_at_final_loop():
+    emulator = run("@5\nD=A\n(END)\n@END\n0;JMP")
+    assert emulator.halted
+    assert emulator.cycles == 4
+    assert emulator.run(10) == 0
+
+
+def test_should_stop_after_cycle_limit():
+    emulator = run("(LOOP)\n@i\nM=M+1\n@LOOP\n0;JMP", cycles=40)
+    assert not emulator.halted
+    assert emulator.cycles == 40
+    assert emulator.ram[16] == 10
+
+
+def test_should_wrap_around_the_end_of_the_rom():
+    emulator = run("@1\nD=A", cycles=40_000)
+    assert emulator.cycles == 40_000
+    assert emulator.pc == 40_000 - 32768
+    assert emulator.run_until(40_000, 1) == 32768 - (40_000 - 32768) + 1
+    assert emulator.pc == 1
+
+
+def test_should_run_until_address():
+    emulator = Emulator(assemble_words("(LOOP)\n@R0\nM=M+1\n@LOOP\n0;JMP"))
+    assert emulator.run_until(100, 0) == 4
+    assert emulator.run_until(100, 0) == 4
+    assert emulator.ram[0] == 2
+    assert emulator.run_until(3, 0) == 3
+    assert emulator.pc == 3
+
+
+def test_should_write_m_at_previous_address():
+    emulator = run("@7\nD=A\n@3\nAM=D\nD=A", cycles=5)
+    assert emulator.ram[3] == 7
+    assert emulator.a == 7
+
+
+def test_should_wrap_overflow():
+    emulator = run("@32767\nD=A\nD=D+1\n@0\nM=D", cycles=5)
+    assert emulator.ram[0] == -32768
+
+
+def test_should_address_with_negative_a_register():
+    emulator = run("A=-1\nM=1", cycles=2)
+    assert emulator.ram[0x7FFF] == 1
+
+
+@pytest.mark.parametrize("value, jump, taken", [
+    (-1, "JLT", True), (0, "JLT", False), (1, "JGT", True), (0, "JEQ", True),
+    (1, "JEQ", False), (0, "JGE", True), (-1, "JNE", True), (0, "JLE", True),
+])
+def test_should_evaluate_jump_conditions(value, jump, taken):
+    emulator = run(f"@R0\nD=M\n@TAKEN\nD;{jump}\n(END)\n@END\n0;JMP\n(TAKEN)\n@1\nM=1", R0=value)
+    assert emulator.ram[1] == taken
+
+
+def test_should_load_binary_rom(tmp_path):
+    path = tmp_path / f"mult{rom.SUFFIX}"
+    with path.open(mode="wb") as f:
+        rom.write(assemble_words((PROJECT_04 / "Mult" / "Mult.asm").read_text()), f)
+    emulator = Emulator.from_file(path)
+    emulator.ram[0], emulator.ram[1] = 6, 7
+    emulator.run(10_000)
+    assert emulator.ram[2] == 42
+
+
+def test_benchmark_should_report_cycles_per_second():
+    emulator = Emulator(assemble_words("(L)\n@i\nM=M+1\n@L\n0;JMP"))
+    assert benchmark(emulator, 1000) > 0
+    assert emulator.cycles == 1000
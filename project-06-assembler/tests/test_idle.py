@@ -0,0 +1,141 @@
+import pathlib
+import random
+
+import pytest
+
+from assembler import assemble_words
+from emulator import Emulator
+from idle import FastForwardEmulator, is_linear, iterations_until_change
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+# nested counting loops like Sys.wait
+WAIT = """
+@300
+D=A
+@i
+M=D
+(OUTER)
+@120
+D=A
+@j
+M=D
+(INNER)
+@j
+M=M-1
+D=M
+@INNER
+D;JGT
+@i
+MD=M-1
+@OUTER
+D;JGT
+(END)
+@END
+0;JMP
+"""
+
+# busy waiting for a key like Keyboard.readChar
+READ_KEY = """
+(WAIT)
+@SP
+M=M+1
+A=M-1
+M=0
+@KBD
+D=M
+@SP
+M=M-1
+@WAIT
+D;JEQ
+@key
+M=D
+(END)
+@END
+0;JMP
+"""
+
+
+def assert_same_state(emulator, fast):
+    assert (fast.a, fast.d, fast.pc) == (emulator.a, emulator.d, emulator.pc)
+    assert (fast.cycles, fast.halted) == (emulator.cycles, emulator.halted)
+    assert fast.ram == emulator.ram
+
+
+@pytest.mark.parametrize("symbol, linear", [
+    ("D=D+M", True), ("M=M-1", True), ("D=!M", True), ("D=-1", True),
+    ("D=D&M", False), ("D=D|A", False),
+])
+def test_should_recognize_affine_computations(symbol, linear):
+    assert is_linear(assemble_words(symbol)[0]) == linear
+
+
+@pytest.mark.parametrize("out, delta", [
+    (5, -1), (5, -2), (5, 3), (-5, 1), (-5, -4), (0, 7), (32767, 1), (-32768, -1),
+])
+def test_should_predict_sign_change(out, delta):
+    def sign(value):
+        return (value > 0) - (value < 0)
+
+    n = iterations_until_change(out, delta)
+    values = [((out + i * delta + 0x8000) & 0xFFFF) - 0x8000 for i in range(n + 1)]
+    assert all(sign(value) == sign(out) for value in values[:-1])
+    assert sign(values[-1]) != sign(out)
+
+
+def test_should_skip_counting_loops():
+    words = assemble_words(WAIT)
+    emulator, fast = Emulator(words), FastForwardEmulator(words)
+    emulator.run(1_000_000)
+    fast.run(1_000_000)
+    assert fast.halted
+    assert fast.skipped > fast.cycles * 0.9
+    assert_same_state(emulator, fast)
+
+
+@pytest.mark.parametrize("cycles", [1, 50, 1000, 10_000_000])
+def test_should_skip_busy_waiting_until_budget(cycles):
+    fast = FastForwardEmulator(assemble_words(READ_KEY))
+    assert fast.run(cycles) == cycles
+    assert not fast.halted
+
+    emulator = Emulator(assemble_words(READ_KEY))
+    emulator.run(cycles % 100_000)
+    fast.ram[0x6000] = emulator.ram[0x6000] = 65
+    fast.run(100)
+    emulator.run(100)
+    assert fast.ram[16] == 65
+    assert (fast.pc, fast.ram[0]) == (emulator.pc, emulator.ram[0])
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 100, 5000])
+def test_should_run_fill_like_interpreter(chunk):
+    words = assemble_words((PROJECT_04 / "Fill" / "Fill.asm").read_text())
+    emulator, fast = Emulator(words), FastForwardEmulator(words)
+    for step in range(20):
+        for e in (emulator, fast):
+            e.ram[0x6000] = 65 if step % 3 else 0
+            assert e.run(chunk) == chunk
+        assert_same_state(emulator, fast)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_should_match_interpreter_on_random_programs(seed):
+    rng = random.Random(seed)
+    size = 64
+    words = []
+    for _ in range(size // 2):
+        # A never leaves the program, since C-instructions don't write to it
+        words.append(rng.randrange(size))
+        words.append(0xE000 | rng.randrange(0x2000) & ~0b100000)
+        if rng.random() < 0.5:
+            words.append(0xE000 | rng.randrange(0x2000) & ~0b100111)
+    values = [rng.randrange(-5, 5) for _ in range(size)]
+    emulator, fast = Emulator(words), FastForwardEmulator(words)
+    for e in (emulator, fast):
+        for address, value in enumerate(values):
+            e.ram[address] = value
+    for chunk in (3, 50, 500, 5000):
+        emulator.run(chunk)
+        fast.run(chunk)
+        assert_same_state(emulator, fast)
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from assembler import assemble_words
+from linker import ObjectFile, assemble_object, link
+
+OS = """\
+(Sys.init)
+    @counter
+    M=0
+    @Main.main
+    0;JMP
+(Sys.halt)
+    @Sys.halt
+    0;JMP
+"""
+
+APP = """\
+(Main.main)
+    @counter
+    M=M+1
+    @result
+    M=1
+    @Sys.halt
+    0;JMP
+"""
+
+CALLER = """\
+(Main.main)
+    @RETADDR_1
+    D=A
+    @Math.abs
+    0;JMP
+(RETADDR_1)
+    @RETADDR_1
+    0;JMP
+"""
+
+CALLEE = """\
+(Math.abs)
+    @RETADDR_1
+    D=A
+(RETADDR_1)
+    @RETADDR_1
+    0;JMP
+"""
+
+
+def test_should_record_relocations_and_exports():
+    obj = assemble_object(OS)
+    assert obj.exports == {"Sys.init": 0, "Sys.halt": 4}
+    assert obj.relocations == [(0, "counter"), (2, "Main.main"), (4, "Sys.halt")]
+    assert obj.words[1] == 0b1110101010001000
+
+
+def test_should_not_relocate_predefined_symbols():
+    obj = assemble_object("@SP\n@R13\n@42")
+    assert obj.words == [0, 13, 42]
+    assert obj.relocations == []
+
+
+def test_linking_should_match_assembling_concatenated_programs():
+    linked = link([assemble_object(OS), assemble_object(APP)])
+    assert linked == assemble_words(OS + APP)
+
+
+def test_should_resolve_generated_labels_within_their_object():
+    # both translations numbered their first return address RETADDR_1
+    caller = assemble_object(CALLER)
+    callee = assemble_object(CALLEE)
+    assert callee.exports == {"Math.abs": 0}
+    assert callee.local_relocations == [0, 2]
+    linked = link([caller, callee])
+    assert linked == assemble_words(CALLER + CALLEE.replace("RETADDR_1", "RETADDR_2"))
+
+
+def test_should_raise_for_duplicate_symbols():
+    with pytest.raises(ValueError):
+        link([assemble_object(OS), assemble_object(OS)])
+
+
+def test_should_roundtrip_json():
+    obj = assemble_object(OS)
+    f = io.StringIO()
+    obj.dump(f)
+    f.seek(0)
+    assert ObjectFile.load(f) == obj
@@ -0,0 +1,89 @@
+import pathlib
+import random
+
+import pytest
+
+from assembler import assemble_words
+from emulator import ALU, Emulator
+
+np = pytest.importorskip("numpy")
+
+from lockstep import LockstepEmulator, alu  # noqa: E402
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+
+def assert_same_state(emulators, lockstep):
+    for i, emulator in enumerate(emulators):
+        assert (lockstep.a[i], lockstep.d[i]) == (emulator.a, emulator.d)
+        assert (lockstep.pc[i], lockstep.cycles[i]) == (emulator.pc, emulator.cycles)
+        assert lockstep.halted[i] == emulator.halted
+        assert lockstep.ram[i].tolist() == emulator.ram.tolist()
+
+
+@pytest.mark.parametrize("comp", range(64))
+def test_alu_should_match_interpreter(comp):
+    x = np.array([0, 1, -32768, 12345, 7], dtype=np.int16)
+    y = np.array([0, -1, 32767, -2, 7], dtype=np.int16)
+    expected = [ALU[comp](int(a), int(b)) for a, b in zip(x, y)]
+    assert alu(comp, x, y).tolist() == expected
+
+
+def test_should_run_mult_for_every_instance():
+    words = assemble_words((PROJECT_04 / "Mult" / "Mult.asm").read_text())
+    lockstep = LockstepEmulator(words, 50)
+    r0 = np.arange(50, dtype=np.int16)
+    r1 = np.arange(50, dtype=np.int16)[::-1] % 7
+    lockstep.ram[:, 0], lockstep.ram[:, 1] = r0, r1
+    lockstep.run(100_000)
+    assert lockstep.halted.all()
+    assert lockstep.ram[:, 2].tolist() == (r0 * r1).tolist()
+
+    emulators = []
+    for i in range(50):
+        emulator = Emulator(words)
+        emulator.ram[0], emulator.ram[1] = int(r0[i]), int(r1[i])
+        emulator.run(100_000)
+        emulators.append(emulator)
+    assert_same_state(emulators, lockstep)
+
+
+def test_should_stop_when_all_instances_halted():
+    lockstep = LockstepEmulator(assemble_words("@5\nD=A\n(END)\n@END\n0;JMP"), 3)
+    assert lockstep.run(100) == 4
+    assert lockstep.halted.all()
+    assert lockstep.pc.tolist() == [3, 3, 3]
+
+
+def test_should_wrap_around_the_end_of_the_rom():
+    lockstep = LockstepEmulator(assemble_words("@1\nD=A"), 2)
+    emulator = Emulator(assemble_words("@1\nD=A"))
+    lockstep.pc[:] = emulator.pc = 32766
+    lockstep.run(4)
+    emulator.run(4)
+    assert_same_state([emulator, emulator], lockstep)
+    assert emulator.pc == 2
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_should_match_interpreter_on_random_programs(seed):
+    rng = random.Random(seed)
+    size = 64
+    words = []
+    for _ in range(size // 2):
+        # A never leaves the program, since C-instructions don't write to it
+        words.append(rng.randrange(size))
+        words.append(0xE000 | rng.randrange(0x2000) & ~0b100000)
+        if rng.random() < 0.5:
+            words.append(0xE000 | rng.randrange(0x2000) & ~0b100111)
+    instances = 8
+    lockstep = LockstepEmulator(words, instances)
+    emulators = [Emulator(words) for _ in range(instances)]
+    for i, emulator in enumerate(emulators):
+        for address in range(size):
+            emulator.ram[address] = lockstep.ram[i, address] = rng.randrange(-5, 5)
+    for chunk in (3, 50, 500):
+        lockstep.run(chunk)
+        for emulator in emulators:
+            emulator.run(chunk)
+        assert_same_state(emulators, lockstep)
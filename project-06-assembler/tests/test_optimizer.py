@@ -0,0 +1,95 @@
+import pytest
+
+from assembler import assemble, preprocess
+from optimizer import count_instructions, optimize, peephole, remove_unreachable
+
+# push constant 7, push constant 8, add as generated by the VM translator
+PUSH_PUSH_ADD = [
+    "@7", "D=A", "@SP", "A=M", "M=D", "@SP", "M=M+1",
+    "@8", "D=A", "@SP", "A=M", "M=D", "@SP", "M=M+1",
+    "@SP", "AM=M-1", "D=M", "A=A-1", "M=D+M",
+]
+
+
+class TestPeephole:
+    def test_should_remove_reload_of_a_register(self):
+        assert peephole(["@i", "M=0", "@i", "D=M"]) == ["@i", "M=0", "D=M"]
+
+    @pytest.mark.parametrize("symbol", ["@0", "@R0", "@SP"])
+    def test_should_treat_aliases_as_equal(self, symbol):
+        assert peephole(["@SP", "M=0", symbol, "D=M"]) == ["@SP", "M=0", "D=M"]
+
+    def test_should_keep_reload_after_a_register_changed(self):
+        code = ["@SP", "A=M", "@SP", "D=M"]
+        assert peephole(code) == code
+
+    def test_should_keep_reload_after_label(self):
+        code = ["@i", "M=0", "(LOOP)", "@i", "D=M"]
+        assert peephole(code) == code
+
+    def test_should_combine_increment_and_decrement(self):
+        assert peephole(["@SP", "M=M+1", "@SP", "AM=M-1", "D=M"]) == [
+            "@SP", "A=M", "D=M",
+        ]
+
+    def test_should_remove_redundant_load(self):
+        assert peephole(["@x", "M=D", "D=M"]) == ["@x", "M=D"]
+
+    def test_should_shorten_push_push_add(self):
+        optimized = peephole(PUSH_PUSH_ADD)
+        assert count_instructions(optimized) < count_instructions(PUSH_PUSH_ADD)
+        assert "M=M+1" in optimized
+        assert optimized[-1] == "M=D+M"
+
+
+class TestRemoveUnreachable:
+    def test_should_remove_code_after_unconditional_jump(self):
+        code = ["@END", "0;JMP", "D=M", "@x", "(END)", "@END", "0;JMP"]
+        assert remove_unreachable(code) == [
+            "@END", "0;JMP", "(END)", "@END", "0;JMP",
+        ]
+
+    def test_should_remove_unreferenced_block(self):
+        code = ["@END", "0;JMP", "(DEAD)", "@DEAD", "0;JMP", "(END)", "@END", "0;JMP"]
+        assert remove_unreachable(code) == [
+            "@END", "0;JMP", "(END)", "@END", "0;JMP",
+        ]
+
+    def test_should_keep_labels_used_as_data(self):
+        code = ["@RET", "D=A", "@f", "0;JMP", "(RET)", "D=M", "(f)", "A=D", "0;JMP"]
+        assert remove_unreachable(code) == code
+
+    def test_should_keep_fallthrough_after_conditional_jump(self):
+        code = ["@END", "D;JGT", "(DEAD)", "D=M", "(END)"]
+        assert remove_unreachable(code) == code
+
+
+def test_optimize_should_reach_fixed_point():
+    code = ["@A", "0;JMP", "(B)", "@C", "0;JMP", "(C)", "@B", "0;JMP", "(A)", "D=0"]
+    assert optimize(code) == ["@A", "0;JMP", "(A)", "D=0"]
+
+
+def test_preprocess_should_resolve_labels_after_optimizing():
+    symbol_table = {}
+    pure_code = preprocess("@END\n0;JMP\nD=M\n(END)\n@END\n0;JMP", symbol_table, optimize=True)
+    assert pure_code == ["@END", "0;JMP", "@END", "0;JMP"]
+    assert symbol_table == {"END": 2}
+
+
+def test_assemble_should_optimize_on_request():
+    program = "\n".join(PUSH_PUSH_ADD)
+    assert len(assemble(program, optimize=True)) < len(assemble(program))
+
+
+def test_optimized_program_should_compute_the_same():
+    from assembler import assemble_words
+    from emulator import Emulator
+
+    program = "@256\nD=A\n@SP\nM=D\n" + "\n".join(PUSH_PUSH_ADD * 3) + "\n(END)\n@END\n0;JMP"
+    results = []
+    for optimize in (False, True):
+        emulator = Emulator(assemble_words(program, optimize=optimize))
+        emulator.run(1000)
+        assert emulator.halted
+        results.append(emulator.ram[:300].tolist())
+    assert results[0] == results[1]
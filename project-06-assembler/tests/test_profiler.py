@@ -0,0 +1,158 @@
+import pathlib
+
+from assembler import (
+    assemble_with_labels,
+    assemble_words,
+    extract_pseudo_code,
+    resolve_labels,
+)
+from benchmark import compile_jack
+from emulator import Emulator
+from profiler import Profiler, format_profile
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+# two calls of a function in the style of the VM translator
+CALLS = """
+@RETADDR_1
+D=A
+@Main.double
+0;JMP
+(RETADDR_1)
+@RETADDR_2
+D=A
+@Main.double
+0;JMP
+(RETADDR_2)
+(END)
+@END
+0;JMP
+(Main.double)
+@R13
+M=D
+D=D+M
+@LOOP_0
+D;JGT
+(LOOP_0)
+@R13
+A=M
+0;JMP
+"""
+
+SYS = """
+class Sys {
+    function void init() {
+        do Main.main();
+        while (true) {}
+        return;
+    }
+}
+"""
+
+MAIN = """
+class Main {
+    function void main() {
+        do Main.double(3);
+        do Main.double(4);
+        return;
+    }
+
+    function int double(int x) {
+        return x + x;
+    }
+}
+"""
+
+
+def profile(program: str, cycles: int = 100_000, **ram: int) -> Profiler:
+    labels: dict[str, int] = {}
+    resolve_labels(extract_pseudo_code(program), labels)
+    profiler = Profiler(assemble_words(program), labels)
+    for register, value in ram.items():
+        profiler.ram[int(register[1:])] = value
+    profiler.run(cycles)
+    return profiler
+
+
+def test_should_count_like_interpreter():
+    program = (PROJECT_04 / "Mult" / "Mult.asm").read_text()
+    profiler = profile(program, R0=7, R1=9)
+    emulator = Emulator(assemble_words(program))
+    emulator.ram[0], emulator.ram[1] = 7, 9
+    emulator.run(100_000)
+    assert profiler.halted
+    assert (profiler.cycles, profiler.ram) == (emulator.cycles, emulator.ram)
+    assert sum(profiler.counts) == profiler.cycles
+
+
+def test_should_count_every_address():
+    program = (PROJECT_04 / "Mult" / "Mult.asm").read_text()
+    profiler = profile(program, R0=3, R1=2)
+    emulator = Emulator(assemble_words(program))
+    emulator.ram[0], emulator.ram[1] = 3, 2
+    counts = [0] * len(profiler.counts)
+    while not emulator.halted:
+        counts[emulator.pc] += 1
+        emulator.run(1)
+    assert profiler.counts == counts
+
+
+def test_should_count_across_runs_and_the_end_of_the_rom():
+    profiler = Profiler(assemble_words("@1\nD=A"), {})
+    for _ in range(4):
+        profiler.run(10_000)
+    counts = profiler.counts
+    assert counts[0] == counts[40_000 - 32768 - 1] == 2
+    assert counts[40_000 - 32768] == counts[-1] == 1
+
+
+def test_should_fold_counts_onto_labels():
+    profiler = profile(CALLS)
+    profile_ = profiler.flat_profile()
+    assert profile_ == {
+        "Main.double": 10,
+        "LOOP_0": 6,
+        "(start)": 4,
+        "RETADDR_1": 4,
+        "END": 2,
+    }
+    assert list(profiler.flat_profile(by_function=True).items()) == [
+        ("Main.double", 16),
+        ("(start)", 10),
+    ]
+
+
+def test_should_collapse_call_stacks():
+    profiler = profile(CALLS)
+    assert profiler.collapsed_stacks() == [
+        "(start) 10",
+        "(start);Main.double 16",
+    ]
+
+
+def test_should_format_profile_with_rest():
+    report = format_profile({"a": 6, "b": 3, "c": 1}, top=1)
+    assert report.splitlines()[1:] == [
+        "           6   60.0%  a",
+        "           4   40.0%  (2 more)",
+        "          10  100.0%  total",
+    ]
+
+
+def test_should_resolve_callees_of_shared_calls(tmp_path):
+    (tmp_path / "Sys.jack").write_text(SYS)
+    (tmp_path / "Main.jack").write_text(MAIN)
+    words, labels = assemble_with_labels(compile_jack(tmp_path))
+    profiler = Profiler(words, labels)
+    profiler.run(2000)
+    stacks = [line.rpartition(" ")[0] for line in profiler.collapsed_stacks()]
+    assert stacks == [
+        "(start)",
+        "(start);Sys.init",
+        "(start);Sys.init;Main.main",
+        "(start);Sys.init;Main.main;Main.double",
+    ]
+    functions = profiler.flat_profile(by_function=True)
+    assert functions["VM_CALL"] > 0
+    assert functions["VM_RETURN"] > 0
+    assert functions["(start)"] < functions["VM_CALL"]
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+import lookup
+from assembler import assemble, assemble_stream
+from regions import check_budget, find_region, format_report, region_sizes, regions
+
+LABELS = {
+    "Sys.init": 2,
+    "RETADDR_1": 5,
+    "Main.main": 8,
+    "CMP1_TRUE": 9,
+    "CMP1_END": 9,
+    "Main.main$WHILE_0": 10,
+}
+
+
+def test_should_split_program_at_labels():
+    assert regions(LABELS, 12) == [
+        ("(start)", 0, 2),
+        ("Sys.init", 2, 5),
+        ("RETADDR_1", 5, 8),
+        ("Main.main", 8, 9),
+        ("CMP1_END", 9, 10),
+        ("Main.main$WHILE_0", 10, 12),
+    ]
+
+
+def test_should_fold_helper_labels_into_functions():
+    assert region_sizes(LABELS, 12, by_function=True) == {
+        "Sys.init": 6,
+        "Main.main": 4,
+        "(start)": 2,
+    }
+
+
+@pytest.mark.parametrize("address, expected", [
+    (0, "(start)"),
+    (2, "Sys.init"),
+    (7, "Sys.init"),
+    (11, "Main.main"),
+])
+def test_should_find_region_of_address(address, expected):
+    assert find_region(regions(LABELS, 12, by_function=True), address) == expected
+
+
+def test_should_limit_report_to_top_regions():
+    report = format_report({"a": 3, "b": 2, "c": 1}, top=1).splitlines()
+    assert report[1].split() == ["3", "50.0%", "a"]
+    assert report[2].split() == ["3", "50.0%", "(2", "more)"]
+
+
+def test_should_pass_within_budget():
+    check_budget(LABELS, lookup.ROM_SIZE)
+
+
+def test_should_explain_exceeded_budget():
+    with pytest.raises(ValueError, match="exceeds the ROM of 10 words by 2") as e:
+        check_budget(LABELS, 12, rom_size=10)
+    assert "Sys.init" in str(e.value)
+
+
+@pytest.fixture
+def too_large(monkeypatch):
+    monkeypatch.setattr("lookup.ROM_SIZE", 4)
+    return "(Main.main)\n@1\n@2\n(Main.other)\n@3\n@4\n@5"
+
+
+def test_assemble_should_enforce_budget(too_large):
+    with pytest.raises(ValueError, match="Main.other"):
+        assemble(too_large)
+
+
+def test_assemble_stream_should_enforce_budget(too_large):
+    with pytest.raises(ValueError, match="Main.other"):
+        assemble_stream(io.StringIO(too_large), io.StringIO())
@@ -0,0 +1,132 @@
+import io
+import json
+import pathlib
+import xml.etree.ElementTree as ET
+
+import pytest
+from regression import (
+    Result,
+    format_table,
+    load_manifest,
+    parse_address,
+    parse_words,
+    run_cases,
+    write_junit,
+)
+
+MANIFEST = (
+    pathlib.Path(__file__).parents[2] / "project-04-machine-language" / "manifest.json"
+)
+
+
+def write_manifest(tmp_path, cases):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"cases": cases}))
+    return path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_should_pass_project_04_programs(jobs):
+    cases = load_manifest(MANIFEST)
+    results = run_cases(cases, jobs)
+    assert [result.name for result in results] == [case.name for case in cases]
+    assert all(result.passed for result in results)
+    assert all(0 < result.cycles <= case.cycles for result, case in zip(results, cases))
+
+
+def test_should_reset_reused_rom_between_cases(tmp_path):
+    mult = str(MANIFEST.parent / "Mult" / "Mult.asm")
+    path = write_manifest(
+        tmp_path,
+        [
+            {"rom": mult, "ram": {"R0": 2, "R1": 3}, "cycles": 100, "expect": {"R2": 6}},
+            # RAM of the previous case is cleared, so R0 = 0
+            {"rom": mult, "ram": {"R1": 3}, "cycles": 100, "expect": {"R2": 0}},
+        ],
+    )
+    results = run_cases(load_manifest(path))
+    assert [result.name for result in results] == ["manifest[0]", "manifest[1]"]
+    assert all(result.passed for result in results)
+    # both loop R1 times, and the cycle counter restarts
+    assert results[0].cycles == results[1].cycles
+
+
+def test_should_report_failures_and_errors(tmp_path):
+    mult = str(MANIFEST.parent / "Mult" / "Mult.asm")
+    path = write_manifest(
+        tmp_path,
+        [
+            {
+                "name": "wrong",
+                "rom": mult,
+                "ram": {"R0": 2, "R1": 3},
+                "cycles": 20,
+                "halts": True,
+                "expect": {"R2": [7, 0]},
+            },
+            {"name": "missing", "rom": "Missing.hack", "cycles": 10},
+        ],
+    )
+    wrong, missing = run_cases(load_manifest(path))
+    assert wrong.failures == [
+        "didn't halt within 20 cycles",
+        "RAM[2] is 0, expected 7",
+    ]
+    assert missing.error is not None
+    assert missing.error.startswith("FileNotFoundError")
+    assert "missing" in format_table([wrong, missing])
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_should_report_errors_per_case(tmp_path, jobs):
+    invalid = tmp_path / "Invalid.asm"
+    invalid.write_text("@1\nD=Q\n")
+    mult = str(MANIFEST.parent / "Mult" / "Mult.asm")
+    path = write_manifest(
+        tmp_path,
+        [
+            {"name": "invalid", "rom": str(invalid), "cycles": 10},
+            {"name": "overflow", "rom": mult, "ram": {"R0": 40000}, "cycles": 10},
+            {"name": "fine", "rom": mult, "ram": {"R0": 2, "R1": 3}, "cycles": 100},
+        ],
+    )
+    invalid, overflow, fine = run_cases(load_manifest(path), jobs)
+    assert invalid.error is not None and invalid.error.startswith("KeyError")
+    assert overflow.error is not None and overflow.error.startswith("OverflowError")
+    assert fine.passed
+
+
+def test_should_write_junit_xml():
+    results = [
+        Result("good", 10, 0.5),
+        Result("bad", 20, 0.25, ["RAM[2] is 0, expected 7", "RAM[3] is 1, expected 0"]),
+        Result("broken", error="ValueError: Invalid RAM address: 'X'"),
+    ]
+    f_out = io.StringIO()
+    write_junit(results, f_out, "mult")
+    suite = ET.fromstring(f_out.getvalue().split("?>", 1)[1])
+    assert suite.attrib == {
+        "name": "mult",
+        "tests": "3",
+        "failures": "1",
+        "errors": "1",
+        "time": "0.750",
+    }
+    good, bad, broken = suite.findall("testcase")
+    assert good.find("failure") is None
+    assert bad.find("failure").attrib["message"] == "RAM[2] is 0, expected 7"
+    assert len(bad.find("failure").text.splitlines()) == 2
+    assert broken.find("error") is not None
+
+
+@pytest.mark.parametrize(
+    "key, address", [("0", 0), ("R15", 15), ("SCREEN", 16384), ("KBD", 24576)]
+)
+def test_should_parse_address(key, address):
+    assert parse_address(key) == address
+
+
+@pytest.mark.parametrize("content", [{"LOOP": 1}, {"32768": 1}, {"32767": [1, 2]}])
+def test_should_reject_invalid_addresses(content):
+    with pytest.raises(ValueError):
+        parse_words(content)
@@ -0,0 +1,92 @@
+import pytest
+
+from assembler import assemble_with_labels
+from emulator import Emulator
+from replay import Event, Replay, parse_events, parse_key
+
+# copy the pressed key to R0 and count the frames in R1
+FRAMES = """
+(FRAME)
+@KBD
+D=M
+@R0
+M=D
+@R1
+M=M+1
+@FRAME
+0;JMP
+"""
+
+
+def replay(events: list[Event]) -> Replay:
+    words, labels = assemble_with_labels(FRAMES)
+    return Replay(Emulator(words), events, labels["FRAME"])
+
+
+@pytest.mark.parametrize("text, code", [
+    ("a", 97),
+    ("P", 80),
+    ("none", 0),
+    ("Left", 130),
+    ("esc", 140),
+    ("f12", 152),
+    ("7", 55),
+    ("65", 65),
+])
+def test_should_parse_key(text, code):
+    assert parse_key(text) == code
+
+
+def test_should_reject_unknown_key():
+    with pytest.raises(ValueError):
+        parse_key("shift")
+
+
+def test_should_parse_events():
+    script = """
+    # start the game
+    100  p   # play
+    200  none
+
+    3f   up
+    """
+    assert parse_events(script) == [
+        Event(100, 112),
+        Event(200, 0),
+        Event(3, 131, in_frames=True),
+    ]
+
+
+def test_should_press_keys_at_cycles():
+    game = replay([Event(20, 66), Event(0, 65)])
+    assert game.run(cycles=16) == 16
+    assert game.emulator.ram[0] == 65
+    game.run(cycles=16)
+    assert game.emulator.ram[0] == 66
+    assert game.emulator.cycles == 32
+
+
+def test_should_press_keys_at_frames():
+    game = replay([Event(2, 130, in_frames=True), Event(3, 0, in_frames=True)])
+    assert game.run(frames=2) == 16
+    assert game.emulator.ram[0] == 0
+    game.run(frames=1)
+    assert game.emulator.ram[0] == 130
+    assert game.emulator.ram[1] == game.frames == 3
+    game.run(frames=1)
+    assert game.emulator.ram[0] == 0
+
+
+def test_should_stop_at_first_limit():
+    game = replay([])
+    assert game.run(cycles=100, frames=2) == 16
+    assert game.run(cycles=10, frames=2) == 10
+
+
+def test_should_require_frame_address():
+    with pytest.raises(ValueError):
+        Replay(Emulator([]), [Event(1, 65, in_frames=True)])
+    with pytest.raises(ValueError):
+        Replay(Emulator([]), []).run(frames=1)
+    with pytest.raises(ValueError):
+        replay([]).run()
@@ -0,0 +1,62 @@
+import io
+from array import array
+
+import pytest
+
+import rom
+from assembler import AInstruction, CInstruction, assemble, assemble_words
+
+PROGRAM = "@x\nM=0\n(LOOP)\n@LOOP\n0;JMP\nAM=M-1\n@32767\nD;JGE"
+
+
+@pytest.mark.parametrize("token", [
+    AInstruction(0),
+    AInstruction(32767),
+    CInstruction(0, 0, 0, 0),
+    CInstruction(1, 0b111111, 0b101, 0b011),
+])
+def test_should_convert_instruction_to_int(token):
+    assert int(token) == int(str(token), 2)
+
+
+def test_should_assemble_same_words_as_text():
+    words = assemble_words(PROGRAM)
+    assert [f"{word:016b}" for word in words] == assemble(PROGRAM).split("\n")
+
+
+def test_should_roundtrip_binary_image():
+    words = assemble_words(PROGRAM)
+    f = io.BytesIO()
+    rom.write(words, f)
+    data = f.getvalue()
+    assert len(data) == rom.HEADER.size + 2 * len(words)
+    assert rom.loads(data) == words
+
+
+def test_should_load_text_hack_file():
+    assert rom.loads(assemble(PROGRAM).encode()) == assemble_words(PROGRAM)
+
+
+def test_should_map_binary_image(tmp_path):
+    words = assemble_words(PROGRAM)
+    path = tmp_path / f"prog{rom.SUFFIX}"
+    with path.open(mode="wb") as f:
+        rom.write(words, f)
+    assert rom.map_words(path).tolist() == words.tolist()
+    assert rom.load(path) == words
+
+
+@pytest.mark.parametrize("data", [
+    rom.MAGIC,
+    rom.HEADER.pack(rom.MAGIC, 99, 0, 0),
+    rom.HEADER.pack(rom.MAGIC, rom.VERSION, 0, 2) + b"\0\0",
+])
+def test_should_reject_invalid_image(data):
+    with pytest.raises(ValueError):
+        rom.loads(data)
+
+
+def test_should_write_little_endian():
+    f = io.BytesIO()
+    rom.write(array("H", [0x1234]), f)
+    assert f.getvalue()[rom.HEADER.size:] == b"\x34\x12"
@@ -0,0 +1,88 @@
+from multiprocessing import shared_memory
+
+import pytest
+
+from assembler import assemble_words
+from emulator import Emulator
+
+np = pytest.importorskip("numpy")
+
+from screen import (  # noqa: E402
+    HEIGHT,
+    SCREEN,
+    WIDTH,
+    attach,
+    detach,
+    diff,
+    from_pbm,
+    map_file,
+    press,
+    screenshot,
+    share,
+    to_pbm,
+)
+
+# copy the pressed key to the top left word of the screen
+ECHO_KEY = """
+(LOOP)
+@KBD
+D=M
+@SCREEN
+M=D
+@LOOP
+0;JMP
+"""
+
+
+def test_should_unpack_pixels_from_left_to_right():
+    emulator = Emulator([])
+    emulator.ram[SCREEN] = 0b101
+    emulator.ram[SCREEN + 33] = -32768
+    image = screenshot(emulator.ram)
+    assert image.shape == (HEIGHT, WIDTH)
+    assert diff(np.zeros_like(image), image).tolist() == [[0, 0], [0, 2], [1, 31]]
+
+
+def test_should_roundtrip_portable_bitmap():
+    rng = np.random.default_rng(0)
+    image = rng.random((HEIGHT, WIDTH)) < 0.5
+    assert (from_pbm(to_pbm(image)) == image).all()
+    with pytest.raises(ValueError):
+        from_pbm(b"P1\n1 1\n0")
+
+
+def test_should_share_ram_with_other_process():
+    emulator = Emulator(assemble_words(ECHO_KEY))
+    emulator.ram[0] = 256
+    memory = share(emulator)
+    try:
+        viewer = shared_memory.SharedMemory(memory.name)
+        assert emulator.ram[0] == 256
+        press(viewer.buf, 65)
+        emulator.run(100)
+        assert screenshot(viewer.buf)[0, :8].tolist() == [1, 0, 0, 0, 0, 0, 1, 0]
+        press(viewer.buf, 0)
+        emulator.run(100)
+        assert not screenshot(viewer.buf).any()
+        viewer.close()
+    finally:
+        detach(emulator)
+        memory.close()
+        memory.unlink()
+    assert emulator.ram[0] == 256
+
+
+def test_should_map_ram_to_file(tmp_path):
+    emulator = Emulator(assemble_words(ECHO_KEY))
+    buffer = map_file(emulator, tmp_path / "ram")
+    press(buffer, 3)
+    emulator.run(100)
+    detach(emulator)
+    buffer.close()
+    data = (tmp_path / "ram").read_bytes()
+    assert screenshot(data)[0, :2].tolist() == [1, 1]
+
+
+def test_should_reject_small_buffer():
+    with pytest.raises(ValueError):
+        attach(Emulator([]), bytearray(100))
@@ -0,0 +1,85 @@
+import io
+import pathlib
+
+import pytest
+
+from assembler import assemble_words
+from emulator import Emulator
+from snapshot import HEADER, SUFFIX, Snapshot, rom_hash
+from turbo import TurboEmulator
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+
+@pytest.fixture
+def booted():
+    words = assemble_words((PROJECT_04 / "Mult" / "Mult.asm").read_text())
+    emulator = Emulator(words)
+    emulator.ram[0], emulator.ram[1] = -3, 20
+    emulator.ram[30000] = 1234
+    emulator.run(50)
+    return emulator
+
+
+def assert_same_state(emulator, other):
+    assert (other.a, other.d, other.pc) == (emulator.a, emulator.d, emulator.pc)
+    assert (other.cycles, other.halted) == (emulator.cycles, emulator.halted)
+    assert other.ram == emulator.ram
+
+
+def test_should_restore_into_fresh_emulator(booted):
+    snapshot = Snapshot.capture(booted)
+    resumed = TurboEmulator(booted.rom)
+    snapshot.restore(resumed)
+    assert_same_state(booted, resumed)
+
+    booted.run(10_000)
+    resumed.run(10_000)
+    assert resumed.halted
+    assert resumed.ram[2] == -60
+    assert_same_state(booted, resumed)
+
+
+def test_should_fork_from_mapped_file(booted, tmp_path):
+    path = tmp_path / f"boot{SUFFIX}"
+    with path.open(mode="wb") as f:
+        Snapshot.capture(booted).dump(f)
+    snapshot = Snapshot.load(path)
+
+    results = []
+    for r1 in (10, 15, 20):
+        emulator = Emulator(booted.rom)
+        snapshot.restore(emulator)
+        assert_same_state(booted, emulator)
+        emulator.ram[1] = r1
+        emulator.run(10_000)
+        results.append(emulator.ram[2])
+    assert results == [-30, -45, -60]
+
+
+def test_should_roundtrip_binary_format(booted):
+    f = io.BytesIO()
+    Snapshot.capture(booted).dump(f)
+    assert Snapshot.loads(f.getvalue()) == Snapshot.capture(booted)
+
+
+def test_should_reject_other_program(booted):
+    snapshot = Snapshot.capture(booted)
+    with pytest.raises(ValueError):
+        snapshot.restore(Emulator(assemble_words("@0\nD=A")))
+
+
+@pytest.mark.parametrize("data", [
+    b"HSNP",
+    HEADER.pack(b"NOPE", 1, 0, bytes(32), 0, 0, 0, 0) + bytes(0x10000),
+    HEADER.pack(b"HSNP", 9, 0, bytes(32), 0, 0, 0, 0) + bytes(0x10000),
+    HEADER.pack(b"HSNP", 1, 0, bytes(32), 0, 0, 0, 0) + bytes(100),
+])
+def test_should_reject_invalid_snapshot(data):
+    with pytest.raises(ValueError):
+        Snapshot.loads(data)
+
+
+def test_should_hash_program():
+    assert rom_hash([1, 2]) != rom_hash([2, 1])
+    assert len(rom_hash([])) == 32
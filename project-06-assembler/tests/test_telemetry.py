@@ -0,0 +1,171 @@
+import io
+
+import pytest
+import regions
+from assembler import assemble_with_labels
+from emulator import Emulator
+from telemetry import (
+    HEAP,
+    HEAP_SIZE,
+    LCL,
+    HeapStats,
+    Telemetry,
+    call_stack,
+    heap_stats,
+    write_csv,
+)
+
+# push 40 words onto the stack and pop them again, forever
+STACK_WAVE = """
+@256
+D=A
+@SP
+M=D
+(PUSH)
+@SP
+AM=M+1
+A=A-1
+M=-1
+D=A
+@295
+D=D-A
+@PUSH
+D;JLT
+(POP)
+@SP
+M=M-1
+D=M
+@256
+D=D-A
+@POP
+D;JGT
+@PUSH
+0;JMP
+"""
+
+
+def init(ram):
+    """Initialize the free list like Memory.init."""
+    ram[HEAP] = 0
+    ram[HEAP + 1] = HEAP_SIZE
+
+
+def alloc(ram, size):
+    """Carve a block from the first segment large enough like Memory.alloc."""
+    current = HEAP
+    while ram[current + 1] < size + 2:
+        current = ram[current]
+    block = current + 2 + ram[current + 1] - size
+    ram[block - 2] = 0
+    ram[block - 1] = size
+    ram[current + 1] -= size + 2
+    return block
+
+
+def de_alloc(ram, block):
+    """Append a block to the free list like Memory.deAlloc."""
+    current = HEAP
+    while ram[current]:
+        current = ram[current]
+    ram[current] = block - 2
+
+
+def test_should_ignore_uninitialized_heap():
+    assert heap_stats(Emulator([]).ram) == HeapStats(0, 0, 0, 0, 0)
+
+
+def test_should_count_live_and_free_blocks():
+    ram = Emulator([]).ram
+    init(ram)
+    blocks = [alloc(ram, size) for size in (3, 10, 5, 7)]
+    de_alloc(ram, blocks[1])
+    de_alloc(ram, blocks[3])
+    alloc(ram, 4)  # first fit is the initial segment
+    assert heap_stats(ram) == HeapStats(
+        live_blocks=3,
+        live_words=3 + 5 + 4,
+        free_segments=3,
+        free_words=HEAP_SIZE - 39 + 10 + 7,
+        largest_free=HEAP_SIZE - 39,
+    )
+
+
+def test_should_walk_blocks_carved_from_freed_segments():
+    ram = Emulator([]).ram
+    init(ram)
+    block = alloc(ram, 20)
+    alloc(ram, HEAP_SIZE - 24)  # leave nothing for the initial segment
+    de_alloc(ram, block)
+    alloc(ram, 6)
+    alloc(ram, 4)
+    stats = heap_stats(ram)
+    assert not stats.corrupt
+    assert (stats.live_blocks, stats.live_words) == (3, HEAP_SIZE - 24 + 6 + 4)
+    assert (stats.free_segments, stats.free_words) == (2, 20 - 8 - 6)
+
+
+def test_should_detect_corrupt_heap():
+    ram = Emulator([]).ram
+    init(ram)
+    block = alloc(ram, 8)
+    ram[block - 1] = 9  # overflow into the size of the next block
+    assert heap_stats(ram).corrupt
+    ram[block - 1] = 8
+    ram[block - 2] = HEAP  # free list with a cycle
+    de_alloc(ram, block)
+    assert heap_stats(ram).corrupt
+
+
+def test_should_walk_frames():
+    words, labels = assemble_with_labels(
+        "@0\n(Main.main)\n@0\n@0\n(Main.f)\n@0\n(IF_0)\n@0"
+    )
+    emulator = Emulator(words)
+    ram = emulator.ram
+    # Main.main called by the bootstrap at 261, Main.f called by it at 300
+    ram[LCL] = 300
+    ram[300 - 5], ram[300 - 4] = labels["Main.main"] + 1, 261
+    ram[261 - 5], ram[261 - 4] = 0, 0
+    function_regions = regions.regions(labels, len(words), by_function=True)
+    assert call_stack(ram, labels["IF_0"], function_regions) == [
+        "Main.f",
+        "Main.main",
+        "(start)",
+    ]
+
+
+def test_should_find_exact_stack_high_water_mark():
+    words, labels = assemble_with_labels(STACK_WAVE)
+    telemetry = Telemetry(Emulator(words), labels, interval=1000, paint=True)
+    telemetry.run(10_000)
+    assert len(telemetry.samples) == 10
+    assert telemetry.sp_high_water == 296
+    # sampling alone only sees wherever SP happens to be
+    assert {sample.sp for sample in telemetry.samples} != {296}
+
+
+def test_should_not_change_the_run():
+    words, labels = assemble_with_labels(STACK_WAVE)
+    emulator = Emulator(words)
+    emulator.run(10_000)
+    telemetry = Telemetry(Emulator(words), labels, interval=1000)
+    telemetry.run(10_000)
+    observed = telemetry.emulator
+    assert (observed.cycles, observed.pc) == (emulator.cycles, emulator.pc)
+    assert observed.ram == emulator.ram
+
+
+def test_should_write_time_series():
+    words, labels = assemble_with_labels(STACK_WAVE)
+    telemetry = Telemetry(Emulator(words), labels, interval=50)
+    telemetry.run(120)
+    f_out = io.StringIO()
+    write_csv(telemetry.samples, f_out)
+    header, *rows = f_out.getvalue().splitlines()
+    assert header.startswith("cycles,sp,sp_high_water,depth,live_blocks")
+    assert [row.split(",")[0] for row in rows] == ["50", "100", "120"]
+
+
+def test_should_reject_empty_interval():
+    with pytest.raises(ValueError):
+        Telemetry(Emulator([]), interval=0)
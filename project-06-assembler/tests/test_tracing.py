@@ -0,0 +1,74 @@
+import pathlib
+
+import pytest
+
+from assembler import assemble_words
+from emulator import Emulator
+
+np = pytest.importorskip("numpy")
+
+from tracing import HEADER, MAGIC, Recorder, Trace, TracingEmulator  # noqa: E402
+
+PROJECT_04 = pathlib.Path(__file__).resolve().parents[2] / "project-04-machine-language"
+
+
+def record(tmp_path, cycles, chunk=None, **kwargs):
+    words = assemble_words((PROJECT_04 / "Mult" / "Mult.asm").read_text())
+    recorder = Recorder(tmp_path, **kwargs)
+    emulator = TracingEmulator(words, recorder)
+    emulator.ram[0], emulator.ram[1] = 7, 30
+    for _ in range(0, cycles, chunk or cycles):
+        emulator.run(chunk or cycles)
+    recorder.close()
+    return emulator
+
+
+def test_should_record_every_cycle(tmp_path):
+    emulator = record(tmp_path, 1000)
+    trace = Trace(tmp_path)
+    assert (trace.start, len(trace)) == (0, emulator.cycles)
+
+    reference = Emulator(emulator.rom)
+    reference.ram[0], reference.ram[1] = 7, 30
+    for cycle in range(emulator.cycles):
+        pc = reference.pc
+        reference.run(1)
+        pc_, a, d, address, value = trace.cycles(cycle, cycle + 1)[0].tolist()
+        assert (pc_, a, d) == (pc, reference.a, reference.d)
+        if address >= 0:
+            assert reference.ram[address] == value
+    assert reference.ram[2] == 210
+
+
+def test_should_rotate_segments(tmp_path):
+    emulator = record(tmp_path, 100, chunk=7, capacity=16)
+    trace = Trace(tmp_path)
+    assert len(trace.segments) == -(-emulator.cycles // 16)
+    assert len(trace) == emulator.cycles
+    complete = trace.cycles(0, emulator.cycles)
+    assert len(complete) == emulator.cycles
+    assert complete[10:40].tolist() == trace.cycles(10, 40).tolist()
+
+
+def test_should_keep_newest_segments(tmp_path):
+    record(tmp_path, 100, capacity=16, max_segments=2)
+    trace = Trace(tmp_path)
+    assert len(trace.segments) == 2
+    assert trace.start == 80
+    assert len(trace.cycles(0, 90)) == 10
+    assert len(trace.cycles(200, 300)) == 0
+
+
+def test_should_replace_former_recording(tmp_path):
+    record(tmp_path, 100, capacity=16)
+    record(tmp_path, 10, capacity=16)
+    assert len(Trace(tmp_path)) == 10
+
+
+def test_should_reject_invalid_segment(tmp_path):
+    (tmp_path / "000000.trace").write_bytes(HEADER.pack(b"NOPE", 1, 0, 0, 0))
+    with pytest.raises(ValueError):
+        Trace(tmp_path)
+    (tmp_path / "000000.trace").write_bytes(MAGIC)
+    with pytest.raises(ValueError):
+        Trace(tmp_path)
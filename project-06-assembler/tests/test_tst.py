@@ -0,0 +1,202 @@
+import pathlib
+import shutil
+
+import pytest
+from assembler import assemble_with_labels
+from tst import (
+    Column,
+    Command,
+    ScriptRunner,
+    VMEmulator,
+    matches,
+    parse_column,
+    parse_script,
+    parse_value,
+    run_script,
+)
+
+PROJECT_04 = pathlib.Path(__file__).parents[2] / "project-04-machine-language"
+
+MULT_TST = """
+// Tests the Mult program.
+load Mult.asm,
+output-file Mult.out,
+compare-to Mult.cmp,
+output-list RAM[0]%D2.6.2 RAM[1]%D2.6.2 RAM[2]%D2.6.2;
+
+set RAM[0] 0, set RAM[1] 0, set RAM[2] -1;
+repeat 20 { ticktock; }
+output;
+
+set PC 0, set RAM[0] 6, set RAM[1] 7, set RAM[2] -1;
+repeat 150 {
+  ticktock;
+}
+output;
+"""
+
+MULT_CMP = """\
+|  RAM[0]  |  RAM[1]  |  RAM[2]  |
+|       0  |       0  |       0  |
+|       6  |       7  |      42  |
+"""
+
+# translation of `push constant 7`, `push constant 8`, `add`
+SIMPLE_ADD = """
+(VM_STEP_0)
+@7
+D=A
+@SP
+A=M
+M=D
+@SP
+M=M+1
+(VM_STEP_1)
+@8
+D=A
+@SP
+A=M
+M=D
+@SP
+M=M+1
+(VM_STEP_2)
+@SP
+AM=M-1
+D=M
+A=A-1
+M=D+M
+(VM_END)
+@VM_END
+0;JMP
+"""
+
+
+def write_script(tmp_path, tst, cmp):
+    shutil.copy(PROJECT_04 / "Mult" / "Mult.asm", tmp_path)
+    (tmp_path / "Mult.tst").write_text(tst)
+    (tmp_path / "Mult.cmp").write_text(cmp)
+    return tmp_path / "Mult.tst"
+
+
+def simple_add():
+    words, labels = assemble_with_labels(SIMPLE_ADD)
+    starts = [address for label, address in labels.items() if "STEP" in label]
+    runner = ScriptRunner(pathlib.Path())
+    runner.emulator = VMEmulator(words, starts)
+    return runner
+
+
+def test_should_parse_script():
+    commands = parse_script(
+        "load Mult.asm, /* block\ncomment */ echo \"a b\";\n"
+        "repeat 3 { tick, tock; output; } // end"
+    )
+    assert commands == [
+        Command("load", ["Mult.asm"]),
+        Command("echo", ['"a b"']),
+        Command(
+            "repeat", ["3"], [Command("tick"), Command("tock"), Command("output")]
+        ),
+    ]
+
+
+@pytest.mark.parametrize("text", ["repeat 2 { tick;", "tick; }", "while A { tick; }"])
+def test_should_reject_invalid_script(text):
+    with pytest.raises(ValueError):
+        parse_script(text)
+
+
+@pytest.mark.parametrize("text, header, cell", [
+    ("RAM[0]%D2.6.2", "  RAM[0]  ", "      -1  "),
+    ("A", "        A         ", " 1111111111111111 "),
+    ("RAM[16384]%X1.4.1", "RAM[16", " FFFF "),
+    ("D%B1.16.1", "        D         ", " 1111111111111111 "),
+    ("time%S1.4.1", " time ", " -1   "),
+])
+def test_should_format_columns(text, header, cell):
+    column = parse_column(text)
+    assert (column.header(), column.cell(-1)) == (header, cell)
+
+
+def test_should_truncate_long_values():
+    assert Column("RAM[0]", "D", 1, 3, 1).cell(12345) == " 12345 "
+    assert Column("RAM[0]", "X", 0, 2, 0).cell(0x1234) == "34"
+
+
+@pytest.mark.parametrize("text, value", [
+    ("42", 42), ("-1", -1), ("%X7FFF", 32767), ("%XFFFF", -1), ("%B101", 5), ("%D-3", -3),
+])
+def test_should_parse_values(text, value):
+    assert parse_value(text) == value
+
+
+def test_should_match_wildcards():
+    assert matches("|   42 |", "|  *** |  ")
+    assert not matches("|   42 |", "|   43 |")
+    assert not matches("|   42 |", "|   42 |   0 |")
+
+
+def test_should_pass_script(tmp_path):
+    result = run_script(write_script(tmp_path, MULT_TST, MULT_CMP))
+    assert result.failure is None
+    assert result.output == MULT_CMP.splitlines()
+    assert result.output_file == tmp_path / "Mult.out"
+    assert result.cycles > 0
+
+
+def test_should_report_first_difference(tmp_path):
+    cmp = MULT_CMP.replace("42", "43")
+    result = run_script(write_script(tmp_path, MULT_TST + "output;\n", cmp))
+    assert result.failure == "Comparison failure at line 3"
+    assert len(result.output) == 3
+
+
+def test_should_run_repeated_ticks_at_once(tmp_path):
+    tst = "load Mult.asm, output-list time%D1.8.1; repeat 1000000 { tick; tock; } output;"
+    (tmp_path / "Fill.asm").write_text((PROJECT_04 / "Fill" / "Fill.asm").read_text())
+    result = run_script(write_script(tmp_path, tst.replace("Mult", "Fill"), ""))
+    assert result.output[-1] == "|  1000000 |"
+
+
+def test_should_repeat_blocks_with_output(tmp_path):
+    tst = "load Mult.asm, output-list time%D1.3.1; repeat 3 { ticktock; output; }"
+    result = run_script(write_script(tmp_path, tst, ""))
+    assert result.output[1:] == ["|   1 |", "|   2 |", "|   3 |"]
+
+
+def test_should_count_vm_steps():
+    runner = simple_add()
+    runner.execute(parse_script(
+        "set sp 256, output-list sp%D1.6.1 RAM[256]%D1.6.1 RAM[257]%D1.6.1;"
+        "repeat 2 { vmstep; } output; vmstep; output; repeat 5 { vmstep; } output;"
+    ))
+    assert runner.result.output[1:] == [
+        "|    258 |      7 |      8 |",
+        "|    257 |     15 |      8 |",
+        "|    257 |     15 |      8 |",
+    ]
+    assert runner.emulator.halted
+
+
+def test_should_access_vm_segments():
+    runner = simple_add()
+    runner.execute(parse_script(
+        "set local 300, set argument 400, set this 3000, set that 3010,"
+        "set local[2] 1, set argument[1] 2, set this[0] 3, set that[4] 4,"
+        "set temp[1] 5, set pointer[1] 6;"
+    ))
+    ram = runner.emulator.ram
+    assert (ram[302], ram[401], ram[3000], ram[3014]) == (1, 2, 3, 4)
+    assert (ram[6], ram[4]) == (5, 6)
+
+
+@pytest.mark.parametrize("text", ["ticktock;", "set RAM[32768] 0;", "set sp[1] 0;", "breakpoint PC 0;"])
+def test_should_reject_unsupported_vm_commands(text):
+    runner = simple_add()
+    with pytest.raises(ValueError):
+        runner.execute(parse_script(text))
+
+
+def test_should_reject_vm_steps_at_cpu_level(tmp_path):
+    with pytest.raises(ValueError):
+        run_script(write_script(tmp_path, "load Mult.asm, vmstep;", ""))
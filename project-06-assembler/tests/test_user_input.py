@@ -0,0 +1,43 @@
+import pytest
+
+import rom
+from assembler import assemble, main
+
+PROGRAM = "@i\nM=0\n(LOOP)\n@LOOP\n0;JMP"
+
+
+@pytest.fixture
+def asm_dir(tmp_path):
+    (tmp_path / "b.asm").write_text(PROGRAM)
+    (tmp_path / "a.asm").write_text(PROGRAM)
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_main_should_take_directory(asm_dir, jobs):
+    assert main(str(asm_dir), jobs=jobs) == 0
+    for name in ("a", "b"):
+        assert (asm_dir / f"{name}.hack").read_text() == assemble(PROGRAM)
+
+
+def test_main_should_write_binary_rom(asm_dir):
+    main(str(asm_dir / "a.asm"), binary=True)
+    assert rom.load(asm_dir / f"a{rom.SUFFIX}").tolist() == [16, 0xEA88, 2, 0xEA87]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_main_should_continue_after_failure(asm_dir, jobs, capsys):
+    (asm_dir / "0.asm").write_text("D=Q")
+    assert main(str(asm_dir), jobs=jobs) == 1
+    assert (asm_dir / "a.hack").exists()
+    assert (asm_dir / "b.hack").exists()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines[:3]] == ["0.asm", "a.asm", "b.asm"]
+    assert "FAILED" in lines[0]
+    assert lines[-1] == "3 files, 2 assembled, 1 failed, 8 instructions"
+
+
+def test_main_should_raise_for_nonexistent_path():
+    with pytest.raises(FileNotFoundError):
+        main("/does_not_exist")
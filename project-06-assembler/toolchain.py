@@ -0,0 +1,29 @@
+"""Locate the compiler, the VM translator and the OS of the other projects.
+
+The compiler and the VM translator are imported as top-level modules, so
+their directories are added to `sys.path` once, when this module is
+imported. Their modules are only imported when needed.
+"""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+COMPILER = ROOT / "project-10-11-Compiler"
+VM_TRANSLATOR = ROOT / "project-07-08-vm"
+OS = ROOT / "project-12-OS"
+
+for path in (str(VM_TRANSLATOR), str(COMPILER)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def vm_translator() -> tuple[type, type]:
+    """Import the parser and the code writer of the VM translator."""
+    from parser import Parser  # type: ignore[import-not-found]
+
+    from code_writers import CodeWriter  # type: ignore[import-not-found]
+
+    return Parser, CodeWriter
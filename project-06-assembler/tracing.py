@@ -0,0 +1,222 @@
+"""Record executions of Hack programs in memory-mapped trace files."""
+
+from __future__ import annotations
+
+import pathlib
+import struct
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+from emulator import Emulator
+
+SUFFIX = ".trace"
+MAGIC = b"HTRC"
+VERSION = 1
+
+# magic, version, reserved, cycle of the first record, number of records;
+# followed by the preallocated records
+HEADER = struct.Struct("<4sHHQQ")
+
+# executed address, A and D afterwards, written address (-1 if none), value
+RECORD = np.dtype([
+    ("pc", "<i2"),
+    ("a", "<i2"),
+    ("d", "<i2"),
+    ("address", "<i2"),
+    ("value", "<i2"),
+])
+
+# number of cycles recorded in memory before they are appended to the file
+BATCH = 1 << 16
+
+
+class Recorder:
+    """Append trace records to preallocated segment files in a directory.
+
+    Every segment holds `capacity` records. When it is full, recording
+    continues in the next one, and the oldest segments are deleted so that at
+    most `max_segments` remain. Segments of a former recording are replaced.
+    """
+
+    def __init__(
+        self,
+        directory: str | pathlib.Path,
+        capacity: int = 1 << 24,
+        max_segments: int | None = None,
+    ):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            path.unlink()
+        self.capacity = capacity
+        self.max_segments = max_segments
+        self._segments: list[pathlib.Path] = []
+        self._raw: np.memmap | None = None
+        self._records = np.empty(0, dtype=RECORD)
+        self._first = 0
+        self._count = 0
+
+    def append(self, records: np.ndarray, cycle: int) -> None:
+        """Append records, the first of which was executed in `cycle`."""
+        while len(records):
+            if self._raw is None or self._count == self.capacity:
+                self._rotate(cycle)
+            size = min(len(records), self.capacity - self._count)
+            self._records[self._count:self._count + size] = records[:size]
+            self._count += size
+            records = records[size:]
+            cycle += size
+        self._write_header()
+
+    def _rotate(self, cycle: int) -> None:
+        """Close the current segment and start a new one at `cycle`."""
+        self.close()
+        index = int(self._segments[-1].stem) + 1 if self._segments else 0
+        path = self.directory / f"{index:06d}{SUFFIX}"
+        with path.open(mode="wb") as f_out:
+            f_out.truncate(HEADER.size + self.capacity * RECORD.itemsize)
+        self._segments.append(path)
+        self._raw = np.memmap(path, dtype=np.uint8, mode="r+")
+        self._records = self._raw[HEADER.size:].view(RECORD)
+        self._first = cycle
+        self._count = 0
+        self._write_header()
+
+        if self.max_segments is not None:
+            while len(self._segments) > self.max_segments:
+                self._segments.pop(0).unlink()
+
+    def _write_header(self) -> None:
+        """Store the number of valid records of the current segment."""
+        if self._raw is not None:
+            HEADER.pack_into(
+                self._raw.data, 0, MAGIC, VERSION, 0, self._first, self._count
+            )
+
+    def close(self) -> None:
+        """Flush the current segment to disk."""
+        if self._raw is not None:
+            self._write_header()
+            self._raw.flush()
+            self._raw = None
+            self._records = np.empty(0, dtype=RECORD)
+
+
+class Trace:
+    """Access the records of a trace by cycle without loading it entirely."""
+
+    def __init__(self, directory: str | pathlib.Path):
+        # (cycle of the first record, records) of every segment
+        self.segments: list[tuple[int, np.ndarray]] = []
+        for path in sorted(pathlib.Path(directory).glob(f"*{SUFFIX}")):
+            raw = np.memmap(path, dtype=np.uint8, mode="r")
+            if len(raw) < HEADER.size:
+                raise ValueError(f"Truncated trace header: {path}")
+            magic, version, _, first, count = HEADER.unpack_from(raw.data)
+            if magic != MAGIC:
+                raise ValueError(f"Invalid trace magic: {magic!r}")
+            if version != VERSION:
+                raise ValueError(f"Unsupported trace version: {version}")
+            end = HEADER.size + count * RECORD.itemsize
+            self.segments.append((first, raw[HEADER.size:end].view(RECORD)))
+
+    @property
+    def start(self) -> int:
+        """Cycle of the first record."""
+        return self.segments[0][0] if self.segments else 0
+
+    @property
+    def stop(self) -> int:
+        """Cycle after the last record."""
+        if not self.segments:
+            return 0
+        first, records = self.segments[-1]
+        return first + len(records)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def cycles(self, start: int, stop: int) -> np.ndarray:
+        """Return the records of the cycles from `start` up to `stop`."""
+        parts = [
+            records[max(start - first, 0):max(stop - first, 0)]
+            for first, records in self.segments
+            if first < stop and start < first + len(records)
+        ]
+        if not parts:
+            return np.empty(0, dtype=RECORD)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+class TracingEmulator(Emulator):
+    """Execute Hack machine code recording every instruction."""
+
+    def __init__(self, words: Sequence[int], recorder: Recorder):
+        super().__init__(words)
+        self.recorder = recorder
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run."""
+        executed = 0
+        while executed < cycles and not self.halted:
+            executed += self._run_batch(min(cycles - executed, BATCH))
+        return executed
+
+    def _run_batch(self, cycles: int) -> int:
+        """Execute and record up to `cycles` instructions."""
+        if self.halted:
+            return 0
+
+        buffer = array("h")
+        start = self.cycles
+        executed = self.execute(cycles, on_step=buffer.extend)
+        records = np.frombuffer(buffer, dtype=np.int16).astype("<i2").view(RECORD)
+        self.recorder.append(records, start)
+        return executed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import rom
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="execute and record")
+    record_parser.add_argument("path", help=f"hack-file or ROM image ({rom.SUFFIX})")
+    record_parser.add_argument("directory", help="directory of the trace segments")
+    record_parser.add_argument(
+        "-n",
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="maximum number of instructions to execute",
+    )
+    record_parser.add_argument(
+        "--capacity", type=int, default=1 << 24, help="records per segment"
+    )
+    record_parser.add_argument(
+        "--max-segments", type=int, help="delete older segments beyond this number"
+    )
+    show_parser = subparsers.add_parser("show", help="print recorded cycles")
+    show_parser.add_argument("directory", help="directory of the trace segments")
+    show_parser.add_argument("start", type=int, help="first cycle")
+    show_parser.add_argument("stop", type=int, help="cycle after the last one")
+    args = arg_parser.parse_args()
+
+    if args.command == "record":
+        recorder = Recorder(args.directory, args.capacity, args.max_segments)
+        emulator = TracingEmulator(rom.load(args.path), recorder)
+        executed = emulator.run(args.cycles)
+        recorder.close()
+        print(f"recorded {executed} cycles")
+    else:
+        trace = Trace(args.directory)
+        print(f"{'cycle':>12}  {'pc':>5}  {'A':>6}  {'D':>6}  write")
+        records = trace.cycles(args.start, args.stop)
+        for cycle, (pc, a, d, address, value) in enumerate(
+            records.tolist(), start=max(args.start, trace.start)
+        ):
+            write = f"RAM[{address}]={value}" if address >= 0 else ""
+            print(f"{cycle:>12}  {pc:>5}  {a:>6}  {d:>6}  {write}")
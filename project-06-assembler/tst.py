@@ -0,0 +1,377 @@
+"""Run the test scripts of the nand2tetris tools headless.
+
+A test script (.tst) loads a program, sets variables, runs it and outputs
+variables, every output line being compared with a compare file (.cmp).
+Programs are either run at the CPU level, where `ticktock` executes an
+instruction, or at the VM level, where `vmstep` executes a VM command.
+The VM level translates `.vm` files with the translator of projects 7 and
+8. A `repeat` of nothing but steps is executed by a single run.
+"""
+
+from __future__ import annotations
+
+import pathlib
+import re
+import sys
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+import lookup
+import rom
+from assembler import assemble_path, assemble_with_labels
+from emulator import Emulator, wrap
+from toolchain import vm_translator
+
+# instructions or VM commands executed by each kind of step
+STEPS = {"tick": 1, "tock": 0, "ticktock": 1, "vmstep": 1}
+
+# VM level: registers of the VM and the base addresses of the RAM segments
+REGISTERS = {"sp": 0, "local": 1, "argument": 2, "this": 3, "that": 4}
+FIXED_SEGMENTS = {"pointer": 3, "temp": 5}
+
+COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", flags=re.DOTALL)
+TOKEN = re.compile(r'"[^"]*"|[{},;!]|[^\s{},;!"]+')
+SEPARATORS = {"}", ",", ";", "!"}
+VARIABLE = re.compile(r"(\w+)(?:\[(\d+)\])?")
+COLUMN = re.compile(r"([\w\[\]]+)(?:%([BDSX])(\d+)\.(\d+)\.(\d+))?")
+STEP_LABEL = "VM_STEP_{}"
+
+
+@dataclass
+class Command:
+    """Command of a test script with its arguments."""
+    name: str
+    args: list[str] = field(default_factory=list)
+    # commands of a `repeat` block
+    body: list[Command] = field(default_factory=list)
+
+
+@dataclass
+class Column:
+    """Variable of the output list and how to format it, e.g. `RAM[0]%D2.6.2`."""
+    name: str
+    # the tools print bare variables as 16-bit binary numbers
+    format: str = "B"
+    left: int = 1
+    width: int = 16
+    right: int = 1
+
+    def header(self) -> str:
+        """Center the name in the column."""
+        total = self.left + self.width + self.right
+        name = self.name[:total]
+        left = (total - len(name)) // 2
+        return f"{'':<{left}}{name:<{total - left}}"
+
+    def cell(self, value: int) -> str:
+        """Format a value in the column."""
+        match self.format:
+            case "B":
+                text = f"{value & 0xFFFF:0{self.width}b}"[-self.width:]
+            case "X":
+                text = f"{value & 0xFFFF:0{self.width}X}"[-self.width:]
+            case "S":
+                text = f"{value:<{self.width}}"
+            case _:
+                text = f"{value:>{self.width}}"
+        return f"{'':<{self.left}}{text}{'':<{self.right}}"
+
+
+@dataclass
+class Result:
+    """Output of a test script and where it differs from the compare file."""
+    output: list[str] = field(default_factory=list)
+    # file the tools would write the output to
+    output_file: pathlib.Path | None = None
+    failure: str | None = None
+    cycles: int = 0
+    seconds: float = 0.0
+
+
+def parse_column(text: str) -> Column:
+    """Parse a variable of the output list with its optional format."""
+    match = COLUMN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid output format: {text!r}")
+    name, format_, left, width, right = match.groups()
+    if format_ is None:
+        return Column(name)
+    return Column(name, format_, int(left), int(width), int(right))
+
+
+def parse_value(text: str) -> int:
+    """Parse a decimal or `%B`, `%D`, `%X` prefixed value to a signed word."""
+    bases = {"%B": 2, "%D": 10, "%X": 16}
+    base = bases.get(text[:2].upper())
+    return wrap(int(text[2:], base) if base else int(text))
+
+
+def parse_script(text: str) -> list[Command]:
+    """Split a test script into commands, nesting the bodies of `repeat`."""
+    blocks: list[list[Command]] = [[]]
+    words: list[str] = []
+    for token in TOKEN.findall(COMMENT.sub("", text)):
+        if token == "{":
+            if not words or words[0] != "repeat":
+                raise ValueError(f"Unsupported block: {' '.join(words)!r}")
+            command = Command(words[0], words[1:])
+            blocks[-1].append(command)
+            blocks.append(command.body)
+            words = []
+        elif token in SEPARATORS:
+            if words:
+                blocks[-1].append(Command(words[0], words[1:]))
+                words = []
+            if token == "}":
+                if len(blocks) == 1:
+                    raise ValueError("Unexpected '}'")
+                blocks.pop()
+        else:
+            words.append(token)
+    if words or len(blocks) > 1:
+        raise ValueError("Unterminated test script")
+    return blocks[0]
+
+
+def matches(line: str, expected: str) -> bool:
+    """Compare an output line with a line of a compare file, `*` matching any."""
+    line, expected = line.rstrip(), expected.rstrip()
+    return len(line) == len(expected) and all(
+        e in ("*", c) for c, e in zip(line, expected, strict=True)
+    )
+
+
+def translate_vm(path: pathlib.Path) -> str:
+    """Translate a VM file or a directory of VM files to Hack assembly.
+
+    Every command is preceded by a label telling where its code starts, and
+    the code ends with an infinite loop, so the emulator halts behind it.
+    """
+    Parser, CodeWriter = vm_translator()
+
+    vm_files = sorted(path.glob("*.vm")) if path.is_dir() else [path]
+    code_writer = CodeWriter()
+    asm_code = []
+    commands = [
+        command for vm_file in vm_files for command in Parser(str(vm_file)).commands
+    ]
+    for number, command in enumerate(commands):
+        asm_code.append(f"({STEP_LABEL.format(number)})")
+        asm_code.extend(code_writer.write(command))
+    asm_code.extend(["(VM_END)", "@VM_END", "0;JMP"])
+    return "\n".join(asm_code)
+
+
+class VMEmulator(Emulator):
+    """Execute translated VM code, counting the executed VM commands.
+
+    A command is executed when the PC reaches the start of the next one,
+    whether by a jump or not. Commands without code of their own, like
+    `label`, are part of the following command.
+    """
+
+    def __init__(self, words: Sequence[int], starts: Iterable[int]):
+        super().__init__(words)
+        self.starts = bytearray(lookup.ROM_SIZE)
+        for address in starts:
+            self.starts[address] = 1
+
+    @classmethod
+    def from_vm(cls, path: pathlib.Path) -> VMEmulator:
+        """Translate a VM program, starting at `Sys.init` if there is one."""
+        words, labels = assemble_with_labels(translate_vm(path))
+        starts = [
+            address
+            for label, address in labels.items()
+            if label.startswith(STEP_LABEL.format(""))
+        ]
+        emulator = cls(words, starts)
+        emulator.pc = labels.get("Sys.init", 0)
+        return emulator
+
+    def run_steps(self, steps: int) -> int:
+        """Execute up to `steps` VM commands and return how many were run."""
+        for step in range(steps):
+            self.run_until_marked(sys.maxsize, self.starts)
+            if self.halted:
+                return step
+        return steps
+
+
+class ScriptRunner:
+    """Execute the commands of a test script."""
+
+    def __init__(self, directory: pathlib.Path):
+        # paths of the script are relative to its directory
+        self.directory = directory
+        self.emulator: Emulator | None = None
+        self.columns: list[Column] = []
+        self.compare: list[str] | None = None
+        self.result = Result()
+
+    def _loaded(self) -> Emulator:
+        if self.emulator is None:
+            raise ValueError("No program loaded")
+        return self.emulator
+
+    def _load(self, args: list[str]) -> None:
+        """Load a program at the CPU level or VM code at the VM level."""
+        path = self.directory / args[0] if args else self.directory
+        if path.is_dir() or path.suffix == ".vm":
+            self.emulator = VMEmulator.from_vm(path)
+        elif path.suffix == ".asm":
+            self.emulator = Emulator(assemble_path(path))
+        else:
+            self.emulator = Emulator(rom.load(path))
+
+    def _address(self, name: str) -> int:
+        """Find the RAM address of a variable."""
+        match = VARIABLE.fullmatch(name)
+        if match is None:
+            raise ValueError(f"Invalid variable: {name!r}")
+        base, index = match.group(1), match.group(2)
+        address = None
+        if base == "RAM" and index is not None:
+            address = int(index)
+        elif isinstance(self.emulator, VMEmulator):
+            if index is None:
+                address = REGISTERS.get(base)
+            elif base in FIXED_SEGMENTS:
+                address = FIXED_SEGMENTS[base] + int(index)
+            elif base in REGISTERS and base != "sp":
+                address = self.emulator.ram[REGISTERS[base]] + int(index)
+        if address is None or not 0 <= address < lookup.RAM_SIZE:
+            raise ValueError(f"Unknown variable: {name!r}")
+        return address
+
+    def get(self, name: str) -> int:
+        """Read the value of a variable."""
+        emulator = self._loaded()
+        match name:
+            case "A":
+                return emulator.a
+            case "D":
+                return emulator.d
+            case "PC":
+                return emulator.pc
+            case "time":
+                return emulator.cycles
+            case _:
+                return emulator.ram[self._address(name)]
+
+    def set(self, name: str, value: int) -> None:
+        """Write the value of a variable."""
+        emulator = self._loaded()
+        match name:
+            case "A":
+                emulator.a = value
+            case "D":
+                emulator.d = value
+            case "PC":
+                emulator.pc = value & 0x7FFF
+                emulator.halted = False
+            case _:
+                emulator.ram[self._address(name)] = value
+
+    def step(self, name: str, count: int) -> None:
+        """Execute `count` steps of a kind."""
+        emulator = self._loaded()
+        is_vm = isinstance(emulator, VMEmulator)
+        if (name == "vmstep") != is_vm:
+            raise ValueError(f"{name} at the {'VM' if is_vm else 'CPU'} level")
+        if isinstance(emulator, VMEmulator):
+            emulator.run_steps(count * STEPS[name])
+        else:
+            emulator.run(count * STEPS[name])
+
+    def output(self, line: str) -> None:
+        """Append a line to the output and compare it."""
+        output = self.result.output
+        output.append(line)
+        if self.compare is None:
+            return
+        number = len(output)
+        if number > len(self.compare) or not matches(line, self.compare[number - 1]):
+            self.result.failure = f"Comparison failure at line {number}"
+
+    def execute(self, commands: list[Command]) -> None:
+        """Execute commands until the end or the first comparison failure."""
+        for command in commands:
+            if self.result.failure is not None:
+                return
+            args = command.args
+            match command.name:
+                case "repeat":
+                    self._repeat(command)
+                case "load":
+                    self._load(args)
+                case "output-file":
+                    self.result.output_file = self.directory / args[0]
+                case "compare-to":
+                    self.compare = (self.directory / args[0]).read_text().splitlines()
+                case "output-list":
+                    self.columns = [parse_column(arg) for arg in args]
+                    self.output(
+                        "|" + "|".join(column.header() for column in self.columns) + "|"
+                    )
+                case "output":
+                    cells = (
+                        column.cell(self.get(column.name)) for column in self.columns
+                    )
+                    self.output("|" + "|".join(cells) + "|")
+                case "set":
+                    self.set(args[0], parse_value(args[1]))
+                case "echo" | "clear-echo":
+                    pass
+                case name if name in STEPS:
+                    self.step(name, 1)
+                case name:
+                    raise ValueError(f"Unsupported command: {name!r}")
+
+    def _repeat(self, command: Command) -> None:
+        """Repeat a block, running consecutive steps at once."""
+        if len(command.args) != 1:
+            raise ValueError("Only repeat with a count is supported")
+        count = int(command.args[0])
+        names = {step.name for step in command.body}
+        # steps of both levels are left to fail one by one
+        if names <= STEPS.keys() and not ("vmstep" in names and len(names) > 1):
+            steps = sum(STEPS[step.name] for step in command.body)
+            self.step("vmstep" if "vmstep" in names else "ticktock", count * steps)
+        else:
+            for _ in range(count):
+                self.execute(command.body)
+
+
+def run_script(path: str | pathlib.Path) -> Result:
+    """Execute a test script."""
+    path = pathlib.Path(path)
+    runner = ScriptRunner(path.parent)
+    start = time.perf_counter()
+    runner.execute(parse_script(path.read_text()))
+    runner.result.seconds = time.perf_counter() - start
+    if runner.emulator is not None:
+        runner.result.cycles = runner.emulator.cycles
+    return runner.result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("scripts", type=pathlib.Path, nargs="+", help="tst-file")
+    args = arg_parser.parse_args()
+
+    failed = 0
+    for script in args.scripts:
+        result = run_script(script)
+        if result.output_file is not None:
+            result.output_file.write_text("\n".join(result.output) + "\n")
+        status = result.failure or "End of script - Comparison ended successfully"
+        failed += result.failure is not None
+        print(
+            f"{script}: {status} "
+            f"({result.cycles} cycles in {result.seconds:.3f}s)"
+        )
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,232 @@
+"""Execute Hack machine code by translating basic blocks to Python."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+
+import lookup
+from emulator import ALU, Emulator
+
+# generated function: (ram, a, d, budget) -> (a, d, pc, cycles, halted)
+BlockFunction = Callable[..., tuple[int, int, int, int, bool]]
+# compiled block: (function, maximum number of instructions per iteration)
+Block = tuple[BlockFunction, int]
+
+
+def _wrap(expression: str) -> str:
+    """Wrap the result of an expression to a signed 16-bit word."""
+    return f"((({expression}) + 0x8000) & 0xFFFF) - 0x8000"
+
+
+# templates of the documented computations, x is D and y is A or M
+EXPRESSIONS = {
+    0b101010: "0",
+    0b111111: "1",
+    0b111010: "-1",
+    0b001100: "{x}",
+    0b110000: "{y}",
+    0b001101: "~{x}",
+    0b110001: "~{y}",
+    0b001111: _wrap("-{x}"),
+    0b110011: _wrap("-{y}"),
+    0b011111: _wrap("{x} + 1"),
+    0b110111: _wrap("{y} + 1"),
+    0b001110: _wrap("{x} - 1"),
+    0b110010: _wrap("{y} - 1"),
+    0b000010: _wrap("{x} + {y}"),
+    0b010011: _wrap("{x} - {y}"),
+    0b000111: _wrap("{y} - {x}"),
+    0b000000: "{x} & {y}",
+    0b010101: "{x} | {y}",
+}
+
+CONDITIONS = {
+    0b001: "out > 0",
+    0b010: "out == 0",
+    0b011: "out >= 0",
+    0b100: "out < 0",
+    0b101: "out != 0",
+    0b110: "out <= 0",
+    0b111: "True",
+}
+
+# longer blocks compile slower and are more likely to be left early
+MAX_BLOCK_LENGTH = 256
+
+
+def _expression(word: int, y: str) -> str:
+    """Translate the comp-field of a C-instruction to a Python expression."""
+    comp = (word >> 6) & 0b111111
+    if comp not in EXPRESSIONS:
+        return f"ALU[{comp}](d, {y})"
+    return EXPRESSIONS[comp].format(x="d", y=y)
+
+
+def _computation(word: int, known_a: int | None) -> list[str]:
+    """Translate computation and destination of a C-instruction.
+
+    If the instruction jumps to an unknown address, the address is saved to
+    `t` before A might be overwritten.
+    """
+    lines = []
+    address = "a" if known_a is None else str(known_a)
+    y = f"ram[{address}]" if word & 0x1000 else address
+    expression = _expression(word, y)
+    if word & 0b111 and known_a is None:
+        lines.append("t = a")
+        address = "t"
+
+    dest = (word >> 3) & 0b111
+    registers = [
+        register
+        for mask, register in ((1, f"ram[{address}]"), (2, "d"), (4, "a"))
+        if dest & mask
+    ]
+    if word & 0b111 or len(registers) > 1:
+        lines.append(f"out = {expression}")
+        expression = "out"
+    lines.extend(f"{register} = {expression}" for register in registers)
+    return lines
+
+
+def _loop_back(known_a: int | None, length: int, entry: int) -> list[str]:
+    """Jump back to the entry of a block after `length` instructions.
+
+    The loop is left if the budget doesn't allow another iteration.
+    """
+    lines = [] if known_a is None else [f"a = {known_a}"]
+    lines.append(f"n += {length}")
+    lines.append("if n > limit:")
+    lines.append(f"    return a, d, {entry}, n, False")
+    return lines
+
+
+class TurboEmulator(Emulator):
+    """Execute Hack machine code as compiled blocks.
+
+    A block starts at whatever address execution enters. It follows
+    unconditional jumps to known addresses and leaves through a side exit at
+    every conditional jump taken. A block jumping back to its entry, with or
+    without a condition, becomes a loop, which runs until the cycle budget
+    doesn't allow another iteration.
+    Every block is translated once to Python source updating A, D and RAM
+    directly, compiled and cached by its entry address. Instructions are
+    counted per exit, so cycle counts match the interpreter exactly.
+    """
+
+    def __init__(self, words: Sequence[int]):
+        super().__init__(words)
+        self._blocks: dict[int, Block] = {}
+
+    def translate(self, entry: int) -> tuple[str, int]:
+        """Generate the source code of the block starting at `entry`.
+
+        Return the source and the number of instructions of one iteration.
+        """
+        body: list[str] = []
+        pc = entry
+        visited = {entry}
+        # A is only assigned when it is needed, as long as it is a constant
+        known_a: int | None = None
+        length = 0
+
+        while True:
+            word = self.rom[pc] if pc < len(self.rom) else 0
+            length += 1
+            target = known_a
+            next_pc: int | None = pc + 1
+
+            if not word & 0x8000:
+                known_a = word
+            else:
+                body.extend(_computation(word, known_a))
+                if word & 0b100000:
+                    known_a = None
+                a = "a" if known_a is None else str(known_a)
+                jump_pc = "t & 0x7FFF" if target is None else str(target & 0x7FFF)
+                jump = word & 0b111
+
+                if jump and jump != 0b111:
+                    body.append(f"if {CONDITIONS[jump]}:")
+                    if target == entry:
+                        body.extend(
+                            f"    {line}" for line in _loop_back(known_a, length, entry)
+                        )
+                        body.append("    continue")
+                    else:
+                        body.append(
+                            f"    return {a}, d, {jump_pc}, n + {length}, False"
+                        )
+                elif jump and pc in self._halts and target in (None, pc - 1):
+                    # the interpreter stops at the jump of the final loop
+                    address = "t" if target is None else target
+                    body.append(f"if {address} == {pc - 1}:")
+                    body.append(f"    return {a}, d, {pc}, n + {length}, True")
+                    next_pc = target
+                elif jump:
+                    next_pc = target
+
+            a = "a" if known_a is None else str(known_a)
+            if next_pc is None:
+                body.append(f"return {a}, d, t & 0x7FFF, n + {length}, False")
+                break
+            if next_pc == entry:
+                body.extend(_loop_back(known_a, length, entry))
+                break
+            if (
+                next_pc in visited
+                or length >= MAX_BLOCK_LENGTH
+                or next_pc >= lookup.ROM_SIZE
+            ):
+                exit_pc = next_pc & 0x7FFF
+                body.append(f"return {a}, d, {exit_pc}, n + {length}, False")
+                break
+            pc = next_pc
+            visited.add(pc)
+
+        # another iteration is only started if its longest path fits the budget
+        lines = [
+            "def block(ram, a, d, budget):",
+            "    n = 0",
+            f"    limit = budget - {length}",
+            "    while True:",
+        ]
+        lines.extend(f"        {line}" for line in body)
+        return "\n".join(lines), length
+
+    def _compile_block(self, entry: int) -> Block:
+        """Translate, compile and cache the block starting at `entry`."""
+        source, length = self.translate(entry)
+        namespace: dict = {"ALU": ALU}
+        exec(compile(source, f"<block {entry}>", "exec"), namespace)
+        block = (namespace["block"], length)
+        self._blocks[entry] = block
+        return block
+
+    def run(self, cycles: int) -> int:
+        """Execute up to `cycles` instructions and return how many were run."""
+        if self.halted:
+            return 0
+
+        blocks = self._blocks
+        ram = self.ram
+        a, d, pc = self.a, self.d, self.pc
+        remaining = cycles
+
+        while remaining > 0:
+            fn, length = blocks.get(pc) or self._compile_block(pc)
+            if length > remaining:
+                break
+            a, d, pc, executed, halted = fn(ram, a, d, remaining)
+            remaining -= executed
+            if halted:
+                self.halted = True
+                break
+
+        self.a, self.d, self.pc = a, d, pc
+        executed = cycles - remaining
+        self.cycles += executed
+        if remaining and not self.halted:
+            # finish the partial block instruction by instruction
+            executed += super().run(remaining)
+        return executed
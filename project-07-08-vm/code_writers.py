@@ -13,9 +13,22 @@ class CodeWriter:
         "that":     "THAT",
     }
 
-    def __init__(self) -> None:
+    # labels of the routines shared by all calls and returns
+    CALL = "VM_CALL"
+    RETURN = "VM_RETURN"
+
+    def __init__(self, shared_calls: bool = False) -> None:
+        """Create a code writer.
+
+        With `shared_calls` every call and return jumps to one routine instead
+        of inlining it, which saves most of their code at the cost of a few
+        cycles. The routines are part of the bootstrap code.
+        """
         self.label_count_cmp = 0
         self.label_count_ret_addr = 0
+        self.shared_calls = shared_calls
+        # function whose body is being written, which scopes its labels
+        self.function_name: str | None = None
 
     def write(self, command: VMCommand) -> list[str]:
         """Main method for generating assembly code."""
@@ -42,6 +55,24 @@ class CodeWriter:
 
         return code
 
+    def bootstrap(self) -> list[str]:
+        """Prepare the VM for execution.
+
+        The code sets the stack pointer and calls `Sys.init`. With shared
+        calls, it also contains the shared call and return routines.
+        """
+        code = [
+            "// Set stack pointer",
+            "@256",
+            "D=A",
+            "@SP",
+            "M=D",
+        ]
+        code.extend(self.write(VMCommand("call", "Sys.init", 0)))
+        if self.shared_calls:
+            code.extend(self._shared_routines())
+        return code
+
     def _push(self, vm_command: VMCommand) -> list[str]:
         """Push a value onto the stack."""
         segment, value = vm_command.arg1, vm_command.arg2
@@ -144,15 +175,23 @@ class CodeWriter:
             f"(CMP{self.label_count_cmp}_END)",
         ]
 
+    def _scoped_label(self, label: str) -> str:
+        """Qualify a label as `functionName$label` inside a function."""
+        if self.function_name is None:
+            return label
+        return f"{self.function_name}${label}"
+
     def _branching(self, vm_command: VMCommand) -> list[str]:
         """Handle branching commands."""
+        assert vm_command.arg1 is not None, "Argument 1 must be provided."
+        label = self._scoped_label(vm_command.arg1)
         match vm_command.command:
             case "label":
-                return [f"({vm_command.arg1})"]
+                return [f"({label})"]
             case "goto":
-                return [f"@{vm_command.arg1}", "0;JMP"]
+                return [f"@{label}", "0;JMP"]
             case "if-goto":
-                return ["@SP", "AM=M-1", "D=M", f"@{vm_command.arg1}", "D;JNE"]
+                return ["@SP", "AM=M-1", "D=M", f"@{label}", "D;JNE"]
             case _:
                 raise ValueError(f"Unknown command: {vm_command.command}")
 
@@ -172,10 +211,30 @@ class CodeWriter:
         match vm_command.command:
             case "function":
                 assert vm_command.arg2 is not None, "Argument 2 must be provided."
+                self.function_name = vm_command.arg1
                 return (
                     [f"({vm_command.arg1})"]
                     + self._push(VMCommand("push", "constant", 0)) * vm_command.arg2
                 )
+            case "call" if self.shared_calls:
+                self.label_count_ret_addr += 1
+                return [
+                    # pass return address, callee and number of arguments
+                    f"@RETADDR_{self.label_count_ret_addr}",
+                    "D=A",
+                    "@R13",
+                    "M=D",
+                    f"@{vm_command.arg1}",
+                    "D=A",
+                    "@R14",
+                    "M=D",
+                    f"@{vm_command.arg2}",
+                    "D=A",
+                    f"@{self.CALL}",
+                    "0;JMP",
+                    # create return address label
+                    f"(RETADDR_{self.label_count_ret_addr})",
+                ]
             case "call":
                 self.label_count_ret_addr += 1
                 return [
@@ -183,22 +242,7 @@ class CodeWriter:
                     f"@RETADDR_{self.label_count_ret_addr}",
                     "D=A",
                     *self._push_d(),
-                    # save LCL
-                    "@LCL",
-                    "D=M",
-                    *self._push_d(),
-                    # save ARG
-                    "@ARG",
-                    "D=M",
-                    *self._push_d(),
-                    # save THIS
-                    "@THIS",
-                    "D=M",
-                    *self._push_d(),
-                    # save THAT
-                    "@THAT",
-                    "D=M",
-                    *self._push_d(),
+                    *self._save_frame(),
                     # reposition ARG
                     "@SP",
                     "D=M",
@@ -208,82 +252,118 @@ class CodeWriter:
                     "D=D-A",
                     "@ARG",
                     "M=D",
-                    # reposition LCL
-                    "@SP",
-                    "D=M",
-                    "@LCL",
-                    "M=D",
+                    *self._enter(),
                     # transfer control to callee
                     f"@{vm_command.arg1}",
                     "0;JMP",
                     # create return address label
                     f"(RETADDR_{self.label_count_ret_addr})",
                 ]
+            case "return" if self.shared_calls:
+                return [f"@{self.RETURN}", "0;JMP"]
             case "return":
-                return [
-                    # get address at the end of the callers frame
-                    "@LCL",
-                    "D=M",
-                    "@endFrame",
-                    "M=D",
-                    # get the return address
-                    "@5",
-                    "A=D-A",
-                    "D=M",
-                    "@returnAddress",
-                    "M=D",
-                    # put the return value in ARG[0]
-                    "@SP",
-                    "A=M-1",
-                    "D=M",
-                    "@ARG",
-                    "A=M",
-                    "M=D",
-                    # reposition Stack Pointer
-                    "@ARG",
-                    "D=M+1",
-                    "@SP",
-                    "M=D",
-                    # restore THAT
-                    "@endFrame",
-                    "AM=M-1",
-                    "D=M",
-                    "@THAT",
-                    "M=D",
-                    # restore THIS
-                    "@endFrame",
-                    "AM=M-1",
-                    "D=M",
-                    "@THIS",
-                    "M=D",
-                    # restore ARG
-                    "@endFrame",
-                    "AM=M-1",
-                    "D=M",
-                    "@ARG",
-                    "M=D",
-                    # restore LCL
-                    "@endFrame",
-                    "AM=M-1",
-                    "D=M",
-                    "@LCL",
-                    "M=D",
-                    # jump to return address
-                    "@returnAddress",
-                    "A=M",
-                    "0;JMP",
-                ]
+                return self._return()
             case _:
                 raise ValueError(f"Unknown command: {vm_command.command}")
 
-    def _bootstrap(self) -> list[str]:
-        """Prepare the VM for execution."""
-        code = [
-            "// Set stack pointer",
-            "@256",
-            "D=A",
+    def _save_frame(self) -> list[str]:
+        """Push the segment pointers of the caller."""
+        code = []
+        for pointer in ("LCL", "ARG", "THIS", "THAT"):
+            code.extend([f"@{pointer}", "D=M", *self._push_d()])
+        return code
+
+    def _enter(self) -> list[str]:
+        """Start the local segment of the callee at the top of the stack."""
+        return ["@SP", "D=M", "@LCL", "M=D"]
+
+    def _return(self) -> list[str]:
+        """Return the top of the stack to the caller and restore its frame."""
+        return [
+            # get address at the end of the callers frame
+            "@LCL",
+            "D=M",
+            "@endFrame",
+            "M=D",
+            # get the return address
+            "@5",
+            "A=D-A",
+            "D=M",
+            "@returnAddress",
+            "M=D",
+            # put the return value in ARG[0]
+            "@SP",
+            "A=M-1",
+            "D=M",
+            "@ARG",
+            "A=M",
+            "M=D",
+            # reposition Stack Pointer
+            "@ARG",
+            "D=M+1",
+            "@SP",
+            "M=D",
+            # restore THAT
+            "@endFrame",
+            "AM=M-1",
+            "D=M",
+            "@THAT",
+            "M=D",
+            # restore THIS
+            "@endFrame",
+            "AM=M-1",
+            "D=M",
+            "@THIS",
+            "M=D",
+            # restore ARG
+            "@endFrame",
+            "AM=M-1",
+            "D=M",
+            "@ARG",
+            "M=D",
+            # restore LCL
+            "@endFrame",
+            "AM=M-1",
+            "D=M",
+            "@LCL",
+            "M=D",
+            # jump to return address
+            "@returnAddress",
+            "A=M",
+            "0;JMP",
+        ]
+
+    def _shared_routines(self) -> list[str]:
+        """Generate the call and return code all shared calls jump to.
+
+        A call passes the return address in R13, the callee in R14 and the
+        number of arguments in D.
+        """
+        return [
+            "// shared call",
+            f"({self.CALL})",
+            "@R15",
+            "M=D",
+            # push return address
+            "@R13",
+            "D=M",
+            *self._push_d(),
+            *self._save_frame(),
+            # reposition ARG
             "@SP",
+            "D=M",
+            "@5",
+            "D=D-A",
+            "@R15",
+            "D=D-M",
+            "@ARG",
             "M=D",
+            *self._enter(),
+            # transfer control to callee
+            "@R14",
+            "A=M",
+            "0;JMP",
+            "// shared return",
+            f"({self.RETURN})",
+            *self._return(),
         ]
-        code.extend(self.write(VMCommand("call", "Sys.init", 0)))
-        return code
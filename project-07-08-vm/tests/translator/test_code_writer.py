@@ -253,6 +253,17 @@ class TestBranching:
         _, *code = CodeWriter().write(vm_command)
         assert code == ["@SP", "AM=M-1", "D=M", "@LABEL_3", "D;JNE"]
 
+    def test_should_scope_labels_to_function(self):
+        code_writer = CodeWriter()
+        code_writer.write(VMCommand("function", "Main.main", 0))
+        _, *label = code_writer.write(VMCommand("label", "WHILE_0"))
+        _, *jump = code_writer.write(VMCommand("goto", "WHILE_0"))
+        code_writer.write(VMCommand("function", "Main.run", 0))
+        _, *other = code_writer.write(VMCommand("label", "WHILE_0"))
+        assert label == ["(Main.main$WHILE_0)"]
+        assert jump == ["@Main.main$WHILE_0", "0;JMP"]
+        assert other == ["(Main.run$WHILE_0)"]
+
 
 class TestFunction:
     def test_should_create_label(self):
@@ -265,3 +276,32 @@ class TestFunction:
         vm_command = VMCommand("function", "Some.function", n_args)
         _, *code = CodeWriter().write(vm_command)
         assert code.count("@0") == n_args
+
+    def test_should_jump_to_shared_call(self):
+        vm_command = VMCommand("call", "Some.function", 2)
+        _, *code = CodeWriter(shared_calls=True).write(vm_command)
+        assert code == [
+            "@RETADDR_1",
+            "D=A",
+            "@R13",
+            "M=D",
+            "@Some.function",
+            "D=A",
+            "@R14",
+            "M=D",
+            "@2",
+            "D=A",
+            f"@{CodeWriter.CALL}",
+            "0;JMP",
+            "(RETADDR_1)",
+        ]
+
+    def test_should_jump_to_shared_return(self):
+        vm_command = VMCommand("return")
+        _, *code = CodeWriter(shared_calls=True).write(vm_command)
+        assert code == [f"@{CodeWriter.RETURN}", "0;JMP"]
+
+    def test_should_define_shared_routines_once(self):
+        code = CodeWriter(shared_calls=True).bootstrap()
+        assert code.count(f"({CodeWriter.CALL})") == 1
+        assert code.count(f"({CodeWriter.RETURN})") == 1
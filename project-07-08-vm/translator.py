@@ -13,7 +13,7 @@ def translate(vm_path: str | pathlib.Path) -> str:
 
     if vm.is_dir():
         translated = []
-        translated.extend(code_writer._bootstrap())
+        translated.extend(code_writer.bootstrap())
         for vm_file in vm.glob("*.vm"):
             translated.extend(_translate_file(code_writer, Parser(vm_file)))
     else:
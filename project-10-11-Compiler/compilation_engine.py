@@ -151,7 +151,7 @@ class CompilationEngine:
         self._symbol_table_subroutine = SymbolTable()
         code = []
         subroutine_type = self._expect(TokenType.KEYWORD, ("constructor", "function", "method")).value
-        return_type = self._variable_type(include_void=True)
+        self._variable_type(include_void=True)  # return type
         name = self._expect(TokenType.IDENTIFIER).value
         if subroutine_type == "method":
             # inject `this` pointer as first argument
@@ -179,9 +179,10 @@ class CompilationEngine:
             code.extend(VMWriter.write_function(f"{self._class_name}.{name}", n_local_variables))
 
         code.extend(body)
-        if return_type.value == "void":
+        if body[-1:] != VMWriter.write_return():
+            # implicit return at the end of a void subroutine
             code.extend(VMWriter.write_push("constant", 0))
-        code.extend(VMWriter.write_return())
+            code.extend(VMWriter.write_return())
         return code
 
     def _var_dec(self) -> None:
@@ -316,9 +317,13 @@ class CompilationEngine:
         """Compile a return statement."""
         code = []
         self._expect(TokenType.KEYWORD, "return")
-        with suppress(SyntaxError):
+        if self._token_stream.current == Token(TokenType.SYMBOL, ";"):
+            # void subroutines return 0
+            code.extend(VMWriter.write_push("constant", 0))
+        else:
             code.extend(self._expression())
         self._expect(TokenType.SYMBOL, ";")
+        code.extend(VMWriter.write_return())
         return code
 
     def _subroutine_call(self) -> VMCode:
@@ -38,3 +38,10 @@ def test_should_tokenize_before_parsing(mocker: MockerFixture):
     mocked_tokenize.assert_called_once_with(code)
     mocked_token_stream.assert_called_with(tokens)  # generator should be converted to tuple
     mocked_parse.assert_called_once()
+
+
+def test_should_return_from_nested_statements():
+    code = "class A { function int f(int x) { if (x) { return 0; } return 1; } }"
+    *_, vm_code = analyze(code)
+    assert vm_code.count("return") == 2
+    assert vm_code[vm_code.index("push constant 0") + 1] == "return"
@@ -0,0 +1,7 @@
+"""Adding the assembler project to sys.path to run the OS on its emulator."""
+
+import pathlib
+import sys
+
+script_dir = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parents[1] / "project-06-assembler"))
@@ -0,0 +1,55 @@
+import pathlib
+
+from assembler import assemble_with_labels
+from benchmark import compile_jack
+from emulator import Emulator
+
+OS = pathlib.Path(__file__).resolve().parents[1]
+HEAP = 2048
+SCREEN = 16384
+
+
+def run_main(tmp_path, statements, cycles=10_000_000):
+    """Run Main.main with the OS until it halts, e.g. after an error."""
+    (tmp_path / "Main.jack").write_text(
+        f"class Main {{ function void main() {{ {statements} return; }} }}"
+    )
+    words, labels = assemble_with_labels(compile_jack(OS, tmp_path))
+    emulator = Emulator(words)
+    emulator.run_until(cycles, labels["Sys.halt"])
+    assert emulator.pc == labels["Sys.halt"]
+    return emulator
+
+
+def test_should_initialize_memory_before_other_libraries(tmp_path):
+    emulator = run_main(tmp_path, "do Memory.poke(16384, Math.multiply(123, 45));")
+    assert emulator.ram[SCREEN] == 123 * 45
+
+
+def test_should_convert_digits_to_characters(tmp_path):
+    emulator = run_main(
+        tmp_path,
+        "do Memory.poke(16384, String.ord(0)); do Memory.poke(16385, String.ord(9));",
+    )
+    assert emulator.ram[SCREEN:SCREEN + 2].tolist() == [ord("0"), ord("9")]
+
+
+def test_should_allocate_blocks_at_the_end_of_the_free_segment(tmp_path):
+    emulator = run_main(
+        tmp_path,
+        "var Array a, b; let a = Memory.alloc(5); let b = Memory.alloc(3);"
+        "do Memory.poke(16384, a); do Memory.poke(16385, b);"
+        "do Memory.deAlloc(b); do Memory.poke(16386, Memory.alloc(4));",
+    )
+    ram = emulator.ram
+    a, b, c = ram[SCREEN:SCREEN + 3].tolist()
+    # the size of a block is in front of it, b directly in front of a
+    assert (ram[a - 1], ram[b - 1], ram[c - 1]) == (5, 3, 4)
+    assert b + 3 + 2 == a
+    # the heap segment ends right in front of the last block
+    assert HEAP + 2 + ram[HEAP + 1] == c - 2
+    # the freed block is appended to the free list
+    segment = HEAP
+    while ram[segment]:
+        segment = ram[segment]
+    assert segment == b - 2